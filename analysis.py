@@ -0,0 +1,155 @@
+# analysis.py
+
+"""
+牌局分析 - 用全下时刻的胜率计算全下调整EV（all-in adjusted EV），剔除发牌运气对筹码结果的影响
+"""
+
+import json
+import random
+from itertools import combinations
+from math import comb
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional
+
+from poker_engine import Card, RANKS, SUITS, parse_card, best_hand_rank
+
+# 剩余公共牌组合数不超过该值时精确枚举（如翻牌后全下），否则用蒙特卡洛抽样（如翻牌前全下）
+EXACT_RUNOUT_LIMIT = 2000
+MONTE_CARLO_SAMPLES = 2000
+
+
+def build_pots(contributions: Dict[str, int], live: List[str]) -> List[Tuple[int, List[str]]]:
+    """按投入分层构建主池和边池。弃牌玩家的投入计入底池，但不具备分池资格."""
+    levels = sorted({contributions.get(name, 0) for name in live if contributions.get(name, 0) > 0})
+    pots, last_level = [], 0
+    for level in levels:
+        amount = sum(min(c, level) - min(c, last_level) for c in contributions.values())
+        eligible = [name for name in live if contributions.get(name, 0) >= level]
+        if amount > 0: pots.append((amount, eligible))
+        last_level = level
+    leftover = sum(max(0, c - last_level) for c in contributions.values())
+    if leftover and pots:
+        pots[-1] = (pots[-1][0] + leftover, pots[-1][1])
+    return pots
+
+
+def expected_pot_shares(hands: Dict[str, List[Card]], board: List[Card], pots: List[Tuple[int, List[str]]],
+                        samples: int = MONTE_CARLO_SAMPLES, rng: random.Random = None) -> Dict[str, float]:
+    """计算每位玩家在剩余公共牌所有可能发展下，从各底池中期望分得的筹码."""
+    known = {str(c) for c in board} | {str(c) for cards in hands.values() for c in cards}
+    stub = [Card(rank, suit) for rank in RANKS for suit in SUITS if f"{rank}{suit}" not in known]
+    needed = 5 - len(board)
+    if needed <= 0:
+        runouts = [()]
+    elif comb(len(stub), needed) <= EXACT_RUNOUT_LIMIT:
+        runouts = combinations(stub, needed)
+    else:
+        rng = rng or random.Random()
+        runouts = (rng.sample(stub, needed) for _ in range(samples))
+
+    shares = dict.fromkeys(hands, 0.0)
+    count = 0
+    for runout in runouts:
+        full_board = board + list(runout)
+        ranks = {name: best_hand_rank(full_board + cards) for name, cards in hands.items()}
+        for amount, eligible in pots:
+            best = max(ranks[name] for name in eligible)
+            winners = [name for name in eligible if ranks[name] == best]
+            for w in winners: shares[w] += amount / len(winners)
+        count += 1
+    return {name: total / count for name, total in shares.items()}
+
+
+def calculate_equity(hands: Dict[str, List[Card]], board: List[Card],
+                     samples: int = MONTE_CARLO_SAMPLES, rng: random.Random = None) -> Dict[str, float]:
+    """单一底池下每位玩家的胜率（平局按人数均分）."""
+    return expected_pot_shares(hands, board, [(1, list(hands))], samples, rng)
+
+
+def _all_in_spot(hand_data: Dict[str, Any], start_chips: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """找出"全下后无人再行动、直接发完公共牌摊牌"的局面，返回计算EV所需的信息."""
+    rounds = hand_data.get("rounds", [])
+    acted_rounds = [r for r in rounds if r.get("actions")]
+    if not acted_rounds: return None
+    board = acted_rounds[-1]["community_cards"]
+    if len(board) >= len(rounds[-1]["community_cards"]): return None
+
+    results = hand_data.get("showdown", {}).get("results", [])
+    if not any(r.get("hand_name") != "未摊牌" for r in results): return None
+
+    folded = {a["player_name"] for r in rounds for a in r["actions"]
+              if (a.get("parsed_action") or {}).get("action") == "fold"}
+    live = sorted({name for r in results for name in r["eligible_players"]} - folded)
+    if len(live) < 2: return None
+
+    hole_cards = {p["name"]: p["hand"] for p in hand_data.get("players", [])}
+    for r in rounds:
+        for a in r["actions"]: hole_cards.setdefault(a["player_name"], a["player_hand"])
+    if any(not hole_cards.get(name) for name in live): return None
+
+    contributions = hand_data.get("contributions")
+    if contributions is None:
+        # 旧日志没有记录投入：用 手牌开始筹码 + 赢得底池 - 结束筹码 反推
+        final_chips = hand_data["final_chips"]
+        if any(name not in start_chips for name in final_chips): return None
+        winnings = dict.fromkeys(final_chips, 0)
+        for r in results:
+            for w in r["winners"]: winnings[w] = winnings.get(w, 0) + r["pot_amount"] // len(r["winners"])
+        contributions = {name: start_chips[name] + winnings.get(name, 0) - chips for name, chips in final_chips.items()}
+
+    return {
+        "board": [parse_card(c) for c in board],
+        "hands": {name: [parse_card(c) for c in hole_cards[name]] for name in live},
+        "contributions": contributions,
+        "live": live,
+    }
+
+
+def analyze_hand(hand_data: Dict[str, Any], start_chips: Dict[str, int] = None,
+                 samples: int = MONTE_CARLO_SAMPLES, rng: random.Random = None) -> Dict[str, Dict[str, Any]]:
+    """返回每位玩家本手牌的实际盈亏(net)和全下调整EV(ev)。没有全下摊牌的手牌 ev 等于 net."""
+    final_chips = hand_data.get("final_chips")
+    if not final_chips: return {}
+    setup = hand_data.get("players")
+    start = {p["name"]: p["chips"] for p in setup} if setup else dict(start_chips or {})
+    result = {name: {"net": chips - start[name], "ev": float(chips - start[name]), "all_in": False}
+              for name, chips in final_chips.items() if name in start}
+
+    spot = _all_in_spot(hand_data, start)
+    if spot:
+        pots = build_pots(spot["contributions"], spot["live"])
+        shares = expected_pot_shares(spot["hands"], spot["board"], pots, samples, rng)
+        for name in spot["live"]:
+            if name in result:
+                result[name]["ev"] = shares[name] - spot["contributions"].get(name, 0)
+                result[name]["all_in"] = True
+    return result
+
+
+def analyze_session(session_dir: str, samples: int = MONTE_CARLO_SAMPLES) -> Dict[str, Dict[str, Any]]:
+    """汇总一个会话中每位玩家的实际盈亏、全下调整EV和运气因素（实际 - EV）."""
+    session_dir = Path(session_dir)
+    hand_files = sorted(session_dir.glob("hand_*.json"), key=lambda f: int(f.stem.split("_")[1]))
+    summary: Dict[str, Dict[str, Any]] = {}
+    prev_chips = None
+    for hand_file in hand_files:
+        with open(hand_file, 'r', encoding='utf-8') as f: hand_data = json.load(f)
+        if prev_chips is None:
+            starting = hand_data.get("game_config", {}).get("starting_chips") or [0]
+            prev_chips = {name: starting[0] for name in hand_data.get("final_chips", {})}
+        rng = random.Random(f"{session_dir.name}:{hand_data.get('hand_num')}")
+        hand_result = analyze_hand(hand_data, prev_chips, samples, rng)
+
+        llm_types = {p["name"]: p.get("llm_type") for p in hand_data.get("players", [])}
+        for name, r in hand_result.items():
+            stats = summary.setdefault(name, {"llm_type": None, "net": 0, "ev": 0.0, "all_in_hands": 0, "hands": 0})
+            stats["llm_type"] = llm_types.get(name) or stats["llm_type"]
+            stats["net"] += r["net"]
+            stats["ev"] += r["ev"]
+            stats["all_in_hands"] += int(r["all_in"])
+            stats["hands"] += 1
+        prev_chips = {**prev_chips, **hand_data.get("final_chips", {})}
+
+    for stats in summary.values():
+        stats["luck"] = stats["net"] - stats["ev"]
+    return summary
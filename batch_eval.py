@@ -0,0 +1,262 @@
+# batch_eval.py
+
+"""
+离线批量评估 - 复盘日志，把每个决策点导出为 OpenAI Batch 格式的批量推理输入（与在线对局相同的消息和合法动作），
+交给 vLLM 离线批处理或任何兼容该格式的运行器（也可用本模块的 run 子命令）跑完后导入结果，
+按在线对局的解析和修正规则还原动作，与原始决策和该决策点的胜率对比打分
+"""
+
+import argparse
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from bots import estimate_equity, preflop_equity
+from game_manager import legalize_action
+from llm_client import build_messages, parse_action, get_client
+from replay import replay_logs
+
+SPOTS_FILENAME = "spots.jsonl"
+BATCH_FILENAME = "batch_input.jsonl"
+BATCH_URL = "/v1/chat/completions"
+EQUITY_SAMPLES = 500
+
+
+def _spot(manager, player, action_log: Dict[str, Any], equity_samples: int, rng: np.random.Generator) -> tuple:
+    """决策点的元数据和批量请求（custom_id 在手牌复盘一致后再分配）."""
+    game = manager.game
+    valid_actions = manager._get_valid_actions(player)
+    opponents = sum(1 for p in game.players if p.is_active and p is not player)
+    # 胜率只用该玩家当时可见的信息：对手为随机手牌
+    if not game.community_cards:
+        equity = preflop_equity(player.hand, opponents)
+    else:
+        equity = estimate_equity(player.hand, game.community_cards, opponents, equity_samples, rng)
+    spot = {
+        "session_id": None,
+        "hand_num": None,
+        "street": manager.current_round,
+        "player": player.name,
+        "llm_type": player.llm_type,
+        "hand": [str(c) for c in player.hand],
+        "board": [str(c) for c in game.community_cards],
+        "pot": sum(p.bet_in_hand for p in game.players),
+        "to_call": valid_actions.get('call', 0),
+        "stack": player.chips,
+        "big_blind": game.big_blind,
+        "opponents": opponents,
+        "valid_actions": valid_actions,
+        "original": action_log["parsed_action"],
+        "equity": equity,
+    }
+    # LLM座位的请求原样导出；内置策略没有提示词，按在线对局的方式重建
+    llm_input = action_log.get("llm_input") or {}
+    messages = llm_input.get("messages") or build_messages(
+        manager._get_game_state_text(player), f"[{' '.join(map(str, player.hand))}]", manager.system_prompt)
+    body = {"model": llm_input.get("model", player.llm_type), "messages": messages,
+            "temperature": llm_input.get("temperature", 0.7)}
+    return spot, body
+
+
+def export_spots(log_dir: str, out_dir: str, session_id: str = None, model: str = None, max_tokens: int = None,
+                 equity_samples: int = EQUITY_SAMPLES, seed: int = 0) -> Dict[str, int]:
+    """逐手复盘日志，只导出复盘与日志一致的手牌：元数据写入 spots.jsonl，请求写入 batch_input.jsonl，两者按 custom_id 对应.
+    model 覆盖请求中的模型名（批处理运行器通常要求与加载的模型一致）."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    pending = []
+    counts = {"spots": 0, "hands": 0, "skipped_hands": 0}
+
+    def on_decision(manager, player, action_log):
+        # 导入牌谱中底牌未亮出的玩家（player_hand 为空）没有可评估的决策点
+        if action_log.get("player_hand") == []: return
+        pending.append(_spot(manager, player, action_log, equity_samples, rng))
+
+    with open(out_dir / SPOTS_FILENAME, 'w', encoding='utf-8') as spots_f, \
+            open(out_dir / BATCH_FILENAME, 'w', encoding='utf-8') as batch_f:
+        for result in replay_logs(log_dir, session_id, on_decision=on_decision):
+            if result["status"] != "ok":
+                counts["skipped_hands"] += 1
+                pending.clear()
+                continue
+            for i, (spot, body) in enumerate(pending):
+                custom_id = f"{result['session_id']}/{result['hand_num']}/{i}"
+                spot.update(custom_id=custom_id, session_id=result["session_id"], hand_num=result["hand_num"])
+                if model: body["model"] = model
+                if max_tokens: body["max_tokens"] = max_tokens
+                spots_f.write(json.dumps(spot, ensure_ascii=False) + "\n")
+                batch_f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_URL, "body": body},
+                                         ensure_ascii=False) + "\n")
+            counts["spots"] += len(pending)
+            counts["hands"] += 1
+            pending.clear()
+    return counts
+
+
+def run_batch(input_path: str, output_path: str, llm_type: str, concurrency: int = 16) -> Dict[str, int]:
+    """用 LLM_CONFIGS 中的端点执行批量输入，按 OpenAI Batch 输出格式逐行追加写入；输出中已有的 custom_id 会跳过，中断后可续跑."""
+    output_path = Path(output_path)
+    done = set()
+    if output_path.exists():
+        with open(output_path, 'r', encoding='utf-8') as f:
+            done = {json.loads(line)["custom_id"] for line in f if line.strip()}
+    client = get_client(llm_type)
+    counts = {"ok": 0, "errors": 0, "skipped": len(done)}
+    lock = threading.Lock()
+    # 限制在途请求数，输入文件再大也不会一次性读入内存
+    slots = threading.BoundedSemaphore(concurrency * 2)
+
+    def run(request: Dict[str, Any], out):
+        try:
+            response = client.client.chat.completions.create(**dict(request["body"], model=client.model))
+            record = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"],
+                      "response": {"status_code": 200, "body": response.model_dump()}, "error": None}
+        except Exception as e:
+            record = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"],
+                      "response": None, "error": {"message": str(e)}}
+        with lock:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            counts["ok" if record["error"] is None else "errors"] += 1
+        slots.release()
+
+    with open(input_path, 'r', encoding='utf-8') as f, open(output_path, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for line in f:
+            if not line.strip(): continue
+            request = json.loads(line)
+            if request["custom_id"] in done: continue
+            slots.acquire()
+            pool.submit(run, request, out)
+    return counts
+
+
+def _result_text(record: Dict[str, Any]) -> Optional[str]:
+    """批量输出中一条结果的回复正文，请求失败时返回 None."""
+    response = record.get("response") or {}
+    if record.get("error") or response.get("status_code", 200) != 200: return None
+    try:
+        return response["body"]["choices"][0]["message"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def score_decision(spot: Dict[str, Any], parsed_action: Dict[str, Any]) -> Dict[str, Any]:
+    """按在线对局的规则修正动作后打分：继续（跟注/过牌/加注）的近似EV为 胜率x(底池+跟注额)-跟注额，弃牌为0，
+    EV损失是所选动作与两者中较优者之差（以大盲为单位），不计加注的弃牌收益."""
+    valid_actions = spot["valid_actions"]
+    legal = parsed_action['action'] in valid_actions
+    action = legalize_action(dict(parsed_action), valid_actions)
+    continue_ev = spot["equity"] * (spot["pot"] + spot["to_call"]) - spot["to_call"]
+    chosen_ev = 0.0 if action['action'] == 'fold' else continue_ev
+    return {
+        "action": action,
+        "legal": legal,
+        "agree": action['action'] == spot["original"]['action'],
+        "ev_loss_bb": (max(0.0, continue_ev) - chosen_ev) / spot["big_blind"],
+    }
+
+
+def _summarize(rows: List[Dict[str, Any]], total: int) -> Dict[str, float]:
+    answered = len(rows)
+    mean = lambda key: sum(r[key] for r in rows) / answered if answered else 0.0
+    return {"spots": total, "answered": answered, "errors": total - answered, "legal_rate": mean("legal"),
+            "agree_rate": mean("agree"), "fold_rate": sum(r["action"]['action'] == 'fold' for r in rows) / answered if answered else 0.0,
+            "ev_loss_bb": mean("ev_loss_bb")}
+
+
+def ingest_results(spots_path: str, results_path: str, output_path: str = None, label: str = None) -> Dict[str, Dict[str, float]]:
+    """导入批量推理结果并打分。返回 {标签: 汇总}，包括按原始 llm_type 分组的原始决策和新模型在同一批决策点上的表现；
+    output_path 指定时写出每个决策点的打分明细."""
+    with open(spots_path, 'r', encoding='utf-8') as f:
+        spots = {s["custom_id"]: s for s in map(json.loads, f) if s}
+    answers: Dict[str, str] = {}
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip(): continue
+            record = json.loads(line)
+            text = _result_text(record)
+            if record["custom_id"] in spots and text is not None:
+                answers[record["custom_id"]] = text
+                if label is None: label = ((record["response"] or {}).get("body") or {}).get("model")
+    label = label or "batch"
+
+    original: Dict[str, List[Dict[str, Any]]] = {}
+    scored: List[Dict[str, Any]] = []
+    out = open(output_path, 'w', encoding='utf-8') if output_path else None
+    try:
+        for custom_id, spot in spots.items():
+            original.setdefault(spot["llm_type"], []).append(score_decision(spot, spot["original"]))
+            if custom_id not in answers: continue
+            row = score_decision(spot, parse_action(answers[custom_id]))
+            scored.append(row)
+            if out: out.write(json.dumps({"custom_id": custom_id, "original": spot["original"], **row}, ensure_ascii=False) + "\n")
+    finally:
+        if out: out.close()
+
+    summary = {f"原始: {llm_type}": _summarize(rows, len(rows)) for llm_type, rows in sorted(original.items())}
+    summary[label] = _summarize(scored, len(spots))
+    return summary
+
+
+def print_summary(console: Console, summary: Dict[str, Dict[str, float]]):
+    table = Table(title="离线批量评估 (同一批决策点)")
+    table.add_column("决策来源", style="magenta")
+    table.add_column("决策点", style="white")
+    table.add_column("有效回复", style="white")
+    table.add_column("合法率", style="green")
+    table.add_column("与原始一致", style="cyan")
+    table.add_column("弃牌率", style="yellow")
+    table.add_column("平均EV损失(bb)", style="red")
+    for name, s in summary.items():
+        table.add_row(name, str(s["spots"]), str(s["answered"]), f"{s['legal_rate']:.1%}", f"{s['agree_rate']:.1%}",
+                      f"{s['fold_rate']:.1%}", f"{s['ev_loss_bb']:.3f}")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线批量评估：导出日志中的决策点、批量推理、导入结果打分")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="复盘日志，导出决策点元数据和 OpenAI Batch 格式的批量输入")
+    export.add_argument("--log-dir", "-d", default="logs", help="日志目录")
+    export.add_argument("--session", "-s", help="只导出特定会话")
+    export.add_argument("--out", "-o", required=True, help=f"输出目录，写入 {SPOTS_FILENAME} 和 {BATCH_FILENAME}")
+    export.add_argument("--model", help="批量请求中的模型名 (默认: 沿用原请求)")
+    export.add_argument("--max-tokens", type=int, help="每个请求的 max_tokens (默认: 不限制)")
+    export.add_argument("--equity-samples", type=int, default=EQUITY_SAMPLES, help=f"翻牌后胜率的蒙特卡洛样本数 (默认: {EQUITY_SAMPLES})")
+
+    run = sub.add_parser("run", help="用 config.py 中的端点并发执行批量输入（没有离线批处理运行器时使用）")
+    run.add_argument("input", help=f"批量输入文件（{BATCH_FILENAME}）")
+    run.add_argument("output", help="批量输出文件，已存在时跳过已完成的请求")
+    run.add_argument("--llm-type", required=True, help="LLM_CONFIGS 中的类型")
+    run.add_argument("--concurrency", type=int, default=16, help="并发请求数 (默认: 16)")
+
+    ingest = sub.add_parser("ingest", help="导入批量输出并与原始决策、胜率对比打分")
+    ingest.add_argument("spots", help=f"决策点元数据（{SPOTS_FILENAME}）")
+    ingest.add_argument("results", help="批量输出文件")
+    ingest.add_argument("--label", help="结果的显示名称 (默认: 回复中的模型名)")
+    ingest.add_argument("--output", help="写出每个决策点的打分明细 (JSONL)")
+    args = parser.parse_args()
+
+    console = Console()
+    if args.command == "export":
+        counts = export_spots(args.log_dir, args.out, args.session, args.model, args.max_tokens, args.equity_samples)
+        console.print(f"[bold green]已导出 {counts['spots']} 个决策点[/bold green] (来自 {counts['hands']} 手牌, "
+                      f"跳过 {counts['skipped_hands']} 手复盘不一致或缺少座位信息的手牌) → {args.out}")
+    elif args.command == "run":
+        counts = run_batch(args.input, args.output, args.llm_type, args.concurrency)
+        console.print(f"[bold green]完成 {counts['ok']} 个请求[/bold green], 失败 {counts['errors']}, 已存在跳过 {counts['skipped']}")
+    else:
+        print_summary(console, ingest_results(args.spots, args.results, args.output, args.label))
+
+
+if __name__ == "__main__":
+    main()
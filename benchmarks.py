@@ -0,0 +1,285 @@
+# benchmarks.py
+
+"""
+性能基准 - 使用固定随机种子的可复现基准测试，覆盖牌型评估、边池计算、摊牌、提示词构建、动作解析和日志写入，
+结果可保存为 JSON，并与其他提交的结果对比
+"""
+
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+from config import GAME_CONFIG, LLM_CONFIGS
+from game_manager import GameManager
+from llm_client import LLMClient
+from logger import GameLogger
+from poker_engine import PokerGame, Card, RANKS, SUITS
+from vector_engine import VectorPokerGame, random_policy
+
+# name -> (说明, setup)；setup(rng, scale) 返回 (单次运行函数, 每次运行包含的操作数)
+BENCHMARKS: Dict[str, Tuple[str, Callable]] = {}
+
+
+def benchmark(name: str, description: str):
+    def register(setup):
+        BENCHMARKS[name] = (description, setup)
+        return setup
+    return register
+
+
+def _full_deck() -> List[Card]:
+    return [Card(rank, suit) for rank in RANKS for suit in SUITS]
+
+
+def _new_game(num_players: int, chips: int = GAME_CONFIG['starting_chips']) -> PokerGame:
+    players = [{"name": f"Player-{i+1}", "llm_type": "bench"} for i in range(num_players)]
+    return PokerGame(players, chips, GAME_CONFIG['small_blind'], GAME_CONFIG['big_blind'], seed=0)
+
+
+def _all_in_spot(rng: random.Random, num_players: int) -> PokerGame:
+    """每位玩家在不同的金额全下（最后一位有剩余筹码、一位已弃牌），底牌和公共牌随机."""
+    game = _new_game(num_players)
+    deck = _full_deck()
+    rng.shuffle(deck)
+    game.community_cards = [deck.pop() for _ in range(5)]
+    levels = sorted(rng.sample(range(GAME_CONFIG['big_blind'], 50 * GAME_CONFIG['big_blind']), num_players))
+    for p, level in zip(game.players, levels):
+        p.reset_for_new_hand()
+        p.hand = [deck.pop(), deck.pop()]
+        p.bet_in_hand = level
+        p.chips = 0
+        p.is_all_in = True
+    game.players[-1].chips, game.players[-1].is_all_in = GAME_CONFIG['starting_chips'], False
+    game.players[0].is_active = False
+    return game
+
+
+@benchmark("evaluate_hand", "PokerGame._evaluate_hand，随机5张牌")
+def bench_evaluate_hand(rng: random.Random, scale: int):
+    game = _new_game(2)
+    deck = _full_deck()
+    hands = [rng.sample(deck, 5) for _ in range(2000 * scale)]
+
+    def run():
+        for hand in hands: game._evaluate_hand(hand)
+    return run, len(hands)
+
+
+@benchmark("best_hand", "PokerGame._get_best_hand，随机7张牌（21种组合）")
+def bench_best_hand(rng: random.Random, scale: int):
+    game = _new_game(2)
+    player = game.players[0]
+    deck = _full_deck()
+    spots = [rng.sample(deck, 7) for _ in range(200 * scale)]
+
+    def run():
+        for cards in spots:
+            game.community_cards, player.hand = cards[:5], cards[5:]
+            game._get_best_hand(player)
+    return run, len(spots)
+
+
+@benchmark("side_pots", "PokerGame.collect_bets_and_manage_pots，满桌各玩家不同金额全下")
+def bench_side_pots(rng: random.Random, scale: int):
+    games = [_all_in_spot(rng, GAME_CONFIG['max_players']) for _ in range(500 * scale)]
+
+    def run():
+        for game in games: game.collect_bets_and_manage_pots()
+    return run, len(games)
+
+
+@benchmark("determine_winners", "PokerGame.determine_winners，满桌多个边池摊牌")
+def bench_determine_winners(rng: random.Random, scale: int):
+    games = [_all_in_spot(rng, GAME_CONFIG['max_players']) for _ in range(50 * scale)]
+    for game in games: game.collect_bets_and_manage_pots()
+
+    def run():
+        for game in games: game.determine_winners()
+    return run, len(games)
+
+
+@benchmark("game_state_text", "GameManager._get_game_state_text，满桌且下注历史很长")
+def bench_game_state_text(rng: random.Random, scale: int):
+    # 不调用构造函数：基准只需要牌局和下注历史，不创建LLM客户端和日志目录
+    manager = GameManager._bare(_new_game(GAME_CONFIG['max_players']))
+    manager.game.start_new_hand()
+    manager.game.start_betting_round("preflop")
+    manager.action_history = [
+        f"Player-{rng.randint(1, GAME_CONFIG['max_players'])} 加注到 {rng.randint(1, 500) * 10}"
+        for _ in range(2000)
+    ]
+    players = manager.game.players
+
+    def run():
+        for _ in range(50 * scale):
+            for p in players: manager._get_game_state_text(p)
+    return run, 50 * scale * len(players)
+
+
+@benchmark("parse_action", "LLMClient._parse_action，约50KB推理文本后跟 <action> 标签")
+def bench_parse_action(rng: random.Random, scale: int):
+    client = LLMClient(next(iter(LLM_CONFIGS)))
+    words = ["底池赔率", "对手范围", "raise", "call", "fold", "check", "equity", "位置", "同花听牌", "2500"]
+    outputs = []
+    for amount in range(20 * scale):
+        reasoning = " ".join(rng.choice(words) for _ in range(10_000))
+        outputs.append(f"<think>{reasoning}</think>\n<action>raise {100 + amount * 20}</action>")
+
+    def run():
+        for text in outputs: client._parse_action(text)
+    return run, len(outputs)
+
+
+@benchmark("logger_write", "GameLogger.log_hand_end，满桌四轮下注的手牌日志写入")
+def bench_logger_write(rng: random.Random, scale: int):
+    tmp_dir = tempfile.mkdtemp(prefix="llm_poker_bench_")
+    atexit.register(shutil.rmtree, tmp_dir, ignore_errors=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        logger = GameLogger(log_dir=tmp_dir)
+        game = _new_game(GAME_CONFIG['max_players'])
+        game.start_new_hand()
+        logger.log_hand_start(1, {"num_players": game.num_players})
+        logger.log_hand_setup(game.players[0].name, game.players, game.deck_seed)
+    prompt = "\n".join(f"Player-{rng.randint(1, 6)} 加注到 {rng.randint(1, 500) * 10}" for _ in range(200))
+    for round_name in ["preflop", "flop", "turn", "river"]:
+        logger.log_round_start(round_name, [])
+        for p in game.players:
+            llm_input = {"model": "bench", "messages": [{"role": "user", "content": prompt}]}
+            logger.log_player_action(p.name, p.hand, llm_input, "<action>call</action>", {"action": "call"}, f"{p.name} 跟注 20")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(20 * scale): logger.log_hand_end({p.name: p.chips for p in game.players})
+    return run, 20 * scale
+
+
+@benchmark("vector_hands", "VectorPokerGame.play_hand，1000张满桌同步进行一手牌，随机策略（每次操作为一手牌）")
+def bench_vector_hands(rng: random.Random, scale: int):
+    game = VectorPokerGame(1000 * scale, GAME_CONFIG['max_players'], GAME_CONFIG['starting_chips'],
+                           seed=rng.randrange(2**32), reset_stacks=True)
+    policy = random_policy(rng.randrange(2**32))
+
+    def run(): game.play_hand(policy)
+    return run, game.num_tables
+
+
+def run_benchmark(name: str, seed: int, repeat: int, scale: int) -> Dict[str, Any]:
+    description, setup = BENCHMARKS[name]
+    run, ops = setup(random.Random(f"{seed}:{name}"), scale)
+    run()  # 预热
+    per_op = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        per_op.append((time.perf_counter() - start) / ops)
+    median = statistics.median(per_op)
+    return {
+        "description": description,
+        "ops": ops,
+        "repeat": repeat,
+        "min_us": min(per_op) * 1e6,
+        "median_us": median * 1e6,
+        "mean_us": statistics.mean(per_op) * 1e6,
+        "ops_per_sec": 1 / median if median > 0 else 0.0
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_all(names: List[str], seed: int, repeat: int, scale: int) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "scale": scale
+        },
+        "benchmarks": {name: run_benchmark(name, seed, repeat, scale) for name in names}
+    }
+
+
+def print_results(console: Console, results: Dict[str, Any], baseline: Dict[str, Any] = None):
+    meta = results["meta"]
+    title = f"基准测试结果 (commit {meta['commit'] or '?'}, 种子 {meta['seed']})"
+    if baseline: title += f" vs 基线 (commit {baseline['meta'].get('commit') or '?'})"
+    table = Table(title=title)
+    table.add_column("基准", style="cyan")
+    table.add_column("操作数", style="white")
+    table.add_column("中位数 µs/次", style="green")
+    table.add_column("最小 µs/次", style="green")
+    table.add_column("次/秒", style="yellow")
+    if baseline:
+        table.add_column("基线 µs/次", style="blue")
+        table.add_column("耗时比", style="magenta")
+
+    for name, r in results["benchmarks"].items():
+        row = [name, str(r["ops"]), f"{r['median_us']:.2f}", f"{r['min_us']:.2f}", f"{r['ops_per_sec']:,.0f}"]
+        if baseline:
+            base = baseline["benchmarks"].get(name)
+            if base:
+                ratio = r["median_us"] / base["median_us"] if base["median_us"] > 0 else float("inf")
+                # 耗时变化在5%以内视为噪声
+                style = "green" if ratio < 0.95 else "red" if ratio > 1.05 else "white"
+                row += [f"{base['median_us']:.2f}", f"[{style}]{ratio:.2f}x[/{style}]"]
+            else:
+                row += ["N/A", "N/A"]
+        table.add_row(*row)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="引擎、提示词构建、动作解析和日志写入的可复现性能基准")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="只运行指定的基准")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+    parser.add_argument("--repeat", type=int, default=5, help="每个基准重复次数，取中位数 (默认: 5)")
+    parser.add_argument("--scale", type=int, default=1, help="输入规模倍数 (默认: 1)")
+    parser.add_argument("--output", "-o", help="结果保存为JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果对比")
+    parser.add_argument("--list", action="store_true", help="列出所有基准")
+    args = parser.parse_args()
+
+    console = Console()
+    if args.list:
+        for name, (description, _) in BENCHMARKS.items(): console.print(f"[cyan]{name}[/cyan]: {description}")
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f: baseline = json.load(f)
+
+    results = run_all(args.only or list(BENCHMARKS), args.seed, args.repeat, args.scale)
+    print_results(console, results, baseline)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        console.print(f"[bold blue]结果已保存到:[/bold blue] [u]{args.output}[/u]")
+
+
+if __name__ == "__main__":
+    main()
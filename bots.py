@@ -0,0 +1,174 @@
+# bots.py
+
+"""
+内置基线策略 - 不调用LLM的脚本玩家（随机、跟注站、紧凶、胜率阈值），在 BOT_CONFIGS 中注册，
+和LLM一样通过 llm_type 分配到座位，动作合法性由 GameManager._get_valid_actions 统一处理
+"""
+
+import random
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from config import BOT_CONFIGS
+from poker_engine import Card, best_hand_rank
+from vector_engine import card_code, best_scores
+
+# 翻牌前起手牌分级（紧凶策略），s=同花 o=不同花，对子不区分
+PREFLOP_TIERS = [
+    {"AA", "KK", "QQ", "JJ", "AKs", "AKo"},
+    {"TT", "99", "AQs", "AQo", "AJs", "KQs"},
+    {"88", "77", "ATs", "KJs", "QJs", "JTs", "AJo", "KQo"},
+    {"66", "55", "44", "33", "22", "A9s", "A8s", "A7s", "A6s", "A5s", "A4s", "A3s", "A2s",
+     "KTs", "QTs", "T9s", "98s", "87s", "76s", "65s", "ATo", "KJo"},
+]
+
+
+def hand_class(hand: List[Card]) -> str:
+    """两张底牌的起手牌记法，如 AKs / T9o / 77."""
+    high, low = sorted(hand, key=lambda c: c.value, reverse=True)
+    if high.rank == low.rank: return high.rank * 2
+    return f"{high.rank}{low.rank}{'s' if high.suit == low.suit else 'o'}"
+
+
+def preflop_tier(hand: List[Card]) -> int:
+    """起手牌等级 1-4，不在表中返回 0."""
+    cls = hand_class(hand)
+    return next((i for i, tier in enumerate(PREFLOP_TIERS, 1) if cls in tier), 0)
+
+
+def estimate_equity(hand: List[Card], board: List[Card], num_opponents: int, samples: int,
+                    rng: np.random.Generator) -> float:
+    """对 num_opponents 个随机手牌的蒙特卡洛胜率（平局按人数均分），用向量化牌力评估一次算完所有样本."""
+    if num_opponents <= 0: return 1.0
+    known = np.array([card_code(c) for c in hand + board], dtype=np.int64)
+    stub = np.setdiff1d(np.arange(52), known)
+    missing = 5 - len(board)
+    draws = stub[np.argsort(rng.random((samples, len(stub))), axis=1)[:, :missing + 2 * num_opponents]]
+    boards = np.concatenate([np.broadcast_to(known[2:], (samples, len(board))), draws[:, :missing]], 1)
+    hero = best_scores(np.concatenate([np.broadcast_to(known[:2], (samples, 2)), boards], 1))
+    opp_holes = draws[:, missing:].reshape(samples, num_opponents, 2)
+    opp_boards = np.broadcast_to(boards[:, None, :], (samples, num_opponents, 5))
+    opp = best_scores(np.concatenate([opp_holes, opp_boards], 2).reshape(-1, 7)).reshape(samples, num_opponents)
+    best_opp = opp.max(1)
+    ties = (opp == hero[:, None]).sum(1)
+    shares = np.where(hero > best_opp, 1.0, np.where(hero == best_opp, 1.0 / (ties + 1), 0.0))
+    return float(shares.mean())
+
+
+# 翻牌前胜率只取决于起手牌记法和对手人数：按 (记法, 对手数) 以固定种子算一次后缓存，之后查表即可
+PREFLOP_EQUITY_SAMPLES = 1000
+_PREFLOP_EQUITY: Dict[Tuple[str, int], float] = {}
+
+
+def preflop_equity(hand: List[Card], num_opponents: int) -> float:
+    key = (hand_class(hand), num_opponents)
+    if key not in _PREFLOP_EQUITY:
+        rng = np.random.default_rng([ord(ch) for ch in key[0]] + [num_opponents])
+        _PREFLOP_EQUITY[key] = estimate_equity(hand, [], num_opponents, PREFLOP_EQUITY_SAMPLES, rng)
+    return _PREFLOP_EQUITY[key]
+
+
+def _board_category(board: List[Card]) -> int:
+    """公共牌本身的牌型类别（与 hand_rank 的类别编号一致），用于判断底牌是否真正改进了牌力."""
+    if len(board) == 5: return best_hand_rank(board)[0]
+    counts = sorted((sum(1 for c in board if c.rank == r) for r in {c.rank for c in board}), reverse=True)
+    if counts[0] == 4: return 8
+    if counts[0] == 3: return 7 if len(counts) > 1 and counts[1] == 2 else 4
+    if counts[0] == 2: return 3 if len(counts) > 1 and counts[1] == 2 else 2
+    return 1
+
+
+# --- 动作辅助：返回动作字典，加注额在这里先修正到合法范围 ---
+
+def _check_or_fold(valid: Dict) -> Dict[str, Any]:
+    return {'action': 'check'} if 'check' in valid else {'action': 'fold'}
+
+
+def _check_or_call(valid: Dict) -> Dict[str, Any]:
+    return {'action': 'check'} if 'check' in valid else {'action': 'call'}
+
+
+def _raise_to(valid: Dict, total: int) -> Dict[str, Any]:
+    if 'raise' not in valid: return _check_or_call(valid)
+    return {'action': 'raise', 'amount': max(valid['raise']['min'], min(int(total), valid['raise']['max']))}
+
+
+def _spot(game, player) -> Tuple[int, int]:
+    """(需要跟注额, 当前底池总额)."""
+    return min(game.current_bet - player.bet_in_round, player.chips), sum(p.bet_in_hand for p in game.players)
+
+
+# --- 策略：policy(bot, game, player, valid_actions) -> 动作字典 ---
+
+_RANDOM_WEIGHTS = {'fold': 1, 'check': 2, 'call': 2, 'raise': 1, 'all-in': 0.2}
+
+
+def random_policy(bot: "BotClient", game, player, valid: Dict) -> Dict[str, Any]:
+    """按权重在合法动作中随机选择（可以免费过牌时不弃牌），加注额在合法范围内均匀分布."""
+    names = [a for a in _RANDOM_WEIGHTS if a in valid and not (a == 'fold' and 'check' in valid)]
+    action = bot.rng.choices(names, weights=[_RANDOM_WEIGHTS[a] for a in names])[0]
+    if action == 'raise': return {'action': 'raise', 'amount': bot.rng.randint(valid['raise']['min'], valid['raise']['max'])}
+    return {'action': action}
+
+
+def call_policy(bot: "BotClient", game, player, valid: Dict) -> Dict[str, Any]:
+    """跟注站：能过牌就过牌，否则跟注."""
+    return _check_or_call(valid)
+
+
+def tag_policy(bot: "BotClient", game, player, valid: Dict) -> Dict[str, Any]:
+    """紧凶：翻牌前按起手牌等级开池/跟注，翻牌后只用两对以上价值下注、顶对小额下注和有限跟注."""
+    to_call, pot = _spot(game, player)
+    bb = game.big_blind
+    if not game.community_cards:
+        tier = preflop_tier(player.hand)
+        if tier == 1: return _raise_to(valid, 3 * max(game.current_bet, bb))
+        limit = {2: 6 * bb, 3: 3 * bb, 4: bb}.get(tier, 0)
+        if tier in (2, 3) and game.current_bet <= bb: return _raise_to(valid, 3 * bb)
+        return _check_or_call(valid) if game.current_bet <= limit else _check_or_fold(valid)
+
+    category, tiebreak = best_hand_rank(player.hand + game.community_cards)
+    board_high = max(c.value for c in game.community_cards)
+    if category >= 3 and category > _board_category(game.community_cards):
+        if to_call == 0: return _raise_to(valid, game.current_bet + pot * 3 // 4)
+        return _raise_to(valid, 3 * game.current_bet)
+    if category == 2 and tiebreak[0] >= board_high and any(c.value == tiebreak[0] for c in player.hand):
+        if to_call == 0: return _raise_to(valid, game.current_bet + pot // 2)
+        return _check_or_call(valid) if to_call <= pot // 2 else _check_or_fold(valid)
+    return _check_or_fold(valid)
+
+
+def equity_policy(bot: "BotClient", game, player, valid: Dict) -> Dict[str, Any]:
+    """胜率阈值：对仍在局中的对手估算胜率（翻牌前查缓存表，翻牌后蒙特卡洛），高于 raise_equity 时底池大小加注，高于底池赔率加 call_margin 时跟注."""
+    to_call, pot = _spot(game, player)
+    num_opponents = sum(1 for p in game.players if p.is_active and p is not player)
+    if not game.community_cards:
+        equity = preflop_equity(player.hand, num_opponents)
+    else:
+        equity = estimate_equity(player.hand, game.community_cards, num_opponents, bot.config.get('samples', 200),
+                                 np.random.default_rng(bot.rng.getrandbits(64)))
+    if equity >= bot.config.get('raise_equity', 0.7): return _raise_to(valid, game.current_bet + pot + to_call)
+    if to_call == 0: return {'action': 'check'}
+    pot_odds = to_call / (pot + to_call)
+    return {'action': 'call'} if equity >= pot_odds + bot.config.get('call_margin', 0.0) else {'action': 'fold'}
+
+
+POLICIES = {"random": random_policy, "call": call_policy, "tag": tag_policy, "equity": equity_policy}
+
+
+class BotClient:
+    """与 LLMClient 并列的决策端：不构建提示词，直接读取牌局对象给出动作."""
+
+    def __init__(self, llm_type: str, seed=None):
+        if llm_type not in BOT_CONFIGS:
+            raise ValueError(f"不支持的LLM类型: {llm_type}")
+        self.llm_type = llm_type
+        self.config = BOT_CONFIGS[llm_type]
+        self.policy = POLICIES[self.config["policy"]]
+        self.rng = random.Random(seed)
+
+    def get_action(self, game, player, valid_actions: Dict) -> tuple:
+        parsed_action = self.policy(self, game, player, valid_actions)
+        raw_output = f"{parsed_action['action']} {parsed_action['amount']}" if 'amount' in parsed_action else parsed_action['action']
+        return parsed_action, {"model": self.llm_type, "policy": self.config["policy"]}, raw_output
@@ -0,0 +1,94 @@
+# budget.py
+
+"""
+推理预算 - 按决策点的重要性（底池与有效筹码之比、面对的下注占剩余筹码之比、街、仍在局中的人数）为每次LLM请求
+选择 max_tokens 和推理强度：大多数低风险决策只给小预算，大底池的关键决策才用满预算。每档随机抽出一小部分决策按满预算请求作为对照组，
+按同档对照组的平均值估算每次运行节省的token和耗时
+"""
+
+import random
+from typing import Dict, Any, List, NamedTuple, Optional
+
+from config import BUDGET_CONFIG
+
+
+class Budget(NamedTuple):
+    tier: str
+    importance: float
+    max_tokens: Optional[int]
+    reasoning_effort: Optional[str]
+    control: bool = False
+
+
+def spot_features(game, player, street: str) -> Dict[str, float]:
+    """决策点特征，均归一化到 [0, 1]."""
+    live = [p for p in game.players if p.is_active]
+    opponents = [p for p in live if p is not player]
+    # 有效筹码按本手开始时计算：双方中较少的一方最多能输掉的筹码
+    stack = player.chips + player.bet_in_hand
+    effective = min(stack, max((p.chips + p.bet_in_hand for p in opponents), default=stack))
+    pot = sum(p.bet_in_hand for p in game.players)
+    to_call = min(game.current_bet - player.bet_in_round, player.chips)
+    return {
+        "pot": min(1.0, pot / max(1, effective)),
+        "facing": to_call / player.chips if player.chips else 0.0,
+        "street": BUDGET_CONFIG["street_scores"].get(street, 0.0),
+        "players": (len(live) - 2) / (len(game.players) - 2) if len(game.players) > 2 else 0.0,
+    }
+
+
+def choose_budget(features: Dict[str, float], config: Dict[str, Any] = BUDGET_CONFIG,
+                  rng: random.Random = None) -> Budget:
+    """重要性为特征的加权和，落入第一个 max_importance 不低于它的档位（最后一档兜底）.
+    以 control_rate 的概率改用最高档（满预算）请求，档位不变并标记为对照组."""
+    importance = sum(w * features.get(name, 0.0) for name, w in config["weights"].items())
+    tiers = config["tiers"]
+    tier = next((t for t in tiers if importance <= t["max_importance"]), tiers[-1])
+    if (rng or random).random() < config.get("control_rate", 0.0):
+        return Budget(tier["name"], round(importance, 4), tiers[-1].get("max_tokens"), tiers[-1].get("reasoning_effort"), True)
+    return Budget(tier["name"], round(importance, 4), tier.get("max_tokens"), tier.get("reasoning_effort"))
+
+
+def budget_report(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """从指标快照汇总每个 llm_type 各档位按预算请求的决策数、平均completion token、平均耗时和截断次数.
+    对照组与预算组的决策点按同一规则分档且随机抽取，节省量 = (同档对照组平均值 - 预算组平均值) × 预算组决策数；
+    该档没有对照样本时无法估算（None）."""
+    rows: Dict[tuple, Dict[str, Any]] = {}
+
+    def row(labels):
+        key = (labels["llm_type"], labels["tier"])
+        if key not in rows:
+            rows[key] = {"llm_type": key[0], "tier": key[1], "decisions": 0, "tokens": 0, "seconds": 0.0, "truncated": 0,
+                         "control_decisions": 0, "control_tokens": 0, "control_seconds": 0.0}
+        return rows[key]
+
+    def prefix(labels):
+        return "control_" if labels.get("group") == "control" else ""
+
+    for c in snapshot["counters"]:
+        if c["name"] == "llm_budget_completion_tokens_total": row(c["labels"])[prefix(c["labels"]) + "tokens"] += c["value"]
+        elif c["name"] == "llm_budget_truncated_total" and not prefix(c["labels"]): row(c["labels"])["truncated"] += c["value"]
+    for h in snapshot["histograms"]:
+        if h["name"] == "llm_budget_request_seconds":
+            r, p = row(h["labels"]), prefix(h["labels"])
+            r[p + "decisions"] += h["count"]
+            r[p + "seconds"] += h["sum"]
+
+    report = []
+    for _, r in sorted(rows.items(), key=lambda kv: (kv[0][0], _tier_index(kv[0][1]))):
+        decisions, control = r["decisions"], r["control_decisions"]
+        r["avg_tokens"] = r["tokens"] / decisions if decisions else 0.0
+        r["avg_seconds"] = r["seconds"] / decisions if decisions else 0.0
+        if control and decisions:
+            r["control_avg_tokens"] = r["control_tokens"] / control
+            r["saved_tokens"] = (r["control_avg_tokens"] - r["avg_tokens"]) * decisions
+            r["saved_seconds"] = (r["control_seconds"] / control - r["avg_seconds"]) * decisions
+        else:
+            r["control_avg_tokens"] = r["saved_tokens"] = r["saved_seconds"] = None
+        report.append(r)
+    return report
+
+
+def _tier_index(name: str) -> int:
+    names = [t["name"] for t in BUDGET_CONFIG["tiers"]]
+    return names.index(name) if name in names else len(names)
@@ -22,6 +22,14 @@ LLM_CONFIGS = {
     },
 }
 
+# 内置基线策略（不调用LLM），与LLM一样通过 llm_type 分配到座位
+BOT_CONFIGS = {
+    "bot_random": {"policy": "random"},
+    "bot_call": {"policy": "call"},
+    "bot_tag": {"policy": "tag"},
+    "bot_equity": {"policy": "equity", "samples": 200, "raise_equity": 0.7, "call_margin": 0.05},
+}
+
 # 游戏配置
 GAME_CONFIG = {
     "small_blind": 10,
@@ -31,6 +39,30 @@ GAME_CONFIG = {
     "min_players": 2
 }
 
+# 锦标赛配置：每桌人数上限、每个盲注级别持续的手数（按平均每桌计）、盲注表 [小盲, 大盲]
+TOURNAMENT_CONFIG = {
+    "table_size": 6,
+    "hands_per_level": 10,
+    "blind_levels": [[10, 20], [15, 30], [25, 50], [50, 100], [75, 150], [100, 200], [150, 300],
+                     [200, 400], [300, 600], [500, 1000], [1000, 2000], [2000, 4000]]
+}
+
+# 推理预算：重要性 = 各特征（均在0~1之间）的加权和，特征为底池/有效筹码(pot)、面对的下注/剩余筹码(facing)、
+# 街(street，按 street_scores 取值)、仍在局中的人数(players)；决策落入第一个 max_importance 不低于重要性的档位，
+# 使用该档的 max_tokens（None 为不限制）和 reasoning_effort（只发送给 LLM_CONFIGS 中设置了 "reasoning_effort": True 的模型）
+BUDGET_CONFIG = {
+    "enabled": False,
+    "weights": {"pot": 0.35, "facing": 0.4, "street": 0.15, "players": 0.1},
+    "street_scores": {"preflop": 0.0, "flop": 0.4, "turn": 0.7, "river": 1.0},
+    "tiers": [
+        {"name": "low", "max_importance": 0.2, "max_tokens": 1024, "reasoning_effort": "low"},
+        {"name": "medium", "max_importance": 0.45, "max_tokens": 4096, "reasoning_effort": "medium"},
+        {"name": "high", "max_importance": 1.0, "max_tokens": None, "reasoning_effort": "high"},
+    ],
+    # 每档随机抽出这一比例的决策按最高档请求，作为估算节省量的对照组
+    "control_rate": 0.05,
+}
+
 # LLM提示词配置
 PROMPT_CONFIG = {
     "system_prompt": """你是一个专业的德州扑克AI玩家。你的任务是根据当前牌局信息，做出最优的决策。
@@ -42,5 +74,7 @@ PROMPT_CONFIG = {
 - `raise [金额]`：如果你决定加注。**[金额]必须是你加注后，在当前轮次的总下注额**。例如，当前下注是20，你想加注到80，你应该回复 `raise 80`。
 - `all-in`：如果你决定全下所有筹码。
 
-请在<action>...</action>标签中只回复一个动作指令，不要包含任何解释或额外文字。"""
+请在<action>...</action>标签中只回复一个动作指令，不要包含任何解释或额外文字。""",
+    # 在提示词中为每位对手显示一行会话累计统计（VPIP/PFR/AF/FtCB）
+    "show_hud": False
 }
\ No newline at end of file
@@ -0,0 +1,189 @@
+# decision_dataset.py
+
+"""
+列式决策数据集 - 复盘日志，把每个动作转成一行定长数值记录，每列一个 .npy 文件（可直接内存映射），字符串列存为整数编码加字典。
+分析和训练脚本 np.load(mmap_mode='r') 即可读取上百万个决策，不再反复解析嵌套的JSON；转换是增量的，只追加新完成的会话
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from replay import replay_logs
+from vector_engine import card_code
+
+DATASET_DIRNAME = "decisions"
+META_FILENAME = "meta.json"
+STREETS = ["preflop", "flop", "turn", "river"]
+ACTIONS = ["fold", "check", "call", "raise", "all-in"]
+# 列名 -> (dtype, 每行的元素数)；牌为 rank_idx*4+suit_idx，公共牌不足5张时用 -1 填充
+COLUMNS = {
+    "session": (np.int32, ()),
+    "hand": (np.int32, ()),
+    "street": (np.int8, ()),
+    "seat": (np.int8, ()),
+    "model": (np.int16, ()),
+    "hole": (np.int8, (2,)),
+    "board": (np.int8, (5,)),
+    "pot": (np.int32, ()),
+    "to_call": (np.int32, ()),
+    "stack": (np.int32, ()),
+    "action": (np.int8, ()),
+    "amount": (np.int32, ()),
+}
+# .npy 头部固定为128字节：追加数据后原地改写行数，不必移动已有数据
+_HEADER_LEN = 128
+
+
+def _write_header(f, dtype, shape: Tuple[int, ...]):
+    header = repr({"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": shape})
+    prefix = np.lib.format.magic(1, 0)
+    padding = _HEADER_LEN - len(prefix) - 2 - len(header) - 1
+    f.seek(0)
+    f.write(prefix + (len(header) + padding + 1).to_bytes(2, "little") + header.encode("latin1") + b" " * padding + b"\n")
+
+
+def _decision_row(manager, player, action_log: Dict[str, Any], ids: Dict[str, Dict[str, int]]) -> tuple:
+    game = manager.game
+    to_call = min(game.current_bet - player.bet_in_round, player.chips)
+    action = action_log["parsed_action"]
+    name = action['action']
+    # amount 为本次动作新投入的筹码
+    if name == 'call': amount = to_call
+    elif name == 'raise': amount = min(action.get('amount', 0) - player.bet_in_round, player.chips)
+    elif name == 'all-in': amount = player.chips
+    else: amount = 0
+    board = [card_code(c) for c in game.community_cards]
+    model = ids["model"].setdefault(player.llm_type, len(ids["model"]))
+    return (STREETS.index(manager.current_round), game.players.index(player) + 1, model,
+            [card_code(c) for c in player.hand], board + [-1] * (5 - len(board)),
+            sum(p.bet_in_hand for p in game.players), to_call, player.chips, ACTIONS.index(name), amount)
+
+
+def _finished(session_dir: Path) -> bool:
+    summary_file = session_dir / "session_summary.json"
+    if not summary_file.exists(): return False
+    with open(summary_file, 'r', encoding='utf-8') as f: return json.load(f).get("status") != "interrupted"
+
+
+class DecisionDataset:
+    def __init__(self, out_dir: str):
+        self.out_dir = Path(out_dir)
+        self.meta_path = self.out_dir / META_FILENAME
+        if self.meta_path.exists():
+            with open(self.meta_path, 'r', encoding='utf-8') as f: self.meta = json.load(f)
+        else:
+            self.meta = {"rows": 0, "sessions": [], "models": [], "streets": STREETS, "actions": ACTIONS,
+                         "columns": {name: {"dtype": np.dtype(dtype).str, "shape": list(shape)}
+                                     for name, (dtype, shape) in COLUMNS.items()}}
+
+    def update(self, log_dir: str) -> Dict[str, int]:
+        """转换 log_dir 中尚未转换的已结束会话，返回 {"sessions": 新增会话数, "rows": 新增行数}.
+        被中断的会话之后可能继续并追加手牌，等它正常结束再转换。
+        只追加复盘与日志一致的手牌；元数据最后原子替换，中途中断时下次运行会截掉未登记的行."""
+        log_dir = Path(log_dir)
+        done = set(self.meta["sessions"])
+        new_sessions = sorted(d.name for d in log_dir.iterdir()
+                              if d.is_dir() and d.name not in done and _finished(d)) if log_dir.exists() else []
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._truncate(self.meta["rows"])
+
+        ids = {"model": {m: i for i, m in enumerate(self.meta["models"])}}
+        added = 0
+        pending = []
+
+        def on_decision(manager, player, action_log):
+            # 导入牌谱中底牌未亮出的玩家（player_hand 为空）不转换
+            if action_log.get("player_hand") != []: pending.append(_decision_row(manager, player, action_log, ids))
+
+        for session_id in new_sessions:
+            session = len(self.meta["sessions"])
+            rows = []
+            for result in replay_logs(str(log_dir), session_id, on_decision=on_decision):
+                if result["status"] == "ok":
+                    rows.extend((session, result["hand_num"]) + row for row in pending)
+                pending.clear()
+            self._append(rows)
+            self.meta["sessions"].append(session_id)
+            added += len(rows)
+        self.meta["models"] = sorted(ids["model"], key=ids["model"].get)
+        self._save_meta()
+        return {"sessions": len(new_sessions), "rows": added}
+
+    def _append(self, rows: List[tuple]):
+        if not rows: return
+        columns = list(zip(*rows))
+        total = self.meta["rows"] + len(rows)
+        for (name, (dtype, shape)), values in zip(COLUMNS.items(), columns):
+            path = self.out_dir / f"{name}.npy"
+            with open(path, 'r+b' if path.exists() else 'w+b') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(f.tell(), _HEADER_LEN))
+                f.write(np.asarray(values, dtype=dtype).tobytes())
+                _write_header(f, dtype, (total,) + shape)
+        self.meta["rows"] = total
+
+    def _truncate(self, rows: int):
+        """截掉上次中断时写入了数据但没有登记到元数据的行."""
+        for name, (dtype, shape) in COLUMNS.items():
+            path = self.out_dir / f"{name}.npy"
+            if not path.exists(): continue
+            size = _HEADER_LEN + rows * np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+            if path.stat().st_size != size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+                    _write_header(f, dtype, (rows,) + shape)
+
+    def _save_meta(self):
+        tmp = self.meta_path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f: json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.meta_path)
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """按列内存映射（只读），字符串列的编码对应 meta 中的 sessions/models/streets/actions."""
+        if not self.meta["rows"]: return {name: np.zeros((0,) + shape, dtype=dtype) for name, (dtype, shape) in COLUMNS.items()}
+        return {name: np.load(self.out_dir / f"{name}.npy", mmap_mode='r') for name in COLUMNS}
+
+
+def print_overview(console: Console, dataset: DecisionDataset):
+    """按模型统计各动作的比例，直接在映射的列上计算."""
+    columns, meta = dataset.load(), dataset.meta
+    table = Table(title=f"决策数据集: {meta['rows']} 行, {len(meta['sessions'])} 个会话")
+    table.add_column("模型", style="magenta")
+    table.add_column("决策数", style="white")
+    for action in ACTIONS: table.add_column(action, style="green")
+    table.add_column("平均投入/底池", style="yellow")
+    counts = np.zeros((len(meta["models"]), len(ACTIONS)), dtype=np.int64)
+    np.add.at(counts, (columns["model"], columns["action"]), 1)
+    ratio = np.divide(columns["amount"], columns["pot"], out=np.zeros(len(columns["pot"])), where=columns["pot"] > 0)
+    for i, model in enumerate(meta["models"]):
+        total = counts[i].sum()
+        mask = columns["model"] == i
+        table.add_row(model, str(total), *(f"{c / total:.1%}" if total else "-" for c in counts[i]),
+                      f"{ratio[mask].mean():.2f}" if total else "-")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把日志增量转换为按列存储、可内存映射的决策数据集")
+    parser.add_argument("--log-dir", "-d", default="logs", help="日志目录")
+    parser.add_argument("--out", "-o", help=f"数据集目录 (默认: <日志目录>/{DATASET_DIRNAME})")
+    parser.add_argument("--info", action="store_true", help="只显示数据集概况，不转换")
+    args = parser.parse_args()
+
+    console = Console()
+    dataset = DecisionDataset(args.out or str(Path(args.log_dir) / DATASET_DIRNAME))
+    if not args.info:
+        counts = dataset.update(args.log_dir)
+        console.print(f"[bold green]新增 {counts['sessions']} 个会话, {counts['rows']} 行[/bold green] → {dataset.out_dir}")
+    print_overview(console, dataset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# duplicate.py
+
+"""
+复式对局 - 同一组带种子的牌序在不同座位分配下重复对局，按每手牌(deal)对冲发牌运气
+"""
+
+import itertools
+import math
+from typing import List, Dict, Any, Tuple
+
+from config import GAME_CONFIG
+from game_manager import GameManager
+
+
+def seat_rotations(llm_types: List[str]) -> List[Tuple[str, ...]]:
+    """循环轮换：n个座位共n组，每个模型在每个座位恰好坐一次."""
+    return [tuple(llm_types[i:] + llm_types[:i]) for i in range(len(llm_types))]
+
+
+def seat_permutations(llm_types: List[str]) -> List[Tuple[str, ...]]:
+    """全排列（去重），同时消除座位和相对位置（左右手对手）的影响."""
+    return list(dict.fromkeys(itertools.permutations(llm_types)))
+
+
+class DuplicateMatch:
+    def __init__(self, llm_types: List[str], starting_chips: int, seed: int, mode: str = "rotate"):
+        if mode not in ("rotate", "permute"):
+            raise ValueError(f"不支持的复式模式: {mode}")
+        self.llm_types = list(llm_types)
+        self.starting_chips = starting_chips
+        self.seed = seed
+        self.seatings = seat_rotations(self.llm_types) if mode == "rotate" else seat_permutations(self.llm_types)
+        # deal_results[hand_num][llm_type] = 该模型在这手牌上跨所有座位分配的筹码盈亏之和
+        self.deal_results: Dict[int, Dict[str, int]] = {}
+        self.session_ids: List[str] = []
+
+    def play(self, num_hands: int) -> Dict[str, Dict[str, float]]:
+        for idx, seating in enumerate(self.seatings, 1):
+            print(f"\n>>> 复式对局 第 {idx}/{len(self.seatings)} 组座位: {', '.join(seating)}")
+            manager = GameManager(len(seating), self.starting_chips, list(seating), seed=self.seed, reset_stacks=True)
+            manager.play_game(num_hands)
+            self.session_ids.append(manager.logger.session_id)
+
+            llm_map = {p.name: p.llm_type for p in manager.all_players}
+            for hand in manager.hand_results:
+                deal = self.deal_results.setdefault(hand["hand_num"], {})
+                for name, delta in hand["results"].items():
+                    deal[llm_map[name]] = deal.get(llm_map[name], 0) + delta
+        return self.get_results()
+
+    def get_results(self) -> Dict[str, Dict[str, float]]:
+        """每手牌的净结果按模型占据的座位次数取平均，再汇总为总分、每手均值、标准误和 bb/100."""
+        seat_counts = {t: sum(seating.count(t) for seating in self.seatings) for t in set(self.llm_types)}
+        big_blind = GAME_CONFIG['big_blind']
+        results = {}
+        for llm_type, seats in seat_counts.items():
+            per_deal = [deal.get(llm_type, 0) / seats for _, deal in sorted(self.deal_results.items())]
+            n = len(per_deal)
+            mean = sum(per_deal) / n if n else 0.0
+            var = sum((x - mean) ** 2 for x in per_deal) / (n - 1) if n > 1 else 0.0
+            std_err = math.sqrt(var / n) if n else 0.0
+            results[llm_type] = {
+                "deals": n,
+                "total": sum(per_deal),
+                "mean_per_deal": mean,
+                "std_err": std_err,
+                "bb_per_100": mean / big_blind * 100,
+                "bb_per_100_ci95": 1.96 * std_err / big_blind * 100,
+            }
+        return results
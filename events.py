@@ -0,0 +1,42 @@
+# events.py
+
+"""
+牌局事件总线 - GameManager 在开局、换街、动作、摊牌和手牌结束时发布结构化事件，观战服务等订阅者据此实时展示，
+不再依赖控制台输出。没有订阅者时发布几乎没有开销
+"""
+
+import threading
+import time
+from typing import Dict, Any, Callable, List
+
+Subscriber = Callable[[Dict[str, Any]], None]
+
+
+class EventBus:
+    """订阅者回调在发布者线程中同步调用，必须立即返回（例如只把事件转交给其他线程），不能阻塞牌局."""
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, callback: Subscriber):
+        with self._lock:
+            self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback: Subscriber):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s != callback]
+
+    def publish(self, event_type: str, table: str = None, **data):
+        # 订阅者列表写时复制，发布时无需加锁
+        subscribers = self._subscribers
+        if not subscribers: return
+        event = {"type": event_type, "table": table, "ts": time.time(), **data}
+        for callback in subscribers: callback(event)
+
+
+EVENTS = EventBus()
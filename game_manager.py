@@ -1,17 +1,66 @@
 # game_manager.py
 
-from typing import List, Dict, Tuple
-from llm_client import LLMClient
+from typing import List, Dict, Tuple, Callable
+from llm_client import get_client
 from poker_engine import PokerGame, Player
-from config import PROMPT_CONFIG, GAME_CONFIG, LLM_CONFIGS
-from logger import GameLogger
+from config import PROMPT_CONFIG, GAME_CONFIG, LLM_CONFIGS, BOT_CONFIGS, BUDGET_CONFIG
+from budget import choose_budget, spot_features
+from logger import GameLogger, load_checkpoint
+from metrics import METRICS
+from events import EVENTS
+from hud import HudTracker
 import time
 import itertools
 
+def _silent(*args, **kwargs):
+    pass
+
+def create_client(llm_type: str, seed=None):
+    """座位用到的决策端：内置策略按 (种子, llm_type) 独立播种，固定种子时整局可复现；LLM客户端在进程内共享.
+    bots（依赖 numpy）只在有内置策略座位时才导入."""
+    if llm_type in BOT_CONFIGS:
+        from bots import BotClient
+        return BotClient(llm_type, seed=None if seed is None else f"{seed}:{llm_type}")
+    return get_client(llm_type)
+
+def legalize_action(parsed_action: Dict, valid_actions: Dict) -> Dict:
+    """验证LLM动作：非法动作改为跟注或弃牌，加注额修正到合法范围（离线批量评估按同样的规则处理）."""
+    action_name = parsed_action['action']
+    if action_name not in valid_actions:
+        # 如果LLM意图是check但不能check，强制call或fold
+        if action_name == 'check' and valid_actions.get('call', 0) > 0:
+            parsed_action = {'action': 'call'}
+        else: # 其他非法动作，强制fold
+            parsed_action = {'action': 'fold'}
+    
+    if parsed_action['action'] == 'raise':
+        amount = parsed_action.get('amount', 0)
+        min_r, max_r = valid_actions['raise']['min'], valid_actions['raise']['max']
+        # 修正加注额到合法范围
+        parsed_action['amount'] = max(min_r, min(amount, max_r))
+    return parsed_action
+
+def _rng_state(rng) -> list:
+    version, internal, gauss = rng.getstate()
+    return [version, list(internal), gauss]
+
+def _set_rng_state(rng, state: list):
+    version, internal, gauss = state
+    rng.setstate((version, tuple(internal), gauss))
+
 class GameManager:
-    def __init__(self, num_players: int, starting_chips: int):
+    def __init__(self, num_players: int, starting_chips: int, seat_llm_types: List[str] = None,
+                 seed: int = None, reset_stacks: bool = False, session_id: str = None, verbose: bool = True,
+                 resume: bool = False, checkpoint_every: int = 1, show_hud: bool = None):
+        self._print = print if verbose else _silent
         llm_types = list(LLM_CONFIGS.keys())
-        llm_types_iter = itertools.cycle(llm_types)
+        unknown = set(seat_llm_types or []) - set(llm_types) - set(BOT_CONFIGS)
+        if unknown:
+            raise ValueError(f"不支持的LLM类型: {', '.join(sorted(unknown))}")
+        if seat_llm_types and len(seat_llm_types) != num_players:
+            raise ValueError(f"座位分配数量({len(seat_llm_types)})与玩家数量({num_players})不一致")
+        # 未指定座位分配时，按配置顺序轮流分配LLM（内置策略只能通过座位分配指定）
+        llm_types_iter = iter(seat_llm_types) if seat_llm_types else itertools.cycle(llm_types)
         player_configs = [
             {"name": f"Player-{i+1}", "llm_type": next(llm_types_iter)}
             for i in range(num_players)
@@ -21,32 +70,147 @@ class GameManager:
             players_with_llm=player_configs,
             starting_chips=starting_chips,
             small_blind=GAME_CONFIG['small_blind'],
-            big_blind=GAME_CONFIG['big_blind']
+            big_blind=GAME_CONFIG['big_blind'],
+            seed=seed
         )
+        # 每手牌开始前把所有玩家恢复为起始筹码，使每手牌的结果互相独立（复式对局用）
+        self.reset_stacks = reset_stacks
         # 记录所有初始玩家（即使后续出局也保留）
         self.all_players: List[Player] = list(self.game.players)
+        # 只为座位上实际用到的类型创建客户端
         self.llm_clients = {
-            llm_type: LLMClient(llm_type) for llm_type in llm_types
+            llm_type: create_client(llm_type, seed) for llm_type in dict.fromkeys(p.llm_type for p in self.all_players)
         }
+        self.bots_only = all(p.llm_type in BOT_CONFIGS for p in self.all_players)
         self.system_prompt = PROMPT_CONFIG["system_prompt"]
-        self.logger = GameLogger()
+        # 对手统计随每个动作更新；show_hud 时在提示词中显示
+        self.hud = HudTracker()
+        self.show_hud = PROMPT_CONFIG.get("show_hud", False) if show_hud is None else show_hud
+        self.logger = GameLogger(session_id=session_id, resume=resume)
         self.winner_stats = {p.name: 0 for p in self.all_players}
         self.action_history = []
+        self.current_round = "preflop"
+        # 每手牌各玩家的筹码盈亏: [{"hand_num": n, "results": {name: delta}}]；检查点只保存累计值 net_chips，
+        # 继续时从手牌日志重建列表
+        self.hand_results = []
+        self.net_chips = {p.name: 0 for p in self.all_players}
+        # 每完成 checkpoint_every 手牌保存一次检查点；last_checkpoint 是最近保存的检查点状态，中断时据此写入会话总结
+        self.next_hand_num = 1
+        self.checkpoint_every = checkpoint_every
+        self.last_checkpoint = self.checkpoint_state()
 
-    def play_game(self, num_hands: int):
-        for hand_num in range(1, num_hands + 1):
-            if len([p for p in self.game.players if p.chips > 0]) < 2:
-                print("\n游戏结束，只剩一位玩家！")
-                break
-            
-            print("\n" + "="*60)
-            print(f"手牌 #{hand_num}")
-            print("="*60)
-            self._play_hand(hand_num)
-            time.sleep(3)
-
-        final_chips = {p.name: p.chips for p in self.all_players}
-        self.logger.log_session_end(final_chips, self.winner_stats)
+    def _init_bare(self, game: PokerGame, llm_clients: Dict = None, logger=None, verbose: bool = False):
+        """不经过构造函数（不创建LLM客户端和日志目录）时，设置整手牌流程、提示词构建和动作校验读取的全部字段.
+        复盘、锦标赛单桌、基准测试和测试替身共用，调用方之后再覆盖或补充自己的字段."""
+        self._print = print if verbose else _silent
+        self.game = game
+        self.all_players: List[Player] = list(game.players)
+        self.reset_stacks = False
+        self.llm_clients = llm_clients if llm_clients is not None else {}
+        self.system_prompt = PROMPT_CONFIG["system_prompt"]
+        self.hud = HudTracker()
+        self.show_hud = False
+        self.logger = logger
+        self.winner_stats = {p.name: 0 for p in self.all_players}
+        self.action_history = []
+        self.hand_results = []
+        self.net_chips = {p.name: 0 for p in self.all_players}
+        self.current_round = "preflop"
+
+    @classmethod
+    def _bare(cls, game: PokerGame) -> "GameManager":
+        manager = cls.__new__(cls)
+        manager._init_bare(game)
+        return manager
+
+    @classmethod
+    def resume(cls, session_id: str, **kwargs) -> "GameManager":
+        """从会话的检查点恢复，继续最近一手完成之后的牌局."""
+        state = load_checkpoint(session_id)
+        manager = cls(len(state["seat_llm_types"]), state["starting_chips"], state["seat_llm_types"],
+                      seed=state["seed"], reset_stacks=state["reset_stacks"], session_id=session_id,
+                      resume=True, **kwargs)
+        manager._restore_state(state)
+        return manager
+
+    def checkpoint_state(self) -> Dict:
+        return {
+            "last_hand": self.next_hand_num - 1,
+            "starting_chips": self.all_players[0].initial_chips,
+            "seat_llm_types": [p.llm_type for p in self.all_players],
+            "reset_stacks": self.reset_stacks,
+            "seed": self.game.seed,
+            "hand_count": self.game.hand_count,
+            "rng_state": _rng_state(self.game.rng),
+            "dealer_pos": self.game.dealer_pos,
+            "players": [p.name for p in self.game.players],
+            "chips": {p.name: p.chips for p in self.all_players},
+            "winner_stats": dict(self.winner_stats),
+            "net_chips": dict(self.net_chips),
+            "bot_rng_states": {t: _rng_state(c.rng) for t, c in self.llm_clients.items() if t in BOT_CONFIGS},
+            "hud": self.hud.state()
+        }
+
+    def _restore_state(self, state: Dict):
+        by_name = {p.name: p for p in self.all_players}
+        for name, chips in state["chips"].items(): by_name[name].chips = chips
+        self.game.players = [by_name[name] for name in state["players"]]
+        self.game.num_players = len(self.game.players)
+        self.game.dealer_pos = state["dealer_pos"]
+        self.game.hand_count = state["hand_count"]
+        _set_rng_state(self.game.rng, state["rng_state"])
+        for llm_type, rng_state in state.get("bot_rng_states", {}).items():
+            _set_rng_state(self.llm_clients[llm_type].rng, rng_state)
+        self.hud = HudTracker(state.get("hud"))
+        self.winner_stats = dict(state["winner_stats"])
+        self.next_hand_num = state["last_hand"] + 1
+        self.last_checkpoint = state
+        self.logger.restore_hands(state["last_hand"], state.get("start_time"))
+        self.hand_results = [{
+            "hand_num": hand["hand_num"],
+            "results": {p["name"]: hand["final_chips"][p["name"]] - p["chips"] for p in hand["players"]}
+        } for hand in self.logger.session_info["hands"] if "final_chips" in hand]
+        if "net_chips" not in state:
+            # 旧版检查点保存的是完整的 hand_results
+            state["net_chips"] = {p.name: 0 for p in self.all_players}
+            for hand in state["hand_results"]:
+                for name, delta in hand["results"].items(): state["net_chips"][name] = state["net_chips"].get(name, 0) + delta
+        self.net_chips = dict(state["net_chips"])
+
+    def play_game(self, num_hands: int, should_stop: Callable[["GameManager"], bool] = None):
+        """进行到第 num_hands 手牌为止（继续的会话从检查点之后开始）；should_stop 在每手牌结束后调用，返回True时提前结束.
+
+        被 Ctrl-C 中断时，按最近保存的检查点写入会话总结，之后可用 resume 从该检查点继续。
+        """
+        player_types = {p.name: p.llm_type for p in self.all_players}
+        try:
+            for hand_num in range(self.next_hand_num, num_hands + 1):
+                if not self.reset_stacks and len([p for p in self.game.players if p.chips > 0]) < 2:
+                    self._print("\n游戏结束，只剩一位玩家！")
+                    break
+                
+                self._print("\n" + "="*60)
+                self._print(f"手牌 #{hand_num}")
+                self._print("="*60)
+                self._play_hand(hand_num)
+                self.next_hand_num = hand_num + 1
+                if hand_num % self.checkpoint_every == 0:
+                    self.last_checkpoint = self.checkpoint_state()
+                    self.logger.save_checkpoint(self.last_checkpoint)
+                if should_stop and should_stop(self):
+                    self._print("\n满足停止条件，提前结束对局")
+                    break
+                if not self.bots_only: time.sleep(3)
+        except KeyboardInterrupt:
+            state = self.last_checkpoint
+            self.logger.discard_hands_after(state["last_hand"])
+            self.logger.log_session_end(self._final_chips(state), state["winner_stats"], player_types, status="interrupted")
+            self._print(f"\n对局被中断，已保存第 {state['last_hand']} 手牌后的检查点")
+            raise
+
+        self.last_checkpoint = self.checkpoint_state()
+        self.logger.save_checkpoint(self.last_checkpoint)
+        self.logger.log_session_end(self._final_chips(), self.winner_stats, player_types)
         return self.get_final_results()
 
     def _play_hand(self, hand_num: int):
@@ -59,36 +223,55 @@ class GameManager:
         }
         self.logger.log_hand_start(hand_num, game_config)
         
+        if self.reset_stacks:
+            self.game.players = list(self.all_players)
+            for p in self.game.players: p.chips = p.initial_chips
         if not self.game.start_new_hand(): return
+        self.logger.log_hand_setup(self.game.get_player(self.game.dealer_pos).name, self.game.players, self.game.deck_seed)
+        self.hud.start_hand([p.name for p in self.game.players])
+        if EVENTS.active:
+            self._emit("hand_start", hand_num=hand_num, dealer=self.game.get_player(self.game.dealer_pos).name,
+                       small_blind=self.game.small_blind, big_blind=self.game.big_blind,
+                       players=[{"name": p.name, "llm_type": p.llm_type, "chips": p.chips,
+                                 "hand": [str(c) for c in p.hand]} for p in self.game.players])
 
-        print(f"庄家(D): {self.game.get_player(self.game.dealer_pos).name}")
+        self._print(f"庄家(D): {self.game.get_player(self.game.dealer_pos).name}")
         for p in self.game.players:
-            if p.chips > 0: print(f"{p.name}: 手牌 [{' '.join(map(str, p.hand))}]")
+            if p.chips > 0: self._print(f"{p.name}: 手牌 [{' '.join(map(str, p.hand))}]")
 
         rounds = ["preflop", "flop", "turn", "river"]
         for round_name in rounds:
             if len([p for p in self.game.players if p.is_active]) < 2: break
             
             self.action_history.append(f"\n--- {round_name.upper()} 轮 ---")
-            print(f"\n--- {round_name.upper()} 轮 ---")
+            self._print(f"\n--- {round_name.upper()} 轮 ---")
             if round_name != 'preflop': self.game.deal_community(3 if round_name == 'flop' else 1)
             
-            print(f"公共牌: [{' '.join(map(str, self.game.community_cards))}]")
+            self._print(f"公共牌: [{' '.join(map(str, self.game.community_cards))}]")
             self.logger.log_round_start(round_name, [str(c) for c in self.game.community_cards])
+            if EVENTS.active: self._emit("street", street=round_name, board=[str(c) for c in self.game.community_cards])
             
             self._run_betting_round(round_name)
         
-        self.game.collect_bets_and_manage_pots()
-        self._showdown()
+        # 按本手牌最后到达的街分组：翻牌前弃牌结束的结算与河牌摊牌的开销差别很大
+        with METRICS.timer("showdown_seconds", street=self.current_round):
+            self.game.collect_bets_and_manage_pots()
+            self._showdown()
         
-        print("\n--- 手牌结束 筹码情况 ---")
+        self._print("\n--- 手牌结束 筹码情况 ---")
         for p in self.game.players:
-            print(f"{p.name}: {p.chips}")
+            self._print(f"{p.name}: {p.chips}")
         
         final_chips = {p.name: p.chips for p in self.game.players}
-        self.logger.log_hand_end(final_chips)
+        contributions = {p.name: p.bet_in_hand for p in self.game.players}
+        self.logger.log_hand_end(final_chips, contributions)
+        if EVENTS.active: self._emit("hand_end", hand_num=hand_num, chips=final_chips, contributions=contributions)
+        results = {p.name: p.chips - p.chips_at_start_of_hand for p in self.game.players}
+        self.hand_results.append({"hand_num": hand_num, "results": results})
+        for name, delta in results.items(): self.net_chips[name] = self.net_chips.get(name, 0) + delta
 
     def _run_betting_round(self, round_name: str):
+        self.current_round = round_name
         self.game.start_betting_round(round_name)
         if self.game.action_player_idx == -1: return
 
@@ -98,7 +281,8 @@ class GameManager:
             self.action_history.append(f"{sb_player.name}(SB) 下小盲 {self.game.small_blind}")
             self.action_history.append(f"{bb_player.name}(BB) 下大盲 {self.game.big_blind}")
 
-        num_active_players = len([p for p in self.game.players if p.is_active])
+        # 已全下的玩家不会再行动，不计入本轮需要行动的人数
+        num_active_players = len([p for p in self.game.players if p.is_active and not p.is_all_in])
         acted_players = set()
         
         while True:
@@ -118,11 +302,18 @@ class GameManager:
             
             action_dict, llm_input, llm_output = self._get_player_action(player)
             
-            action_msg = self.game.handle_action(player, action_dict['action'], action_dict.get('amount', 0))
-            print(action_msg)
+            bet_before = self.game.current_bet
+            with METRICS.timer("engine_action_seconds", street=round_name):
+                action_msg = self.game.handle_action(player, action_dict['action'], action_dict.get('amount', 0))
+            self.hud.record(player.name, round_name, action_dict['action'], self.game.current_bet > bet_before)
+            self._print(action_msg)
             self.action_history.append(action_msg)
             
             self.logger.log_player_action(player.name, player.hand, llm_input, llm_output, action_dict, action_msg)
+            if EVENTS.active:
+                self._emit("action", street=round_name, player=player.name, action=action_dict['action'],
+                           amount=action_dict.get('amount'), message=action_msg, chips=player.chips,
+                           pot=sum(p.bet_in_hand for p in self.game.players))
             
             if len([p for p in self.game.players if p.is_active]) < 2: break
 
@@ -131,29 +322,22 @@ class GameManager:
 
     def _get_player_action(self, player: Player) -> tuple:
         valid_actions = self._get_valid_actions(player)
-        game_state_text = self._get_game_state_text(player)
-        
+        street = self.current_round
         llm_client = self.llm_clients[player.llm_type]
-        parsed_action, llm_input, raw_output = llm_client.get_action(
-            game_state_text, f"[{' '.join(map(str, player.hand))}]", self.system_prompt
-        )
+        if player.llm_type in BOT_CONFIGS:
+            # 内置策略直接读取牌局，不构建提示词
+            with METRICS.timer("llm_request_seconds", llm_type=player.llm_type, street=street):
+                parsed_action, llm_input, raw_output = llm_client.get_action(self.game, player, valid_actions)
+        else:
+            with METRICS.timer("prompt_build_seconds", llm_type=player.llm_type, street=street):
+                game_state_text = self._get_game_state_text(player)
+            budget = choose_budget(spot_features(self.game, player, street)) if BUDGET_CONFIG["enabled"] else None
+            with METRICS.timer("llm_request_seconds", llm_type=player.llm_type, street=street):
+                parsed_action, llm_input, raw_output = llm_client.get_action(
+                    game_state_text, f"[{' '.join(map(str, player.hand))}]", self.system_prompt, budget
+                )
         
-        # 验证LLM动作
-        action_name = parsed_action['action']
-        if action_name not in valid_actions:
-            # 如果LLM意图是check但不能check，强制call或fold
-            if action_name == 'check' and valid_actions.get('call', 0) > 0:
-                parsed_action = {'action': 'call'}
-            else: # 其他非法动作，强制fold
-                parsed_action = {'action': 'fold'}
-        
-        if action_name == 'raise':
-            amount = parsed_action.get('amount', 0)
-            min_r, max_r = valid_actions['raise']['min'], valid_actions['raise']['max']
-            # 修正加注额到合法范围
-            parsed_action['amount'] = max(min_r, min(amount, max_r))
-            
-        return parsed_action, llm_input, raw_output
+        return legalize_action(parsed_action, valid_actions), llm_input, raw_output
 
     def _get_valid_actions(self, player: Player) -> Dict:
         actions = {}
@@ -201,6 +385,13 @@ class GameManager:
             state.append("\n--- 注意，系统不会在牌局进行中维护底池状态，底池边池的状态请根据自己的初始筹码计算 ---")
             state.extend(self.action_history)
 
+        if self.show_hud:
+            hud_lines = [f"- {p.name}: {line}" for p in self.game.players
+                         if p.is_active and p != current_player and (line := self.hud.summary(p.name))]
+            if hud_lines:
+                state.append("\n--- 对手统计（本会话累计：入池率VPIP、翻牌前加注率PFR、翻牌后激进度AF、面对持续下注弃牌率FtCB）---")
+                state.extend(hud_lines)
+
         state.append("\n--- 你的回合 ---")
         to_call = self.game.current_bet - current_player.bet_in_round
         clipped_to_call = min(to_call, current_player.chips)
@@ -212,13 +403,13 @@ class GameManager:
         return "\n".join(state)
         
     def _showdown(self):
-        print("\n--- 摊牌 ---")
+        self._print("\n--- 摊牌 ---")
         active_players = [p for p in self.game.players if p.is_active]
         if len(active_players) == 1:
             winner = active_players[0]
             total_pot = sum(pot['amount'] for pot in self.game.pots)
             winner.chips += total_pot
-            print(f"{winner.name} 是唯一幸存者, 赢得底池 {total_pot}")
+            self._print(f"{winner.name} 是唯一幸存者, 赢得底池 {total_pot}")
             self.winner_stats[winner.name] += 1
             
             # 修正pot结构以包含eligible_players
@@ -227,23 +418,40 @@ class GameManager:
                 'eligible_players': active_players 
             }
             self.logger.log_showdown([{'pot': pot_details, 'winners': [winner], 'hand_details': ('未摊牌', [])}])
+            if EVENTS.active: self._emit("showdown", pots=[{"amount": total_pot, "winners": [winner.name], "hand_name": "未摊牌", "cards": []}])
             return
         
         winner_results = self.game.determine_winners()
         self.logger.log_showdown(winner_results)
+        if EVENTS.active:
+            self._emit("showdown", pots=[{"amount": r['pot']['amount'], "winners": [w.name for w in r['winners']],
+                                          "hand_name": r['hand_details'][0], "cards": [str(c) for c in r['hand_details'][1]]}
+                                         for r in winner_results])
 
         for res in winner_results:
             pot_amt = res['pot']['amount']
             winners = res['winners']
             details = res['hand_details']
-            print(f"底池 {pot_amt} 由 {', '.join([w.name for w in winners])} 赢得")
-            print(f"  牌型: {details[0]} - {' '.join(map(str, details[1]))}")
+            self._print(f"底池 {pot_amt} 由 {', '.join([w.name for w in winners])} 赢得")
+            self._print(f"  牌型: {details[0]} - {' '.join(map(str, details[1]))}")
             for w in winners: self.winner_stats[w.name] += 1
         
         self.game.distribute_winnings(winner_results)
 
+    def _emit(self, event_type: str, **data):
+        """发布牌局事件，以会话ID区分不同的桌；调用前先检查 EVENTS.active，避免无人订阅时构造事件数据."""
+        EVENTS.publish(event_type, table=getattr(self.logger, 'session_id', None), **data)
+
+    def _final_chips(self, state: Dict = None) -> Dict[str, int]:
+        """state 为空时取当前筹码，否则取该检查点状态下的筹码."""
+        if not self.reset_stacks:
+            return dict(state["chips"]) if state else {p.name: p.chips for p in self.all_players}
+        # 每手牌重置筹码时，最终筹码 = 起始筹码 + 累计盈亏
+        net_chips = state["net_chips"] if state else self.net_chips
+        return {p.name: p.initial_chips + net_chips.get(p.name, 0) for p in self.all_players}
+
     def get_final_results(self):
         return {
-            "final_chips": {p.name: p.chips for p in self.all_players},
+            "final_chips": self._final_chips(),
             "winner_stats": self.winner_stats
         }
\ No newline at end of file
@@ -0,0 +1,410 @@
+# hand_history.py
+
+"""
+牌谱导入 - 流式读取 PokerStars 格式的文本牌谱（不整体读入内存），按块分发到多个进程解析，每手牌在引擎上重放校验后
+写成与 GameLogger 相同格式的手牌日志，复盘、离线批量评估和决策数据集可以直接把它们当作决策点来源。
+格式损坏或引擎无法表示的手牌（前注、单挑、补盲、多次发牌等）按原因计数后跳过，不影响其余手牌
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+from logger import GameLogger
+from poker_engine import RANKS, SUITS
+from replay import ReplayManager, ReplayDivergence, _ReplayLogger
+
+CHUNK_SIZE = 256
+IMPORT_LLM_TYPE = "human"
+# 有底牌未知的玩家进入摊牌时，最多尝试多少次随机底牌来复现牌谱中的输赢
+MAX_DEALS = 20
+# 单手牌最多保留的行数：没有牌谱头的垃圾内容不会无限累积
+MAX_HAND_LINES = 1000
+# 导入结果中最多保留多少条内部错误信息
+MAX_ERRORS = 20
+
+HAND_START = re.compile(r"^PokerStars (?:Zoom |Home Game )?(?:Hand|Game) #(\d+)")
+_AMOUNT = r"([$€£]?[\d,]+(?:\.\d+)?)"
+_BLINDS = re.compile(r"\(" + _AMOUNT + "/" + _AMOUNT)
+_PLAYED_AT = re.compile(r"(\d{4}/\d{2}/\d{2} \d{1,2}:\d{2}:\d{2})")
+_TABLE = re.compile(r"^Table '([^']*)'")
+_BUTTON = re.compile(r"Seat #(\d+) is the button")
+_SEAT = re.compile(r"^Seat (\d+): (.+?) \(" + _AMOUNT + r" in chips[^)]*\)(.*)$")
+_POST = re.compile(r"^(.+?): posts (small blind|big blind|the ante|small & big blinds) " + _AMOUNT)
+_ACTION = re.compile(r"^(.+?): (folds|checks|calls|bets|raises)(?: " + _AMOUNT + ")?(?: to " + _AMOUNT + ")?( and is all-in)?")
+_DEALT = re.compile(r"^Dealt to (.+) \[([^\]]+)\]$")
+_SHOWS = re.compile(r"^(.+?): shows \[([^\]]+)\]")
+_SHOWN_IN_SUMMARY = re.compile(r"^Seat \d+: (.+?)(?: \((?:button|small blind|big blind)\))* (?:showed|mucked) \[([^\]]+)\]")
+_COLLECTED = re.compile(r"^(.+?) collected " + _AMOUNT + " from")
+_UNCALLED = re.compile(r"^Uncalled bet \(" + _AMOUNT + r"\) returned to (.+)$")
+_TOTAL_POT = re.compile(r"^Total pot " + _AMOUNT)
+_STREET = re.compile(r"^\*\*\* (FLOP|TURN|RIVER) \*\*\*(.*)$")
+_SITTING_OUT = re.compile(r"^(.+?)(?::)? (?:is sitting out|sits out|will be allowed to play after the button)")
+_HH_SUITS = {"s": "♠", "h": "♥", "d": "♦", "c": "♣"}
+
+
+class HandHistoryError(Exception):
+    """牌谱无法导入；reason 为计数用的原因分类."""
+
+    def __init__(self, reason: str, message: str = ""):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def iter_hand_texts(path: str) -> Iterator[str]:
+    """逐行读取牌谱文件，按牌谱头切分出每手牌的文本；第一个牌谱头之前的内容丢弃."""
+    lines: List[str] = []
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            if HAND_START.match(line):
+                if lines: yield "".join(lines)
+                lines = [line]
+            elif lines and len(lines) < MAX_HAND_LINES:
+                lines.append(line)
+    if lines: yield "".join(lines)
+
+
+def _card(text: str) -> str:
+    rank, suit = text[:-1].replace("10", "T").upper(), _HH_SUITS.get(text[-1:].lower())
+    if rank not in RANKS or len(rank) != 1 or suit not in SUITS: raise HandHistoryError("malformed", f"无法识别的牌: {text}")
+    return rank + suit
+
+
+def _cards(text: str) -> List[str]:
+    return [_card(c) for c in text.split()]
+
+
+def _amount(text: str, scale: int) -> int:
+    try:
+        value = Decimal(text.lstrip("$€£").replace(",", "")) * scale
+    except InvalidOperation:
+        raise HandHistoryError("malformed", f"无法识别的金额: {text}")
+    if value != value.to_integral_value(): raise HandHistoryError("malformed", f"金额不是最小单位的整数倍: {text}")
+    return int(value)
+
+
+def parse_hand(text: str) -> Dict[str, Any]:
+    """把一手 PokerStars 牌谱解析为座位、盲注、动作、已知底牌和结算信息；金额换算为整数（现金局以分为单位）."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    header = HAND_START.match(lines[0]) if lines else None
+    if not header: raise HandHistoryError("malformed", "缺少牌谱头")
+    if "Hold'em No Limit" not in lines[0]: raise HandHistoryError("unsupported_game", "只支持无限注德州扑克")
+    blinds = _BLINDS.search(lines[0])
+    if not blinds: raise HandHistoryError("malformed", "牌谱头中没有盲注")
+    scale = 100 if re.search(r"[$€£.]", blinds.group(0)) else 1
+    played_at = _PLAYED_AT.search(lines[0])
+
+    hand = {
+        "hand_id": header.group(1),
+        "table": None,
+        "played_at": datetime.strptime(played_at.group(1), "%Y/%m/%d %H:%M:%S").isoformat() if played_at else None,
+        "small_blind": _amount(blinds.group(1), scale),
+        "big_blind": _amount(blinds.group(2), scale),
+        "players": [],
+        "button": None,
+        "posts": [],
+        "known": {},
+        "rounds": [],
+        "collected": Counter(),
+        "uncalled": Counter(),
+        "total_pot": None,
+    }
+    seats: Dict[int, Tuple[str, int]] = {}
+    sitting_out, button_seat = set(), None
+    section = "setup"
+    for line in lines[1:]:
+        if line.startswith("*** "):
+            street = _STREET.match(line)
+            if line.startswith("*** HOLE CARDS"):
+                section = "preflop"
+                hand["rounds"].append({"round_name": "preflop", "community_cards": [], "actions": []})
+            elif street and section != "setup":
+                section = street.group(1).lower()
+                board = [c for cards in re.findall(r"\[([^\]]+)\]", street.group(2)) for c in _cards(cards)]
+                hand["rounds"].append({"round_name": section, "community_cards": board, "actions": []})
+            elif line.startswith("*** SHOW DOWN"):
+                section = "showdown"
+            elif line.startswith("*** SUMMARY"):
+                section = "summary"
+            elif line.startswith(("*** FIRST", "*** SECOND", "*** THIRD")):
+                raise HandHistoryError("unsupported_game", "多次发牌")
+            else:
+                raise HandHistoryError("malformed", f"无法识别的分段: {line}")
+            continue
+
+        if section == "setup":
+            if (m := _SEAT.match(line)):
+                seats[int(m.group(1))] = (m.group(2), _amount(m.group(3), scale))
+                if "sitting out" in m.group(4): sitting_out.add(m.group(2))
+            elif (m := _POST.match(line)):
+                hand["posts"].append((m.group(1), m.group(2), _amount(m.group(3), scale)))
+            elif (m := _SITTING_OUT.match(line)):
+                sitting_out.add(m.group(1))
+            elif (m := _TABLE.match(line)):
+                hand["table"] = m.group(1)
+                button = _BUTTON.search(line)
+                if button: button_seat = int(button.group(1))
+        elif section == "summary":
+            if (m := _TOTAL_POT.match(line)):
+                hand["total_pot"] = _amount(m.group(1), scale)
+            elif (m := _SHOWN_IN_SUMMARY.match(line)):
+                hand["known"][m.group(1)] = _cards(m.group(2))
+        elif (m := _DEALT.match(line)):
+            hand["known"][m.group(1)] = _cards(m.group(2))
+        elif (m := _SHOWS.match(line)):
+            hand["known"][m.group(1)] = _cards(m.group(2))
+        elif (m := _COLLECTED.match(line)):
+            hand["collected"][m.group(1)] += _amount(m.group(2), scale)
+        elif (m := _UNCALLED.match(line)):
+            hand["uncalled"][m.group(2)] += _amount(m.group(1), scale)
+        elif section != "showdown" and (m := _ACTION.match(line)):
+            name, verb, amount, to, all_in = m.groups()
+            if all_in: action = {'action': 'all-in'}
+            elif verb == "raises" and to: action = {'action': 'raise', 'amount': _amount(to, scale)}
+            elif verb == "bets" and amount: action = {'action': 'raise', 'amount': _amount(amount, scale)}
+            elif verb in ("raises", "bets"): raise HandHistoryError("malformed", f"下注缺少金额: {line}")
+            else: action = {'action': verb[:-1] if verb != "checks" else "check"}
+            hand["rounds"][-1]["actions"].append((name, action, line))
+
+    if section != "summary": raise HandHistoryError("malformed", "牌谱不完整（缺少 SUMMARY）")
+    if not hand["rounds"]: raise HandHistoryError("malformed", "缺少 HOLE CARDS")
+    hand["players"] = [{"name": name, "seat_no": seat_no, "chips": chips}
+                       for seat_no, (name, chips) in sorted(seats.items()) if name not in sitting_out and chips > 0]
+    dealt = {p["name"] for p in hand["players"]}
+    if len(hand["players"]) == 2: raise HandHistoryError("heads_up", "单挑时引擎的盲注位置与牌谱不同")
+    if len(hand["players"]) < 2: raise HandHistoryError("malformed", "入座玩家不足")
+    hand["button"] = next((p["name"] for p in hand["players"] if p["seat_no"] == button_seat), None)
+    if hand["button"] is None: raise HandHistoryError("button", "按钮位上没有参与本手牌的玩家")
+    for r in hand["rounds"]:
+        for name, _, line in r["actions"]:
+            if name not in dealt: raise HandHistoryError("malformed", f"未入座的玩家行动: {line}")
+    return hand
+
+
+def _check_blinds(hand: Dict[str, Any]):
+    """引擎固定由按钮后的两位玩家下小盲和大盲，不支持前注和补盲."""
+    if any(kind == "the ante" for _, kind, _ in hand["posts"]): raise HandHistoryError("ante", "引擎不支持前注")
+    names = [p["name"] for p in hand["players"]]
+    button = names.index(hand["button"])
+    expected = [(names[(button + 1) % len(names)], "small blind", hand["small_blind"]),
+                (names[(button + 2) % len(names)], "big blind", hand["big_blind"])]
+    if sorted(hand["posts"]) != sorted(expected): raise HandHistoryError("blinds", f"盲注与引擎不一致: {hand['posts']}")
+
+
+class _ImportLogger(_ReplayLogger):
+    """重放时把引擎给出的动作描述和摊牌结果写回记录，记录格式与 GameLogger 相同."""
+
+    def __init__(self, hand_data: Dict[str, Any]):
+        super().__init__(hand_data)
+        self.hand_data = hand_data
+        self.last_action = None
+
+    def next_action(self, player_name: str) -> Dict[str, Any]:
+        self.last_action = super().next_action(player_name)
+        return self.last_action
+
+    def log_player_action(self, player_name, player_hand, llm_input, llm_output, parsed_action, action_result):
+        self.last_action["action_result"] = action_result
+
+    def log_showdown(self, winner_results: List[Dict]):
+        self.hand_data["showdown"] = {"timestamp": self.hand_data["start_time"], "results": [{
+            'pot_amount': res['pot']['amount'],
+            'eligible_players': [p.name for p in res['pot']['eligible_players']],
+            'winners': [w.name for w in res['winners']],
+            'hand_name': res['hand_details'][0],
+            'hand_cards': [str(c) for c in res['hand_details'][1]]
+        } for res in winner_results]}
+
+
+def _record(hand: Dict[str, Any], llm_type: str) -> Dict[str, Any]:
+    """GameLogger 格式的手牌记录（不含结算）；牌谱中未亮出的底牌先留空."""
+    timestamp = hand["played_at"] or datetime.now().isoformat()
+    return {
+        "hand_num": 0,
+        "start_time": timestamp,
+        "game_config": {"num_players": len(hand["players"]), "starting_chips": [p["chips"] for p in hand["players"]],
+                        "small_blind": hand["small_blind"], "big_blind": hand["big_blind"]},
+        "source": {"format": "pokerstars", "hand_id": hand["hand_id"], "table": hand["table"]},
+        "dealer": hand["button"],
+        "deck_seed": None,
+        "players": [{"name": p["name"], "llm_type": llm_type, "seat": seat, "chips": p["chips"],
+                     "hand": hand["known"].get(p["name"], []), "hand_known": p["name"] in hand["known"]}
+                    for seat, p in enumerate(hand["players"])],
+        # 底牌未知的玩家 player_hand 为空列表，离线评估和数据集据此跳过这些决策
+        "rounds": [{"round_name": r["round_name"], "start_time": timestamp, "community_cards": r["community_cards"],
+                    "actions": [{"player_name": name, "player_hand": hand["known"].get(name, []), "timestamp": timestamp,
+                                 "llm_input": None, "llm_output": line, "parsed_action": action, "action_result": None}
+                                for name, action, line in r["actions"]]}
+                   for r in hand["rounds"]],
+    }
+
+
+def convert_hand(text: str, llm_type: str = IMPORT_LLM_TYPE, manager: ReplayManager = None) -> Dict[str, Any]:
+    """解析一手牌谱并在引擎上重放：行动顺序、公共牌、赢家和底池总额都与牌谱一致才返回记录，否则抛出 HandHistoryError.
+    未亮出的底牌从剩余的牌中随机补齐（以牌谱编号为种子，结果可复现）；结算不含抽水."""
+    hand = parse_hand(text)
+    _check_blinds(hand)
+    record = _record(hand, llm_type)
+    manager = manager or ReplayManager()
+
+    board = hand["rounds"][-1]["community_cards"]
+    known = [c for p in record["players"] for c in p["hand"]] + board
+    if len(set(known)) != len(known): raise HandHistoryError("malformed", "牌谱中有重复的牌")
+    unknown = [p for p in record["players"] if not p["hand_known"]]
+    folded = {name for r in hand["rounds"] for name, action, _ in r["actions"] if action['action'] == 'fold'}
+    # 未知底牌只在进入摊牌时影响结果，这时多试几次直到输赢与牌谱一致
+    deals = MAX_DEALS if any(p["name"] not in folded for p in unknown) else 1
+    known = set(known)
+    rest = [r + s for r in RANKS for s in SUITS if r + s not in known]
+    rng = random.Random(hand["hand_id"])
+    error = None
+    for _ in range(deals):
+        cards = rng.sample(rest, 2 * len(unknown))
+        for i, p in enumerate(unknown): p["hand"] = cards[2 * i:2 * i + 2]
+        logger = _ImportLogger(record)
+        try:
+            manager.run_hand(record, logger)
+        except ReplayDivergence as e:
+            raise HandHistoryError("diverged", str(e))
+        start = {p["name"]: p["chips"] for p in record["players"]}
+        won = {name: chips - start[name] + logger.contributions[name] - hand["uncalled"][name]
+               for name, chips in logger.final_chips.items()}
+        pot = sum(logger.contributions.values()) - sum(hand["uncalled"].values())
+        if {name for name, w in won.items() if w > 0} != set(hand["collected"]):
+            error = HandHistoryError("cards_unknown" if deals > 1 else "diverged",
+                                     f"赢家不一致: 引擎 {won}, 牌谱 {dict(hand['collected'])}")
+        elif hand["total_pot"] is not None and pot != hand["total_pot"]:
+            raise HandHistoryError("diverged", f"底池不一致: 引擎 {pot}, 牌谱 {hand['total_pot']}")
+        else:
+            record["end_time"] = record["start_time"]
+            record["final_chips"] = logger.final_chips
+            record["contributions"] = logger.contributions
+            return record
+    raise error
+
+
+def _convert_chunk(texts: List[str], llm_type: str) -> List[Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]]:
+    """工作进程：转换一块手牌，每手牌的结果为 (记录, None, None) 或 (None, 跳过原因, 错误信息)；单手牌出错不影响同一块的其他手牌.
+    解析中预期的 ValueError/IndexError 算作格式损坏；其他异常是引擎或转换代码的问题，单独记为 internal_error 并保留信息."""
+    manager = ReplayManager()
+    results = []
+    for text in texts:
+        try:
+            results.append((convert_hand(text, llm_type, manager), None, None))
+        except HandHistoryError as e:
+            results.append((None, e.reason, None))
+        except (ValueError, IndexError):
+            results.append((None, "malformed", None))
+        except Exception as e:
+            header = text.strip().splitlines()[0] if text.strip() else ""
+            results.append((None, "internal_error", f"{header[:80]}: {type(e).__name__}: {e}"))
+    return results
+
+
+def _chunks(paths: List[str], chunk_size: int) -> Iterator[List[str]]:
+    chunk = []
+    for path in paths:
+        for text in iter_hand_texts(path):
+            chunk.append(text)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk: yield chunk
+
+
+def _convert_chunks(paths: List[str], llm_type: str, workers: int, chunk_size: int) -> Iterator[list]:
+    """按原顺序产出每块的转换结果；最多 2*workers 块同时在途，文件再大内存占用也有上限."""
+    if workers <= 1:
+        for chunk in _chunks(paths, chunk_size): yield _convert_chunk(chunk, llm_type)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(paths, chunk_size):
+            pending.append(pool.submit(_convert_chunk, chunk, llm_type))
+            if len(pending) >= workers * 2: yield pending.popleft().result()
+        while pending: yield pending.popleft().result()
+
+
+def import_hand_histories(paths: List[str], log_dir: str = "logs", session_id: str = None, workers: int = 1,
+                          chunk_size: int = CHUNK_SIZE, llm_type: str = IMPORT_LLM_TYPE) -> Dict[str, Any]:
+    """把牌谱文件导入为一个会话（按文件内顺序编号为 hand_1.json ...），返回导入和跳过的手数、跳过原因
+    以及最多 MAX_ERRORS 条内部错误信息."""
+    logger = GameLogger(log_dir=log_dir, session_id=session_id or f"import_{datetime.now():%Y%m%d_%H%M%S}")
+    counts = {"session_id": logger.session_id, "hands": 0, "imported": 0, "rejected": Counter(), "errors": []}
+    start = time.perf_counter()
+    for results in _convert_chunks(paths, llm_type, workers, chunk_size):
+        for record, reason, message in results:
+            counts["hands"] += 1
+            if record is None:
+                counts["rejected"][reason] += 1
+                if message and len(counts["errors"]) < MAX_ERRORS: counts["errors"].append(message)
+                continue
+            counts["imported"] += 1
+            record["hand_num"] = counts["imported"]
+            with open(logger.session_dir / f"hand_{record['hand_num']}.json", 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+    counts["seconds"] = time.perf_counter() - start
+    counts["rejected"] = dict(counts["rejected"])
+
+    # 导入的会话没有对局结果：评分跳过它，数据集等按 session_summary.json 判断会话已完成
+    summary = {"session_id": logger.session_id, "start_time": logger.session_info["start_time"],
+               "end_time": datetime.now().isoformat(), "status": "imported",
+               "source": {"format": "pokerstars", "files": [str(p) for p in paths]},
+               "import": {k: counts[k] for k in ("hands", "imported", "rejected", "errors")}}
+    with open(logger.session_dir / "session_summary.json", 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return counts
+
+
+REJECT_REASONS = {
+    "malformed": "格式损坏或不完整",
+    "unsupported_game": "非无限注德州或多次发牌",
+    "ante": "有前注",
+    "heads_up": "单挑",
+    "blinds": "补盲或盲注不全",
+    "button": "按钮位无人",
+    "diverged": "重放与牌谱不一致",
+    "cards_unknown": "未亮出的底牌无法复现输赢",
+    "internal_error": "内部错误（引擎或导入代码的问题）",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式并行导入 PokerStars 格式的文本牌谱，转换为本项目的手牌日志")
+    parser.add_argument("files", nargs="+", help="牌谱文件")
+    parser.add_argument("--log-dir", "-d", default="logs", help="日志目录")
+    parser.add_argument("--session", "-s", help="会话ID (默认: import_<时间>)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="解析进程数 (默认: 1)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"每块手牌数 (默认: {CHUNK_SIZE})")
+    parser.add_argument("--llm-type", default=IMPORT_LLM_TYPE, help=f"导入玩家的 llm_type (默认: {IMPORT_LLM_TYPE})")
+    args = parser.parse_args()
+
+    console = Console()
+    counts = import_hand_histories(args.files, args.log_dir, args.session, args.workers, args.chunk_size, args.llm_type)
+    rate = counts["hands"] / counts["seconds"] if counts["seconds"] > 0 else 0.0
+    console.print(f"[bold green]导入 {counts['imported']}/{counts['hands']} 手牌[/bold green] → "
+                  f"{Path(args.log_dir) / counts['session_id']}，用时 {counts['seconds']:.1f}s ({rate:.0f} 手/秒)")
+    if counts["rejected"]:
+        table = Table(title="跳过的手牌")
+        table.add_column("原因", style="yellow")
+        table.add_column("手数", style="red")
+        for reason, n in sorted(counts["rejected"].items(), key=lambda kv: -kv[1]):
+            table.add_row(REJECT_REASONS.get(reason, reason), str(n))
+        console.print(table)
+    for message in counts["errors"]:
+        console.print(f"[bold red]内部错误[/bold red] {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# hud.py
+
+"""
+对手统计（HUD） - GameManager 打牌时按动作增量更新每位玩家的 VPIP、PFR、激进度（AF）和面对持续下注的弃牌率，
+每个动作 O(1)；计数随检查点保存，继续会话时直接恢复，不需要重新扫描日志。可选地在提示词中为每位对手显示一行统计
+"""
+
+from typing import Dict, List, Optional
+
+FIELDS = ("hands", "vpip", "pfr", "aggressive", "passive", "cbet_faced", "cbet_folded")
+
+
+class HudTracker:
+    """stats 可以由多个追踪器共享（锦标赛中玩家换桌后继续累计），每手牌的状态则属于各自的追踪器."""
+
+    def __init__(self, stats: Dict[str, Dict[str, int]] = None):
+        self.stats = stats if stats is not None else {}
+        self._reset_hand()
+
+    def _reset_hand(self):
+        self.vpip_seen = set()
+        self.pfr_seen = set()
+        self.preflop_raiser = None
+        self.flop_bet_seen = False
+        # 翻牌前最后加注者在翻牌圈率先下注后、有人加注前，后面行动的玩家都在面对持续下注
+        self.cbet_live = False
+
+    def _counts(self, name: str) -> Dict[str, int]:
+        counts = self.stats.get(name)
+        if counts is None: counts = self.stats[name] = dict.fromkeys(FIELDS, 0)
+        return counts
+
+    def start_hand(self, names: List[str]):
+        self._reset_hand()
+        for name in names: self._counts(name)["hands"] += 1
+
+    def record(self, name: str, street: str, action: str, raised: bool):
+        """记录一个动作；raised 表示该动作提高了本轮的下注额（下注、加注或加注全下）."""
+        counts = self._counts(name)
+        if street == "preflop":
+            if action in ("call", "raise", "all-in") and name not in self.vpip_seen:
+                self.vpip_seen.add(name)
+                counts["vpip"] += 1
+            if raised:
+                self.preflop_raiser = name
+                if name not in self.pfr_seen:
+                    self.pfr_seen.add(name)
+                    counts["pfr"] += 1
+            return
+
+        if raised: counts["aggressive"] += 1
+        elif action in ("call", "all-in"): counts["passive"] += 1
+        if street != "flop": return
+        if not self.flop_bet_seen:
+            if raised:
+                self.flop_bet_seen = True
+                self.cbet_live = name == self.preflop_raiser
+            return
+        if self.cbet_live:
+            counts["cbet_faced"] += 1
+            if action == "fold": counts["cbet_folded"] += 1
+            if raised: self.cbet_live = False
+
+    def state(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(counts) for name, counts in self.stats.items()}
+
+    def summary(self, name: str) -> Optional[str]:
+        """一行紧凑的统计，如 "42手 VPIP 31% PFR 17% AF 2.0 FtCB 50%"；没有数据时返回 None."""
+        c = self.stats.get(name)
+        if not c or not c["hands"]: return None
+        hands = c["hands"]
+        if c["passive"]: af = f"{c['aggressive'] / c['passive']:.1f}"
+        else: af = "∞" if c["aggressive"] else "-"
+        ftcb = f"{c['cbet_folded'] / c['cbet_faced']:.0%}" if c["cbet_faced"] else "-"
+        return f"{hands}手 VPIP {c['vpip'] / hands:.0%} PFR {c['pfr'] / hands:.0%} AF {af} FtCB {ftcb}"
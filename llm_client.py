@@ -1,18 +1,74 @@
 # llm_client.py
 
-from openai import OpenAI
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from config import LLM_CONFIGS
+from metrics import METRICS
+
+def build_messages(game_state: str, player_hand: str, system_prompt: str) -> List[Dict[str, str]]:
+    """决策请求的消息列表；在线对局和离线批量评估（batch_eval.py）使用同一份提示词."""
+    user_prompt = (
+        f"游戏状态:\n{game_state}\n\n"
+        f"你的手牌: {player_hand}\n\n"
+        "请先对当前局势进行详细分析，说明你的思考过程，然后将最终决策放在 <action>...</action> 标签中。\n"
+        "例如: <action>raise 100</action> 或 <action>fold</action>.\n\n"
+        "你的分析和决策:"
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def parse_action(text: str) -> Dict[str, Any]:
+    """将LLM的文本输出解析为标准动作字典.
+    
+    优先从 <action>...</action> 标签中提取动作.
+    """
+    action_text = text
+    
+    # 尝试从<action>标签中提取内容
+    action_match = re.search(r'<action>(.*?)</action>', text, re.IGNORECASE | re.DOTALL)
+    if action_match:
+        action_text = action_match.group(1).strip()
+    
+    text_lower = action_text.lower()
+    
+    if "all-in" in text_lower or "allin" in text_lower:
+        return {'action': 'all-in'}
+    
+    if "raise" in text_lower:
+        numbers = re.findall(r'\d+', action_text) # Search in the extracted part
+        if numbers:
+            return {'action': 'raise', 'amount': int(numbers[0])}
+        else: # 如果LLM只说raise但没给金额，这是个问题，安全起见我们当作弃牌
+            return {'action': 'fold'}
+
+    if "call" in text_lower:
+        return {'action': 'call'}
+    
+    if "check" in text_lower:
+        return {'action': 'check'}
+
+    if "fold" in text_lower:
+        return {'action': 'fold'}
+    
+    # 如果无法解析，默认弃牌
+    return {'action': 'fold'}
 
 class LLMClient:
     def __init__(self, llm_type: str):
         if llm_type not in LLM_CONFIGS:
             raise ValueError(f"不支持的LLM类型: {llm_type}")
         
+        self.llm_type = llm_type
         self.config = LLM_CONFIGS[llm_type]
         self.model = self.config["model"]
         
+        # openai 导入较慢，只在真正有LLM座位时才导入
+        from openai import OpenAI
         try:
             self.client = OpenAI(
                 api_key=self.config["api_key"],
@@ -21,28 +77,37 @@ class LLMClient:
         except Exception as e:
             raise ConnectionError(f"无法初始化 {llm_type} 的OpenAI客户端: {e}")
 
-    def get_action(self, game_state: str, player_hand: str, system_prompt: str) -> tuple:
-        user_prompt = (
-            f"游戏状态:\n{game_state}\n\n"
-            f"你的手牌: {player_hand}\n\n"
-            "请先对当前局势进行详细分析，说明你的思考过程，然后将最终决策放在 <action>...</action> 标签中。\n"
-            "例如: <action>raise 100</action> 或 <action>fold</action>.\n\n"
-            "你的分析和决策:"
-        )
-        
+    def get_action(self, game_state: str, player_hand: str, system_prompt: str, budget=None) -> tuple:
+        """budget 为 budget.Budget 时按档位限制 max_tokens 并设置推理强度，同时按档位记录token和耗时."""
         llm_input = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            "messages": build_messages(game_state, player_hand, system_prompt),
             "temperature": 0.7,
         }
+        if budget is not None:
+            if budget.max_tokens: llm_input["max_tokens"] = budget.max_tokens
+            if budget.reasoning_effort and self.config.get("reasoning_effort"):
+                llm_input["extra_body"] = {"reasoning_effort": budget.reasoning_effort}
         
         try:
+            start = time.perf_counter()
             response = self.client.chat.completions.create(**llm_input)
+            elapsed = time.perf_counter() - start
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                METRICS.inc("llm_prompt_tokens_total", usage.prompt_tokens or 0, llm_type=self.llm_type)
+                METRICS.inc("llm_completion_tokens_total", usage.completion_tokens or 0, llm_type=self.llm_type)
+                llm_input["usage"] = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+            if budget is not None:
+                labels = {"llm_type": self.llm_type, "tier": budget.tier, "group": "control" if budget.control else "budgeted"}
+                METRICS.observe("llm_budget_request_seconds", elapsed, **labels)
+                METRICS.inc("llm_budget_completion_tokens_total", (usage.completion_tokens or 0) if usage else 0, **labels)
+                # 因 max_tokens 被截断的回复往往没有 <action> 标签，按弃牌处理，说明该档预算过低
+                if response.choices[0].finish_reason == "length": METRICS.inc("llm_budget_truncated_total", **labels)
+                llm_input["budget"] = {"tier": budget.tier, "importance": budget.importance, "control": budget.control}
             # TODO: 看一下gptoss的输出，应该是在think部分的。这部分的output要加进来
-            raw_action = response.choices[0].message.content.strip()
+            # 推理阶段就被 max_tokens 截断时 content 可能为空
+            raw_action = (response.choices[0].message.content or "").strip()
             parsed_action = self._parse_action(raw_action)
             try:
                 reasoning_content = response.choices[0].message.reasoning_content
@@ -56,40 +121,46 @@ class LLMClient:
             print(f"LLM API调用失败 for {self.config['model']}: {e}")
             default_action = {'action': 'fold'}
             llm_input["error"] = str(e)
+            METRICS.inc("llm_errors_total", llm_type=self.llm_type)
             return default_action, llm_input, "API_ERROR"
 
+    def warmup(self) -> float:
+        """发送一个只生成1个token的请求：建立连接池中的连接，并让服务端提前加载模型，返回耗时（秒）."""
+        start = time.perf_counter()
+        self.client.chat.completions.create(model=self.model, messages=[{"role": "user", "content": "hi"}], max_tokens=1)
+        elapsed = time.perf_counter() - start
+        METRICS.observe("llm_warmup_seconds", elapsed, llm_type=self.llm_type)
+        return elapsed
+
     def _parse_action(self, text: str) -> Dict[str, Any]:
-        """将LLM的文本输出解析为标准动作字典.
-        
-        优先从 <action>...</action> 标签中提取动作.
-        """
-        action_text = text
-        
-        # 尝试从<action>标签中提取内容
-        action_match = re.search(r'<action>(.*?)</action>', text, re.IGNORECASE | re.DOTALL)
-        if action_match:
-            action_text = action_match.group(1).strip()
-        
-        text_lower = action_text.lower()
-        
-        if "all-in" in text_lower or "allin" in text_lower:
-            return {'action': 'all-in'}
-        
-        if "raise" in text_lower:
-            numbers = re.findall(r'\d+', action_text) # Search in the extracted part
-            if numbers:
-                return {'action': 'raise', 'amount': int(numbers[0])}
-            else: # 如果LLM只说raise但没给金额，这是个问题，安全起见我们当作弃牌
-                return {'action': 'fold'}
-
-        if "call" in text_lower:
-            return {'action': 'call'}
-        
-        if "check" in text_lower:
-            return {'action': 'check'}
+        return parse_action(text)
 
-        if "fold" in text_lower:
-            return {'action': 'fold'}
-        
-        # 如果无法解析，默认弃牌
-        return {'action': 'fold'}
\ No newline at end of file
+
+# 进程内每个 llm_type 只有一个客户端：OpenAI 客户端可以多线程共用，多桌并发时共享同一个连接池，预热一次对所有桌生效
+_SHARED_CLIENTS: Dict[str, LLMClient] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def get_client(llm_type: str) -> LLMClient:
+    with _SHARED_LOCK:
+        if llm_type not in _SHARED_CLIENTS: _SHARED_CLIENTS[llm_type] = LLMClient(llm_type)
+        return _SHARED_CLIENTS[llm_type]
+
+
+def warm_up(llm_types: List[str], connections: int = 1) -> Dict[str, Dict[str, Any]]:
+    """并发地为每个 llm_type 发送 connections 个预热请求（同时在途，连接池因此保留同样多的连接）.
+    返回 {llm_type: {"seconds": [各请求耗时], "error": 错误信息或None}}；预热失败不影响之后的牌局."""
+    llm_types = [t for t in dict.fromkeys(llm_types) if t in LLM_CONFIGS]
+    results = {t: {"seconds": [], "error": None} for t in llm_types}
+    if not llm_types: return results
+
+    def run(llm_type: str):
+        try:
+            results[llm_type]["seconds"].append(get_client(llm_type).warmup())
+        except Exception as e:
+            results[llm_type]["error"] = str(e)
+
+    with ThreadPoolExecutor(max_workers=len(llm_types) * connections) as pool:
+        for t in llm_types:
+            for _ in range(connections): pool.submit(run, t)
+    return results
@@ -9,6 +9,8 @@ from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich import print as rprint
+from search_index import ReasoningIndex
+from rating import RatingStore
 
 
 class LogViewer:
@@ -45,12 +47,22 @@ class LogViewer:
         final_results = summary.get("final_results", {})
         if final_results:
             table = Table(title="最终筹码统计")
-            table.add_column("玩家", style="cyan"); table.add_column("最终筹码", style="green"); table.add_column("获胜次数", style="blue")
+            table.add_column("玩家", style="cyan"); table.add_column("LLM类型", style="magenta")
+            table.add_column("最终筹码", style="green"); table.add_column("获胜次数", style="blue")
+            table.add_column("实际盈亏", style="yellow"); table.add_column("全下调整EV", style="yellow")
+            table.add_column("运气因素", style="white"); table.add_column("全下摊牌手数", style="white")
             
             final_chips = final_results.get("final_chips", {})
             winner_stats = final_results.get("winner_stats", {})
+            player_types = final_results.get("player_types", {})
+            # 只有查看会话摘要时才需要牌力计算，列表、搜索、排行榜不导入牌局引擎
+            from analysis import analyze_session
+            ev_summary = analyze_session(str(session_dir))
             for player, chips in sorted(final_chips.items(), key=lambda x: x[1], reverse=True):
-                table.add_row(player, str(chips), str(winner_stats.get(player, 0)))
+                ev = ev_summary.get(player)
+                ev_cols = [f"{ev['net']:+d}", f"{ev['ev']:+.0f}", f"{ev['luck']:+.0f}", str(ev['all_in_hands'])] if ev else ["-"] * 4
+                table.add_row(player, player_types.get(player) or (ev or {}).get("llm_type") or "-",
+                              str(chips), str(winner_stats.get(player, 0)), *ev_cols)
             self.console.print(table)
         else:
             rprint("[yellow]会话未完成，无最终结果。[/yellow]")
@@ -81,16 +93,61 @@ class LogViewer:
         else:
             self.console.print("\n[bold red]--- 无需摊牌 ---[/bold red]")
 
+    def leaderboard(self):
+        if not self.log_dir.exists(): rprint(f"[red]日志目录不存在: {self.log_dir}[/red]"); return
+        store = RatingStore(str(self.log_dir))
+        new_sessions = store.update()
+        if new_sessions: rprint(f"[dim]评分已更新: 新计入 {new_sessions} 个会话[/dim]")
+        entries = store.leaderboard()
+        if not entries: rprint("[yellow]还没有已完成的会话可用于评分[/yellow]"); return
+
+        table = Table(title=f"模型排行榜 (Elo, 共 {len(store.processed_sessions)} 个会话)")
+        table.add_column("排名", style="white"); table.add_column("LLM类型", style="magenta")
+        table.add_column("评分", style="green"); table.add_column("会话数", style="yellow")
+        table.add_column("手牌数", style="yellow"); table.add_column("累计净盈亏", style="cyan")
+        for rank, e in enumerate(entries, 1):
+            table.add_row(str(rank), e["llm_type"], f"{e['rating']:.0f}", str(e["sessions"]), str(e["hands"]), f"{e['net_chips']:+.0f}")
+        self.console.print(table)
+
+    def search(self, query: str, page: int = 1, page_size: int = 20):
+        if not self.log_dir.exists(): rprint(f"[red]日志目录不存在: {self.log_dir}[/red]"); return
+        index = ReasoningIndex(str(self.log_dir))
+        try:
+            updated, removed = index.update()
+            if updated or removed: rprint(f"[dim]索引已更新: {updated} 个手牌文件, 移除 {removed} 个[/dim]")
+            total, results = index.search(query, page, page_size)
+        finally:
+            index.close()
+        if not results: rprint(f"[yellow]没有找到匹配 \"{query}\" 的决策[/yellow]"); return
+
+        total_pages = (total + page_size - 1) // page_size
+        table = Table(title=f"搜索 \"{query}\" - 共 {total} 条, 第 {page}/{total_pages} 页")
+        table.add_column("会话ID", style="cyan"); table.add_column("手牌", style="yellow")
+        table.add_column("轮次/序号", style="magenta"); table.add_column("玩家", style="green")
+        table.add_column("动作", style="blue"); table.add_column("相关度", style="white"); table.add_column("片段")
+        for r in results:
+            table.add_row(r["session_id"], str(r["hand_num"]), f"{r['round_name']}#{r['action_idx']}",
+                          r["player_name"], r["parsed_action"], f"{r['score']:.2f}", r["snippet"])
+        self.console.print(table)
+
 def main():
     parser = argparse.ArgumentParser(description="游戏日志查看工具")
     parser.add_argument("--log-dir", "-d", default="logs", help="日志目录")
     parser.add_argument("--list", "-l", action="store_true", help="列出所有会话")
     parser.add_argument("--session", "-s", help="查看特定会话的总结或手牌")
     parser.add_argument("--hand", "-n", type=int, help="查看特定手牌的详情")
+    parser.add_argument("--leaderboard", "-r", action="store_true", help="显示模型Elo排行榜（增量更新）")
+    parser.add_argument("--search", "-q", help="全文搜索LLM推理内容和决策动作")
+    parser.add_argument("--page", type=int, default=1, help="搜索结果页码 (默认: 1)")
+    parser.add_argument("--page-size", type=int, default=20, help="每页结果数 (默认: 20)")
     args = parser.parse_args()
     
     viewer = LogViewer(args.log_dir)
-    if args.session and args.hand:
+    if args.leaderboard:
+        viewer.leaderboard()
+    elif args.search:
+        viewer.search(args.search, args.page, args.page_size)
+    elif args.session and args.hand:
         viewer.view_hand(args.session, args.hand)
     elif args.session:
         viewer.view_session(args.session)
@@ -8,10 +8,32 @@ from datetime import datetime
 from typing import Dict, Any, List
 from pathlib import Path
 
+from metrics import METRICS
+
+CHECKPOINT_FILENAME = "checkpoint.json"
+
+def load_checkpoint(session_id: str, log_dir: str = "logs") -> Dict[str, Any]:
+    checkpoint_file = Path(log_dir) / session_id / CHECKPOINT_FILENAME
+    if not checkpoint_file.exists():
+        raise FileNotFoundError(f"会话没有检查点: {checkpoint_file}")
+    with open(checkpoint_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 class GameLogger:
-    def __init__(self, log_dir: str = "logs"):
+    def __init__(self, log_dir: str = "logs", session_id: str = None, resume: bool = False):
         self.log_dir = Path(log_dir)
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if resume:
+            # 继续已有会话：沿用原目录
+            self.session_id = session_id
+            if not (self.log_dir / session_id).is_dir():
+                raise FileNotFoundError(f"会话不存在: {self.log_dir / session_id}")
+        else:
+            base_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+            # 同一秒内创建的多个会话不能共用目录
+            self.session_id, suffix = base_id, 1
+            while (self.log_dir / self.session_id).exists():
+                suffix += 1
+                self.session_id = f"{base_id}_{suffix}"
         self.session_dir = self.log_dir / self.session_id
         self.session_dir.mkdir(parents=True, exist_ok=True)
         self.session_info = {
@@ -32,6 +54,18 @@ class GameLogger:
         self.current_hand_info = hand_info
         print(f"📝 开始记录第 {hand_num} 手牌")
     
+    def log_hand_setup(self, dealer: str, players: List[Any], deck_seed: str = None):
+        """记录发牌后的座位、LLM类型、手牌开始时筹码、底牌和牌序种子，供离线分析和复盘使用."""
+        self.current_hand_info["dealer"] = dealer
+        self.current_hand_info["deck_seed"] = deck_seed
+        self.current_hand_info["players"] = [{
+            "name": p.name,
+            "llm_type": p.llm_type,
+            "seat": seat,
+            "chips": p.chips_at_start_of_hand,
+            "hand": [str(c) for c in p.hand]
+        } for seat, p in enumerate(players)]
+
     def log_round_start(self, round_name: str, community_cards: List[str]):
         round_info = {
             "round_name": round_name,
@@ -71,24 +105,57 @@ class GameLogger:
             })
         self.current_hand_info["showdown"] = showdown_info
     
-    def log_hand_end(self, final_chips: Dict[str, int]):
+    def log_hand_end(self, final_chips: Dict[str, int], contributions: Dict[str, int] = None):
         self.current_hand_info["end_time"] = datetime.now().isoformat()
         self.current_hand_info["final_chips"] = final_chips
+        if contributions is not None:
+            self.current_hand_info["contributions"] = contributions
         hand_file = self.session_dir / f"hand_{self.current_hand_info['hand_num']}.json"
-        with open(hand_file, 'w', encoding='utf-8') as f:
-            json.dump(self.current_hand_info, f, ensure_ascii=False, indent=2)
+        rounds = self.current_hand_info.get("rounds") or [{}]
+        with METRICS.timer("log_write_seconds", kind="hand", street=rounds[-1].get("round_name", "preflop")):
+            with open(hand_file, 'w', encoding='utf-8') as f:
+                json.dump(self.current_hand_info, f, ensure_ascii=False, indent=2)
         print(f"💾 第 {self.current_hand_info['hand_num']} 手牌日志已保存: {hand_file}")
     
-    def log_session_end(self, final_chips: Dict[str, int], winner_stats: Dict[str, int]):
+    def log_session_end(self, final_chips: Dict[str, int], winner_stats: Dict[str, int],
+                        player_types: Dict[str, str] = None, status: str = "completed"):
         self.session_info["end_time"] = datetime.now().isoformat()
+        self.session_info["status"] = status
         self.session_info["final_results"] = {
             "final_chips": final_chips,
             "winner_stats": winner_stats
         }
+        if player_types is not None:
+            self.session_info["final_results"]["player_types"] = player_types
         session_file = self.session_dir / "session_summary.json"
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(self.session_info, f, ensure_ascii=False, indent=2)
+        with METRICS.timer("log_write_seconds", kind="session"):
+            with open(session_file, 'w', encoding='utf-8') as f:
+                json.dump(self.session_info, f, ensure_ascii=False, indent=2)
         print(f"💾 会话总结已保存: {session_file}")
 
+    def save_checkpoint(self, state: Dict[str, Any]):
+        """原子写入检查点，崩溃时不会留下半个文件."""
+        checkpoint_file = self.session_dir / CHECKPOINT_FILENAME
+        tmp_file = checkpoint_file.with_suffix(".tmp")
+        with METRICS.timer("log_write_seconds", kind="checkpoint"):
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({**state, "start_time": self.session_info["start_time"]}, f, ensure_ascii=False)
+            os.replace(tmp_file, checkpoint_file)
+
+    def restore_hands(self, last_hand: int, start_time: str = None):
+        """从已保存的手牌文件恢复会话记录；检查点之后才写入的手牌会在继续时重新进行并覆盖."""
+        if start_time: self.session_info["start_time"] = start_time
+        self.session_info["hands"] = []
+        for hand_num in range(1, last_hand + 1):
+            hand_file = self.session_dir / f"hand_{hand_num}.json"
+            if hand_file.exists():
+                with open(hand_file, 'r', encoding='utf-8') as f:
+                    self.session_info["hands"].append(json.load(f))
+        print(f"📂 已恢复 {len(self.session_info['hands'])} 手牌记录，从第 {last_hand + 1} 手继续")
+
+    def discard_hands_after(self, last_hand: int):
+        """丢弃检查点之后的手牌记录（包括被中断的那一手），使会话总结与检查点一致；这些手牌继续时会重新进行."""
+        self.session_info["hands"] = [h for h in self.session_info["hands"] if h["hand_num"] <= last_hand]
+
     def get_log_path(self) -> str:
         return str(self.session_dir)
\ No newline at end of file
@@ -2,10 +2,22 @@
 
 import argparse
 from game_manager import GameManager
-from config import GAME_CONFIG
+from analysis import analyze_session
+from duplicate import DuplicateMatch
+from sequential import SequentialTest, run_sequential
+from tournament import Tournament, results_by_type
+from budget import budget_report
+from config import BUDGET_CONFIG, GAME_CONFIG, LLM_CONFIGS, PROMPT_CONFIG, TOURNAMENT_CONFIG
+from llm_client import warm_up
+from logger import load_checkpoint
+from metrics import METRICS
+from spectator import SpectatorServer
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+import itertools
+import math
+import random
 import sys
 try:
     sys.stdout.reconfigure(line_buffering=True)
@@ -17,11 +29,36 @@ def main():
     parser = argparse.ArgumentParser(description="Multi-Agent LLM 德州扑克模拟器")
     parser.add_argument("--players", "-p", type=int, default=4, help=f"玩家数量 (默认: 4)")
     parser.add_argument("--chips", "-c", type=int, default=GAME_CONFIG['starting_chips'], help=f"起始筹码 (默认: {GAME_CONFIG['starting_chips']})")
-    parser.add_argument("--hands", "-n", type=int, default=10, help="游戏手数 (默认: 10)")
+    parser.add_argument("--hands", "-n", type=int, help="游戏手数 (默认: 10；锦标赛模式下为所有桌合计的手数上限，默认打到决出冠军)")
+    parser.add_argument("--seats", help="按座位顺序指定LLM类型，逗号分隔，如 model_1,model_2 (会覆盖 --players)；也可用内置策略 bot_random/bot_call/bot_tag/bot_equity")
+    parser.add_argument("--seed", type=int, help="牌序随机种子，指定后每手牌的牌序可复现")
+    parser.add_argument("--sequential", action="store_true", help="序贯检验模式：模型间胜负已分即提前停止，--hands 作为总手数预算")
+    parser.add_argument("--alpha", type=float, default=0.05, help="序贯检验的显著性水平 (默认: 0.05)")
+    parser.add_argument("--min-hands", type=int, default=30, help="序贯检验判定前的最少手数 (默认: 30)")
+    parser.add_argument("--tables", type=int, default=1, help="序贯检验模式下并发的桌数 (默认: 1)")
+    parser.add_argument("--resume", metavar="SESSION_ID", help="从会话的检查点继续，进行到第 --hands 手为止")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="每完成多少手牌保存一次检查点 (默认: 1)")
+    parser.add_argument("--duplicate", choices=["rotate", "permute"], help="复式对局：同一牌序下轮换(rotate)或全排列(permute)座位")
+    parser.add_argument("--tournament", action="store_true", help="多桌锦标赛：座位数不受单桌人数限制，盲注递增，出局后自动拆桌平衡，直到决出冠军")
+    parser.add_argument("--table-size", type=int, default=TOURNAMENT_CONFIG['table_size'], help=f"锦标赛每桌人数上限 (默认: {TOURNAMENT_CONFIG['table_size']})")
+    parser.add_argument("--hands-per-level", type=int, default=TOURNAMENT_CONFIG['hands_per_level'], help=f"锦标赛每个盲注级别平均每桌的手数 (默认: {TOURNAMENT_CONFIG['hands_per_level']})")
+    parser.add_argument("--spectate", type=int, metavar="PORT", help="在该端口启动观战服务（浏览器打开 http://localhost:PORT/，事件流为 /events）")
+    parser.add_argument("--spectate-host", default="127.0.0.1", help="观战服务监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--hud", action="store_true", help="在提示词中为每位对手显示会话累计统计（VPIP/PFR/AF/面对持续下注弃牌率）")
+    parser.add_argument("--budget", action="store_true", help="按决策点重要性为每次LLM请求选择 max_tokens 和推理强度（见 config.py 的 BUDGET_CONFIG），结束时按档位报告token和耗时节省（对比随机抽出的满预算对照组）")
+    parser.add_argument("--warmup", action="store_true", help="第一手牌前并发预热座位上的每个模型：建立连接并发送极小的请求，报告耗时")
+    parser.add_argument("--metrics-out", help="导出耗时与token指标，.json 为JSON快照，其他扩展名(如 .prom)为Prometheus文本格式")
     
     args = parser.parse_args()
+    seats = [s.strip() for s in args.seats.split(",")] if args.seats else None
+    if seats: args.players = len(seats)
+    if args.hands is None and not args.tournament: args.hands = 10
     
-    if not (GAME_CONFIG['min_players'] <= args.players <= GAME_CONFIG['max_players']):
+    if args.tournament:
+        if args.players < GAME_CONFIG['min_players']:
+            print(f"错误: 玩家数量至少为 {GAME_CONFIG['min_players']}")
+            return
+    elif not (GAME_CONFIG['min_players'] <= args.players <= GAME_CONFIG['max_players']):
         print(f"错误: 玩家数量必须在 {GAME_CONFIG['min_players']}-{GAME_CONFIG['max_players']} 之间")
         return
     
@@ -31,59 +68,264 @@ def main():
         "[bold blue]Multi-Agent LLM 德州扑克模拟器[/bold blue]\n"
         f"[green]玩家数量:[/green] {args.players}\n"
         f"[green]起始筹码:[/green] {args.chips}\n"
-        f"[green]游戏手数:[/green] {args.hands}",
+        f"[green]游戏手数:[/green] {args.hands if args.hands is not None else '直到决出冠军'}"
+        + (f"\n[green]随机种子:[/green] {args.seed}" if args.seed is not None else "")
+        + (f"\n[green]复式模式:[/green] {args.duplicate}" if args.duplicate else ""),
         title="游戏设置"
     )
     console.print(title)
     
+    # 所有模式（复式、序贯、锦标赛）创建的牌桌都读取该配置
+    if args.hud: PROMPT_CONFIG["show_hud"] = True
+    if args.budget: BUDGET_CONFIG["enabled"] = True
+
+    game_manager = None
+    spectator = None
+    if args.spectate is not None:
+        spectator = SpectatorServer(args.spectate_host, args.spectate).start()
+        console.print(f"[bold blue]观战地址:[/bold blue] [u]http://{args.spectate_host}:{spectator.port}/[/u]")
     try:
-        game_manager = GameManager(args.players, args.chips)
-        results = game_manager.play_game(args.hands)
-        
-        console.print("\n" + "="*60)
-        console.print("[bold green]游戏结束！[/bold green]")
-        console.print("="*60)
-        
-        log_path = game_manager.logger.get_log_path()
-        console.print(f"\n[bold blue]详细日志已保存到:[/bold blue] [u]{log_path}[/u]")
-        
-        table = Table(title="最终结果统计")
-        table.add_column("玩家", style="cyan")
-        table.add_column("LLM类型", style="magenta")
-        table.add_column("最终筹码", style="green")
-        table.add_column("总盈亏", style="yellow")
-        table.add_column("获胜手数", style="blue")
+        if args.warmup:
+            warm_types = load_checkpoint(args.resume)["seat_llm_types"] if args.resume else \
+                seats or [t for t, _ in zip(itertools.cycle(LLM_CONFIGS), range(args.players))]
+            # 并发的桌数决定同一模型同时在途的请求数，连接池预热同样多的连接
+            connections = args.tables if args.sequential else \
+                math.ceil(len(warm_types) / args.table_size) if args.tournament else 1
+            run_warmup(console, warm_types, connections)
 
-        final_chips = results['final_chips']
-        winner_stats = results['winner_stats']
+        if args.duplicate:
+            run_duplicate(console, args, seats)
+            return
         
-        # 获取初始玩家列表和他们的LLM类型
-        player_llm_map = {p.name: p.llm_type for p in getattr(game_manager, 'all_players', game_manager.game.players)}
+        if args.sequential:
+            run_sequential_mode(console, args, seats)
+            return
         
-        # 按最终筹码排序
-        sorted_players = sorted(final_chips.items(), key=lambda item: item[1], reverse=True)
-
-        for player_name, chips in sorted_players:
-            profit = chips - args.chips
-            profit_text = f"+{profit}" if profit > 0 else str(profit)
-            profit_style = "green" if profit > 0 else "red" if profit < 0 else "white"
-            
-            table.add_row(
-                player_name,
-                player_llm_map.get(player_name, "N/A"),
-                str(chips),
-                f"[{profit_style}]{profit_text}[/{profit_style}]",
-                str(winner_stats.get(player_name, 0))
-            )
+        if args.tournament:
+            run_tournament(console, args, seats)
+            return
         
-        console.print(table)
+        if args.resume:
+            game_manager = GameManager.resume(args.resume, checkpoint_every=args.checkpoint_every)
+        else:
+            game_manager = GameManager(args.players, args.chips, seats, seed=args.seed,
+                                       checkpoint_every=args.checkpoint_every)
+        results = game_manager.play_game(args.hands)
+        
+        print_results(console, game_manager, results, game_manager.all_players[0].initial_chips)
         
     except KeyboardInterrupt:
         console.print("\n[yellow]游戏被用户中断[/yellow]")
+        if game_manager is not None:
+            console.print(f"[yellow]可使用 --resume {game_manager.logger.session_id} --hands {args.hands} 继续[/yellow]")
     except Exception as e:
         console.print(f"\n[bold red]游戏运行出错: {e}[/bold red]")
         import traceback
         traceback.print_exc()
+    finally:
+        if spectator: spectator.stop()
+        print_metrics(console)
+        if args.metrics_out:
+            METRICS.export(args.metrics_out)
+            console.print(f"[bold blue]指标已导出到:[/bold blue] [u]{args.metrics_out}[/u]")
+
+def run_warmup(console: Console, llm_types, connections: int):
+    results = warm_up(llm_types, connections)
+    if not results: return
+    table = Table(title=f"模型预热 (每个模型 {connections} 个连接)")
+    table.add_column("LLM类型", style="magenta")
+    table.add_column("成功请求", style="white")
+    table.add_column("最快(毫秒)", style="green")
+    table.add_column("最慢(毫秒)", style="yellow")
+    table.add_column("错误", style="red")
+    for llm_type, r in results.items():
+        seconds = r["seconds"]
+        table.add_row(llm_type, f"{len(seconds)}/{connections}",
+                      f"{min(seconds) * 1000:.0f}" if seconds else "-", f"{max(seconds) * 1000:.0f}" if seconds else "-",
+                      r["error"] or "")
+    console.print(table)
+
+def print_results(console: Console, game_manager: GameManager, results: dict, starting_chips: int):
+    console.print("\n" + "="*60)
+    console.print("[bold green]游戏结束！[/bold green]")
+    console.print("="*60)
+    
+    log_path = game_manager.logger.get_log_path()
+    console.print(f"\n[bold blue]详细日志已保存到:[/bold blue] [u]{log_path}[/u]")
+    
+    table = Table(title="最终结果统计")
+    table.add_column("玩家", style="cyan")
+    table.add_column("LLM类型", style="magenta")
+    table.add_column("最终筹码", style="green")
+    table.add_column("总盈亏", style="yellow")
+    table.add_column("全下调整EV", style="yellow")
+    table.add_column("获胜手数", style="blue")
+
+    final_chips = results['final_chips']
+    winner_stats = results['winner_stats']
+    
+    # 获取初始玩家列表和他们的LLM类型
+    player_llm_map = {p.name: p.llm_type for p in getattr(game_manager, 'all_players', game_manager.game.players)}
+    
+    # 全下调整EV：按全下时刻胜率分配底池，剔除发牌运气
+    ev_summary = analyze_session(log_path)
+    
+    # 按最终筹码排序
+    sorted_players = sorted(final_chips.items(), key=lambda item: item[1], reverse=True)
+
+    for player_name, chips in sorted_players:
+        profit = chips - starting_chips
+        profit_text = f"+{profit}" if profit > 0 else str(profit)
+        profit_style = "green" if profit > 0 else "red" if profit < 0 else "white"
+        ev = ev_summary.get(player_name)
+        ev_text = f"{ev['ev']:+.0f}" if ev else "N/A"
+        
+        table.add_row(
+            player_name,
+            player_llm_map.get(player_name, "N/A"),
+            str(chips),
+            f"[{profit_style}]{profit_text}[/{profit_style}]",
+            ev_text,
+            str(winner_stats.get(player_name, 0))
+        )
+    
+    console.print(table)
+
+def print_metrics(console: Console):
+    """按阶段打印耗时分位数和token用量，用于区分模型延迟、提示词膨胀和磁盘I/O."""
+    snapshot = METRICS.snapshot()
+    if not snapshot["histograms"]: return
+
+    table = Table(title="耗时统计 (毫秒)")
+    table.add_column("阶段", style="cyan")
+    table.add_column("标签", style="magenta")
+    table.add_column("次数", style="white")
+    table.add_column("p50", style="green")
+    table.add_column("p95", style="yellow")
+    table.add_column("p99", style="red")
+    table.add_column("总计(秒)", style="blue")
+    for h in snapshot["histograms"]:
+        labels = ", ".join(f"{k}={v}" for k, v in h["labels"].items()) or "-"
+        table.add_row(h["name"], labels, str(h["count"]),
+                      f"{h['p50'] * 1000:.1f}", f"{h['p95'] * 1000:.1f}", f"{h['p99'] * 1000:.1f}", f"{h['sum']:.2f}")
+    console.print(table)
+
+    if snapshot["counters"]:
+        table = Table(title="计数统计")
+        table.add_column("指标", style="cyan")
+        table.add_column("标签", style="magenta")
+        table.add_column("值", style="green")
+        for c in snapshot["counters"]:
+            labels = ", ".join(f"{k}={v}" for k, v in c["labels"].items()) or "-"
+            table.add_row(c["name"], labels, f"{c['value']:.0f}")
+        console.print(table)
+
+    report = budget_report(snapshot)
+    if report:
+        table = Table(title=f"推理预算 (节省量对比同档随机 {BUDGET_CONFIG.get('control_rate', 0):.0%} 决策按满预算请求的对照组)")
+        table.add_column("LLM类型", style="magenta")
+        table.add_column("档位", style="cyan")
+        table.add_column("决策数", style="white")
+        table.add_column("平均token", style="green")
+        table.add_column("平均耗时(秒)", style="green")
+        table.add_column("截断", style="red")
+        table.add_column("对照组决策数", style="white")
+        table.add_column("对照组平均token", style="green")
+        table.add_column("节省token", style="yellow")
+        table.add_column("节省耗时(秒)", style="yellow")
+        for r in report:
+            table.add_row(r["llm_type"], r["tier"], str(r["decisions"]), f"{r['avg_tokens']:.0f}", f"{r['avg_seconds']:.2f}",
+                          f"{r['truncated']:.0f}",
+                          str(r["control_decisions"]),
+                          f"{r['control_avg_tokens']:.0f}" if r["control_avg_tokens"] is not None else "-",
+                          f"{r['saved_tokens']:.0f}" if r["saved_tokens"] is not None else "-",
+                          f"{r['saved_seconds']:.1f}" if r["saved_seconds"] is not None else "-")
+        console.print(table)
+
+def run_duplicate(console: Console, args, seats):
+    llm_types = seats or [t for t, _ in zip(itertools.cycle(LLM_CONFIGS), range(args.players))]
+    seed = args.seed if args.seed is not None else random.randrange(2**31)
+    match = DuplicateMatch(llm_types, args.chips, seed, args.duplicate)
+    results = match.play(args.hands)
+
+    console.print("\n" + "="*60)
+    console.print(f"[bold green]复式对局结束！[/bold green] 种子: {seed}, 座位组合: {len(match.seatings)}")
+    console.print("="*60)
+    console.print(f"\n[bold blue]各组会话日志:[/bold blue] {', '.join(match.session_ids)}")
+
+    table = Table(title="复式对局结果 (每手牌跨座位对冲后)")
+    table.add_column("LLM类型", style="magenta")
+    table.add_column("手数", style="white")
+    table.add_column("净盈亏", style="yellow")
+    table.add_column("每手均值", style="green")
+    table.add_column("bb/100", style="cyan")
+    table.add_column("95%置信区间", style="blue")
+    for llm_type, r in sorted(results.items(), key=lambda item: item[1]["total"], reverse=True):
+        table.add_row(
+            llm_type,
+            str(r["deals"]),
+            f"{r['total']:+.1f}",
+            f"{r['mean_per_deal']:+.2f}",
+            f"{r['bb_per_100']:+.1f}",
+            f"±{r['bb_per_100_ci95']:.1f}"
+        )
+    console.print(table)
+
+def run_sequential_mode(console: Console, args, seats):
+    llm_types = seats or [t for t, _ in zip(itertools.cycle(LLM_CONFIGS), range(args.players))]
+    test = SequentialTest(llm_types, alpha=args.alpha, min_hands=args.min_hands, hand_budget=args.hands)
+    managers = run_sequential(args.tables, args.players, args.chips, test, seats, seed=args.seed)
+
+    for manager in managers:
+        print_results(console, manager, manager.get_final_results(), args.chips)
+
+    status = "已分出胜负" if test.decided else "达到手数预算，未能分出胜负" if test.budget_exhausted else "对局已结束，未能分出胜负"
+    table = Table(title=f"序贯检验结果 ({status}, 共 {test.hands_seen} 手, α={args.alpha})")
+    table.add_column("比较", style="magenta")
+    table.add_column("有效手数", style="white")
+    table.add_column("差值 bb/100", style="yellow")
+    table.add_column("置信半径 bb/100", style="blue")
+    table.add_column("结论", style="green")
+    for c in test.summary():
+        a, b = c["pair"]
+        conclusion = f"{c['leader']} 更强" if c["decided"] else "未定"
+        radius = f"±{c['radius_bb'] * 100:.1f}" if c["radius_bb"] != float("inf") else "∞"
+        table.add_row(f"{a} vs {b}", str(c["hands"]), f"{c['mean_bb'] * 100:+.1f}", radius, conclusion)
+    console.print(table)
+
+def run_tournament(console: Console, args, seats):
+    llm_types = seats or [t for t, _ in zip(itertools.cycle(LLM_CONFIGS), range(args.players))]
+    tournament = Tournament(llm_types, args.chips, table_size=args.table_size, hands_per_level=args.hands_per_level,
+                            seed=args.seed, max_hands=args.hands)
+    console.print(f"[bold blue]锦标赛开始:[/bold blue] {len(llm_types)} 位玩家, {len(tournament.tables)} 张桌")
+    standings = tournament.run()
+
+    small_blind, big_blind = tournament.blind_levels[tournament.level]
+    console.print("\n" + "="*60)
+    console.print(f"[bold green]锦标赛结束！[/bold green] 共 {tournament.total_hands} 手, "
+                  f"最终盲注 {small_blind}/{big_blind}, 换桌 {tournament.moves} 次")
+    console.print("="*60)
+    console.print(f"\n[bold blue]锦标赛总结:[/bold blue] [u]{tournament.summary_path}[/u]")
+
+    table = Table(title="最终名次")
+    table.add_column("名次", style="white")
+    table.add_column("玩家", style="cyan")
+    table.add_column("LLM类型", style="magenta")
+    table.add_column("筹码", style="green")
+    table.add_column("获胜手数", style="blue")
+    for s in standings:
+        table.add_row(str(s["place"]), s["name"], s["llm_type"], str(s["chips"]), str(s["hands_won"]))
+    console.print(table)
+
+    table = Table(title="按LLM类型汇总")
+    table.add_column("LLM类型", style="magenta")
+    table.add_column("座位数", style="white")
+    table.add_column("平均名次", style="green")
+    table.add_column("冠军", style="yellow")
+    table.add_column("前1/3比例", style="cyan")
+    for llm_type, r in sorted(results_by_type(standings).items(), key=lambda item: item[1]["avg_place"]):
+        table.add_row(llm_type, str(r["seats"]), f"{r['avg_place']:.1f}", str(r["wins"]), f"{r['itm_rate']:.0%}")
+    console.print(table)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
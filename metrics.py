@@ -0,0 +1,140 @@
+# metrics.py
+
+"""
+运行指标 - 关键路径耗时直方图(p50/p95/p99)与token计数，可导出为 Prometheus 文本格式或 JSON 快照
+"""
+
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+# 每个序列最多保留的样本数，超出后用蓄水池抽样估计分位数（count/sum 始终精确）
+MAX_SAMPLES = 100_000
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "llmpoker_"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values: return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+class _Series:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+    def observe(self, value: float, rng: random.Random):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            idx = rng.randrange(self.count)
+            if idx < MAX_SAMPLES: self.samples[idx] = value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms: Dict[str, Dict[LabelKey, _Series]] = defaultdict(dict)
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            series = self._histograms[name].setdefault(_label_key(labels), _Series())
+            series.observe(value, self._rng)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[name][_label_key(labels)] += value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            histograms = []
+            for name, series_by_labels in sorted(self._histograms.items()):
+                for labels, series in sorted(series_by_labels.items()):
+                    values = sorted(series.samples)
+                    histograms.append({
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": series.count,
+                        "sum": series.sum,
+                        "max": series.max,
+                        **{f"p{int(q * 100)}": _quantile(values, q) for q in QUANTILES}
+                    })
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for name, values in sorted(self._counters.items())
+                        for labels, value in sorted(values.items())]
+        return {"timestamp": time.time(), "histograms": histograms, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        """以 Prometheus 文本格式输出：耗时为 summary 类型（带分位数），token等为 counter 类型."""
+        def fmt_labels(labels: Dict[str, str], extra: Dict[str, str] = None) -> str:
+            items = {**labels, **(extra or {})}
+            if not items: return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in items.values())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in zip(items, escaped)) + "}"
+
+        snapshot = self.snapshot()
+        lines, declared = [], set()
+        for h in snapshot["histograms"]:
+            name = METRIC_PREFIX + h["name"]
+            if name not in declared:
+                lines.append(f"# TYPE {name} summary")
+                declared.add(name)
+            for q in QUANTILES:
+                lines.append(f"{name}{fmt_labels(h['labels'], {'quantile': str(q)})} {h[f'p{int(q * 100)}']}")
+            lines.append(f"{name}_sum{fmt_labels(h['labels'])} {h['sum']}")
+            lines.append(f"{name}_count{fmt_labels(h['labels'])} {h['count']}")
+        for c in snapshot["counters"]:
+            name = METRIC_PREFIX + c["name"]
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{fmt_labels(c['labels'])} {c['value']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """按扩展名导出：.json 为快照，其他（如 .prom）为 Prometheus 文本格式."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".json":
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+
+
+# 进程内全局指标注册表
+METRICS = MetricsRegistry()
@@ -2,7 +2,7 @@
 import random
 from collections import defaultdict
 from itertools import combinations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple
 
 # --- 1. 定义基本元素：牌、牌组 ---
 SUITS = '♠♥♦♣'
@@ -17,16 +17,66 @@ class Card:
     def __repr__(self): return self.__str__()
     def __lt__(self, other): return self.value < other.value
 
+def parse_card(text: str) -> Card:
+    """把日志中的牌面字符串（如 'A♠'）还原为Card."""
+    return Card(text[0], text[1])
+
+# 牌对象创建后不会被修改，从快照还原时共用同一批对象
+_CARDS = {f"{rank}{suit}": Card(rank, suit) for rank in RANKS for suit in SUITS}
+
 class Deck:
-    def __init__(self):
+    def __init__(self, seed=None, cards: Optional[List[Card]] = None):
+        # 传入seed时使用独立的随机数发生器，同一seed总是得到同一副牌序
+        self.rng = random.Random(seed) if seed is not None else random
+        if cards is not None:
+            # 按给定的剩余牌序还原，不再洗牌
+            self.cards = list(cards)
+            return
         self.cards = [Card(rank, suit) for rank in RANKS for suit in SUITS]
         self.shuffle()
-    def shuffle(self): random.shuffle(self.cards)
+    def shuffle(self): self.rng.shuffle(self.cards)
     def deal(self, n=1):
         if len(self.cards) < n: raise ValueError("牌不够了")
         return [self.cards.pop() for _ in range(n)]
 
-# --- 2. 定义玩家 ---
+# --- 2. 牌型评估 ---
+HAND_NAMES = {9: "同花顺", 8: "四条", 7: "葫芦", 6: "同花", 5: "顺子", 4: "三条", 3: "两对", 2: "一对", 1: "高牌"}
+
+def hand_rank(hand) -> tuple:
+    """计算5张牌的可比较牌力，不生成展示用的牌型细节."""
+    values = sorted([c.value for c in hand], reverse=True)
+    is_straight = len(set(values)) == 5 and (values[0] - values[4] == 4)
+    if values == [14, 5, 4, 3, 2]: is_straight, values = True, [5, 4, 3, 2, 1]
+    is_flush = len({c.suit for c in hand}) == 1
+    if is_straight and is_flush: return (9, values[0])
+    counts = sorted([(values.count(v), v) for v in set(values)], reverse=True)
+    vals_by_count = [v for _, v in counts]
+    if counts[0][0] == 4: return (8, vals_by_count)
+    if counts[0][0] == 3 and counts[1][0] == 2: return (7, vals_by_count)
+    if is_flush: return (6, values)
+    if is_straight: return (5, values[0])
+    if counts[0][0] == 3: return (4, vals_by_count)
+    if counts[0][0] == 2 and counts[1][0] == 2: return (3, vals_by_count)
+    if counts[0][0] == 2: return (2, vals_by_count)
+    return (1, values)
+
+def evaluate_hand(hand):
+    """返回 (牌力, (牌型名称, 按牌型排序的5张牌))."""
+    rank = hand_rank(hand)
+    category = rank[0]
+    if category in (9, 6, 5, 1):
+        cards = sorted(hand, reverse=True)
+    else:
+        values = [c.value for c in hand]
+        cards = sorted(hand, key=lambda c: (values.count(c.value), c.value), reverse=True)
+    name = "皇家同花顺" if category == 9 and rank[1] == 14 else HAND_NAMES[category]
+    return rank, (name, cards)
+
+def best_hand_rank(cards) -> tuple:
+    """在5-7张牌中取最大的5张组合牌力."""
+    return max(hand_rank(combo) for combo in combinations(cards, 5))
+
+# --- 3. 定义玩家 ---
 class Player:
     def __init__(self, name: str, chips: int, llm_type: str):
         self.name = name
@@ -51,13 +101,53 @@ class Player:
     def __str__(self): return f"{self.name} ({self.chips}筹码, {self.llm_type})"
     def __repr__(self): return self.name
 
-# --- 3. 核心：游戏引擎 ---
+# --- 4. 状态快照 ---
+class PlayerSnapshot(NamedTuple):
+    name: str
+    llm_type: str
+    initial_chips: int
+    chips_at_start_of_hand: int
+    chips: int
+    hand: Tuple[str, ...]
+    bet_in_round: int
+    bet_in_hand: int
+    is_active: bool
+    is_all_in: bool
+
+
+class GameSnapshot(NamedTuple):
+    """PokerGame 某一时刻的不可变状态：只含整数、字符串和元组，可直接共享、作为字典键或 pickle 后发给工作进程.
+    玩家用座位号引用，牌用 'A♠' 形式的字符串，deck 为剩余牌序（最后一张最先发出）."""
+    players: Tuple[PlayerSnapshot, ...]
+    small_blind: int
+    big_blind: int
+    dealer_pos: int
+    small_blind_pos: int
+    big_blind_pos: int
+    hand_count: int
+    deck_seed: Optional[str]
+    deck: Tuple[str, ...]
+    community_cards: Tuple[str, ...]
+    pots: Tuple[Tuple[int, Tuple[int, ...]], ...]
+    current_bet: int
+    min_raise_amount: int
+    action_player_idx: int
+    last_raiser: int
+
+# --- 5. 核心：游戏引擎 ---
 class PokerGame:
-    def __init__(self, players_with_llm: List[dict], starting_chips: int, small_blind: int, big_blind: int):
+    def __init__(self, players_with_llm: List[dict], starting_chips: int, small_blind: int, big_blind: int,
+                 seed: Optional[int] = None):
         self.players = [Player(p['name'], starting_chips, p['llm_type']) for p in players_with_llm]
         self.num_players = len(self.players)
         self.small_blind, self.big_blind = small_blind, big_blind
-        self.deck = Deck()
+        # seed为空时每手牌随机生成牌序种子；否则第k手牌的牌序只由 (seed, k) 决定，与之前的牌局发展无关
+        self.seed = seed
+        self.rng = random.Random()
+        self.hand_count = 0
+        self.deck_seed = None
+        # 每手牌开始时才按牌序种子洗牌，这里只放一副空牌
+        self.deck = Deck(cards=[])
         self.dealer_pos = -1
         self._reset_hand_state()
 
@@ -68,6 +158,8 @@ class PokerGame:
         self.min_raise_amount = self.big_blind
         self.action_player_idx = -1
         self.last_raiser = None
+        # apply_action 的撤销日志，每条记录一个动作改动前的字段
+        self.undo_log = []
 
     def start_new_hand(self):
         # 移除筹码为0的玩家
@@ -78,12 +170,18 @@ class PokerGame:
         self._reset_hand_state()
         for p in self.players: p.reset_for_new_hand()
 
-        self.deck = Deck()
+        self.hand_count += 1
+        self.deck_seed = self._next_deck_seed()
+        self.deck = Deck(self.deck_seed)
         self.dealer_pos = (self.dealer_pos + 1) % self.num_players
         
         for p in self.players: p.hand = self.deck.deal(2)
         return True
 
+    def _next_deck_seed(self) -> str:
+        if self.seed is None: return str(self.rng.getrandbits(64))
+        return f"{self.seed}:{self.hand_count}"
+
     def deal_community(self, count): self.community_cards.extend(self.deck.deal(count))
 
     def get_player(self, index: int) -> Player: return self.players[index % self.num_players]
@@ -152,6 +250,62 @@ class PokerGame:
                 self._execute_bet(player, bet_amount)
                 return f"{player.name} All-in {bet_amount}"
 
+    def apply_action(self, player: Player, action: str, amount: int = 0):
+        """与 handle_action 相同，同时记录撤销信息：一个动作只会改动该玩家和下注状态的固定几个字段，记录和撤销都是O(1)."""
+        self.undo_log.append((player, player.chips, player.bet_in_round, player.bet_in_hand, player.is_active,
+                              player.is_all_in, self.current_bet, self.min_raise_amount, self.last_raiser,
+                              self.action_player_idx))
+        return self.handle_action(player, action, amount)
+
+    def undo(self):
+        """撤销最近一次 apply_action（调用方之后移动的 action_player_idx 也一并还原）."""
+        (player, player.chips, player.bet_in_round, player.bet_in_hand, player.is_active, player.is_all_in,
+         self.current_bet, self.min_raise_amount, self.last_raiser, self.action_player_idx) = self.undo_log.pop()
+
+    def undo_to(self, depth: int):
+        """撤销到撤销日志只剩 depth 条记录，用于回到某个分支点."""
+        while len(self.undo_log) > depth: self.undo()
+
+    def snapshot(self) -> GameSnapshot:
+        seat = {p: i for i, p in enumerate(self.players)}
+        return GameSnapshot(
+            players=tuple(PlayerSnapshot(p.name, p.llm_type, p.initial_chips, p.chips_at_start_of_hand, p.chips,
+                                         tuple(map(str, p.hand)), p.bet_in_round, p.bet_in_hand, p.is_active,
+                                         p.is_all_in) for p in self.players),
+            small_blind=self.small_blind, big_blind=self.big_blind, dealer_pos=self.dealer_pos,
+            small_blind_pos=getattr(self, 'small_blind_pos', -1), big_blind_pos=getattr(self, 'big_blind_pos', -1),
+            hand_count=self.hand_count, deck_seed=self.deck_seed,
+            deck=tuple(map(str, self.deck.cards)), community_cards=tuple(map(str, self.community_cards)),
+            pots=tuple((pot['amount'], tuple(sorted(seat[p] for p in pot['eligible_players']))) for pot in self.pots),
+            current_bet=self.current_bet, min_raise_amount=self.min_raise_amount,
+            action_player_idx=self.action_player_idx,
+            last_raiser=seat[self.last_raiser] if self.last_raiser is not None else -1
+        )
+
+    @staticmethod
+    def from_snapshot(snap: GameSnapshot) -> "PokerGame":
+        """由快照构造一个独立的牌局（撤销日志为空），不重新洗牌；seed 未保存，之后的新手牌随机发牌."""
+        game = PokerGame([], 0, snap.small_blind, snap.big_blind)
+        for s in snap.players:
+            p = Player(s.name, s.initial_chips, s.llm_type)
+            p.chips_at_start_of_hand, p.chips, p.hand = s.chips_at_start_of_hand, s.chips, [_CARDS[c] for c in s.hand]
+            p.bet_in_round, p.bet_in_hand, p.is_active, p.is_all_in = s.bet_in_round, s.bet_in_hand, s.is_active, s.is_all_in
+            game.players.append(p)
+        game.num_players = len(game.players)
+        game.dealer_pos, game.hand_count, game.deck_seed = snap.dealer_pos, snap.hand_count, snap.deck_seed
+        if snap.small_blind_pos >= 0: game.small_blind_pos = snap.small_blind_pos
+        if snap.big_blind_pos >= 0: game.big_blind_pos = snap.big_blind_pos
+        game.deck = Deck(cards=[_CARDS[c] for c in snap.deck])
+        game.community_cards = [_CARDS[c] for c in snap.community_cards]
+        game.pots = [{'amount': amount, 'eligible_players': {game.players[i] for i in seats}} for amount, seats in snap.pots]
+        game.current_bet, game.min_raise_amount = snap.current_bet, snap.min_raise_amount
+        game.action_player_idx = snap.action_player_idx
+        game.last_raiser = game.players[snap.last_raiser] if snap.last_raiser >= 0 else None
+        return game
+
+    def clone(self) -> "PokerGame":
+        return PokerGame.from_snapshot(self.snapshot())
+
     def _execute_bet(self, player: Player, amount: int):
         final_amount = min(amount, player.chips)
         player.chips -= final_amount
@@ -161,71 +315,41 @@ class PokerGame:
         if player.chips == 0: player.is_all_in = True
 
     def collect_bets_and_manage_pots(self):
-        all_bets = sorted([(p, p.bet_in_hand) for p in self.players if p.bet_in_hand > 0], key=lambda x: x[1])
-        
-        pots = []
-        last_bet_level = 0
-        
-        for player, total_bet in all_bets:
-            if total_bet > last_bet_level:
-                pot_level = total_bet - last_bet_level
-                pot_players = {p for p, bet in all_bets if bet >= total_bet}
-                pots.append({'amount': pot_level * len(pot_players), 'eligible_players': pot_players})
-                last_bet_level = total_bet
-
-        # Merge new contributions into existing pots
-        if not self.pots:
-            self.pots = pots
-        else:
-            # This logic is complex. For now, a simpler full recalculation at the end is safer
-            pass
-
-        # Full recalculation approach (safer)
+        """按投入金额排序后一次扫描构造主池和边池：每个未弃牌玩家的投入金额是一层，
+        弃牌玩家的投入计入覆盖它的那一层，高于所有未弃牌玩家的部分并入最后一个底池，不会因无人有资格而丢失."""
         self.pots = []
-        players_in_hand = [p for p in self.players if p.bet_in_hand > 0]
-        if not players_in_hand: return
-        
-        bet_levels = sorted(list(set(p.bet_in_hand for p in players_in_hand if p.is_all_in)))
-
-        last_level = 0
-        for level in bet_levels:
-            pot_amount = 0
-            eligible_players = set()
-            for p in players_in_hand:
-                contribution = min(max(0, p.bet_in_hand - last_level), level - last_level)
-                if contribution > 0:
-                    pot_amount += contribution
-                    eligible_players.add(p)
-            if pot_amount > 0:
-                self.pots.append({'amount': pot_amount, 'eligible_players': eligible_players})
-            last_level = level
-
-        # Main pot for remaining bets
-        main_pot_amount = 0
-        main_pot_players = set()
-        for p in players_in_hand:
-            contribution = max(0, p.bet_in_hand - last_level)
-            if contribution > 0:
-                main_pot_amount += contribution
-                main_pot_players.add(p)
-        if main_pot_amount > 0:
-            self.pots.append({'amount': main_pot_amount, 'eligible_players': main_pot_players})
+        contributors = sorted((p for p in self.players if p.bet_in_hand > 0), key=lambda p: p.bet_in_hand)
+        live = [p for p in contributors if p.is_active]
+        last_level, folded, live_seen = 0, 0, 0
+        for i, p in enumerate(contributors):
+            if not p.is_active:
+                # 弃牌玩家只贡献到自己的投入金额，计入下一层
+                folded += p.bet_in_hand - last_level
+            elif p.bet_in_hand > last_level:
+                # 排在当前位置及之后的玩家都投入了至少 bet_in_hand
+                amount = folded + (p.bet_in_hand - last_level) * (len(contributors) - i)
+                self.pots.append({'amount': amount, 'eligible_players': set(live[live_seen:])})
+                last_level, folded = p.bet_in_hand, 0
+            if p.is_active: live_seen += 1
+        if folded:
+            if self.pots: self.pots[-1]['amount'] += folded
+            else: self.pots.append({'amount': folded, 'eligible_players': {p for p in self.players if p.is_active}})
 
     def determine_winners(self):
+        """每位未弃牌玩家每手牌只评估一次牌力，所有底池共用这份排名."""
+        ranking = {}
         results = []
         for pot in self.pots:
-            eligible = [p for p in pot['eligible_players'] if p.is_active]
+            eligible = [p for p in self.players if p.is_active and p in pot['eligible_players']]
             if not eligible: continue
             if len(eligible) == 1:
                 winners, best_hand_details = eligible, ("未摊牌", "")
             else:
-                best_rank, winners, best_hand_details = (-1,), [], None
-                for player in eligible:
-                    rank, details = self._get_best_hand(player)
-                    if rank > best_rank:
-                        best_rank, winners, best_hand_details = rank, [player], details
-                    elif rank == best_rank:
-                        winners.append(player)
+                for p in eligible:
+                    if p not in ranking: ranking[p] = self._get_best_hand(p)
+                best_rank = max(ranking[p][0] for p in eligible)
+                winners = [p for p in eligible if ranking[p][0] == best_rank]
+                best_hand_details = ranking[winners[0]][1]
             results.append({'pot': pot, 'winners': winners, 'hand_details': best_hand_details})
         return results
 
@@ -247,22 +371,4 @@ class PokerGame:
                 sorted_winners = sorted(winners, key=lambda p: (self.players.index(p) - self.dealer_pos -1 + self.num_players) % self.num_players)
                 for i in range(rem): sorted_winners[i].chips += 1
 
-    def _evaluate_hand(self, hand):
-        values = sorted([c.value for c in hand], reverse=True)
-        suits = [c.suit for c in hand]
-        is_straight = len(set(values)) == 5 and (max(values) - min(values) == 4)
-        if values == [14, 5, 4, 3, 2]: is_straight, values = True, [5, 4, 3, 2, 1]
-        is_flush = len(set(suits)) == 1
-        counts = sorted([(v, values.count(v)) for v in set(values)], key=lambda x: (x[1], x[0]), reverse=True)
-        vals_by_count = [v[0] for v in counts]
-        counts_dict = dict(counts)
-
-        if is_straight and is_flush: return (9, values[0]), ("皇家同花顺" if values[0]==14 else "同花顺", sorted(hand, reverse=True))
-        if counts[0][1] == 4: return (8, vals_by_count), ("四条", sorted(hand, key=lambda c: (counts_dict.get(c.value, 0), c.value), reverse=True))
-        if counts[0][1] == 3 and counts[1][1] == 2: return (7, vals_by_count), ("葫芦", sorted(hand, key=lambda c: (counts_dict.get(c.value, 0), c.value), reverse=True))
-        if is_flush: return (6, values), ("同花", sorted(hand, reverse=True))
-        if is_straight: return (5, values[0]), ("顺子", sorted(hand, reverse=True))
-        if counts[0][1] == 3: return (4, vals_by_count), ("三条", sorted(hand, key=lambda c: (counts_dict.get(c.value, 0), c.value), reverse=True))
-        if counts[0][1] == 2 and counts[1][1] == 2: return (3, vals_by_count), ("两对", sorted(hand, key=lambda c: (counts_dict.get(c.value, 0), c.value), reverse=True))
-        if counts[0][1] == 2: return (2, vals_by_count), ("一对", sorted(hand, key=lambda c: (counts_dict.get(c.value, 0), c.value), reverse=True))
-        return (1, values), ("高牌", sorted(hand, reverse=True))
\ No newline at end of file
+    def _evaluate_hand(self, hand): return evaluate_hand(hand)
\ No newline at end of file
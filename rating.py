@@ -0,0 +1,126 @@
+# rating.py
+
+"""
+模型评分 - 以每个已完成会话为一局多人比赛，按 llm_type 做增量 Elo 评分，并持久化已处理的会话
+"""
+
+import json
+import itertools
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+
+RATINGS_FILENAME = "ratings.json"
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+
+
+def expected_score(rating_a: float, rating_b: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400))
+
+
+def _session_player_types(session_dir: Path, final_results: Dict[str, Any]) -> Dict[str, str]:
+    """玩家名 -> llm_type。旧日志没有记录类型时，从手牌日志的座位信息补全.
+    不用LLM请求的模型名推断：同一 llm_type 的模型名可能不同，会把一个类型拆成多个评分."""
+    player_types = dict(final_results.get("player_types") or {})
+    missing = set(final_results.get("final_chips", {})) - set(player_types)
+    for hand_file in session_dir.glob("hand_*.json"):
+        if not missing: break
+        with open(hand_file, 'r', encoding='utf-8') as f: hand_data = json.load(f)
+        for p in hand_data.get("players", []):
+            if p["name"] in missing and p.get("llm_type"): player_types[p["name"]] = p["llm_type"]
+        missing -= set(player_types)
+    return player_types
+
+
+class RatingStore:
+    def __init__(self, log_dir: str = "logs", path: str = None, k_factor: float = K_FACTOR):
+        self.log_dir = Path(log_dir)
+        self.path = Path(path) if path else self.log_dir / RATINGS_FILENAME
+        self.k_factor = k_factor
+        self.ratings: Dict[str, Dict[str, Any]] = {}
+        self.processed_sessions: List[str] = []
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f: data = json.load(f)
+            self.ratings = data.get("ratings", {})
+            self.processed_sessions = data.get("processed_sessions", [])
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "updated_at": datetime.now().isoformat(),
+            "ratings": self.ratings,
+            "processed_sessions": self.processed_sessions
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.path)
+
+    def _entry(self, llm_type: str) -> Dict[str, Any]:
+        return self.ratings.setdefault(llm_type, {"rating": INITIAL_RATING, "sessions": 0, "hands": 0, "net_chips": 0})
+
+    def update(self) -> int:
+        """只处理尚未计入评分的已完成会话（按会话ID即时间顺序），返回新处理的会话数."""
+        if not self.log_dir.exists(): return 0
+        processed = set(self.processed_sessions)
+        new_sessions = sorted(d for d in self.log_dir.iterdir()
+                              if d.is_dir() and d.name not in processed and (d / "session_summary.json").exists())
+        count = 0
+        for session_dir in new_sessions:
+            with open(session_dir / "session_summary.json", 'r', encoding='utf-8') as f: summary = json.load(f)
+            if summary.get("status") == "imported":
+                # 导入的外部牌谱不是模型之间的对局
+                self.processed_sessions.append(session_dir.name)
+                continue
+            final_results = summary.get("final_results")
+            if not final_results or summary.get("status") == "interrupted":
+                continue  # 会话未正常结束，等结束（或继续后结束）再计入
+            if summary.get("status") == "tournament_table":
+                # 锦标赛单桌的玩家中途换桌，筹码不是一局完整对局的结果，标记为已处理但不计分
+                self.processed_sessions.append(session_dir.name)
+                continue
+            # 无法确定所有玩家类型的旧会话标记为已处理但不计分
+            if self.record_session(session_dir, summary): count += 1
+            self.processed_sessions.append(session_dir.name)
+        if len(self.processed_sessions) > len(processed): self.save()
+        return count
+
+    def record_session(self, session_dir: Path, summary: Dict[str, Any]) -> bool:
+        """计入一局会话；有玩家的 llm_type 无法确定时不计分，返回False."""
+        final_results = summary["final_results"]
+        final_chips = final_results.get("final_chips", {})
+        player_types = _session_player_types(session_dir, final_results)
+        if set(final_chips) - set(player_types): return False
+        hands = summary.get("hands", [])
+        start_chips = (hands[0].get("game_config", {}).get("starting_chips") or [0])[0] if hands else 0
+
+        # 同一模型占多个座位时取平均净盈亏作为该模型本局成绩
+        nets: Dict[str, List[int]] = {}
+        for name, chips in final_chips.items(): nets.setdefault(player_types[name], []).append(chips - start_chips)
+        scores = {t: sum(v) / len(v) for t, v in nets.items()}
+        self.record_result(scores, len(hands))
+        return True
+
+    def record_result(self, scores: Dict[str, float], hands: int = 0):
+        """多人Elo：把一局拆成所有模型两两之间的对局，同时结算，K值按对手数量均摊."""
+        for t, score in scores.items():
+            entry = self._entry(t)
+            entry["sessions"] += 1
+            entry["hands"] += hands
+            entry["net_chips"] += score
+        if len(scores) < 2: return
+        k = self.k_factor / (len(scores) - 1)
+        before = {t: self.ratings[t]["rating"] for t in scores}
+        deltas = dict.fromkeys(scores, 0.0)
+        for a, b in itertools.combinations(scores, 2):
+            actual = 1.0 if scores[a] > scores[b] else 0.5 if scores[a] == scores[b] else 0.0
+            change = k * (actual - expected_score(before[a], before[b]))
+            deltas[a] += change
+            deltas[b] -= change
+        for t, delta in deltas.items():
+            self.ratings[t]["rating"] += delta
+
+    def leaderboard(self) -> List[Dict[str, Any]]:
+        return sorted(({"llm_type": t, **entry} for t, entry in self.ratings.items()),
+                      key=lambda e: e["rating"], reverse=True)
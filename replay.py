@@ -0,0 +1,216 @@
+# replay.py
+
+"""
+确定性复盘 - 按日志记录的座位、筹码、牌序种子和动作，在当前引擎上重新执行每手牌（不调用LLM），
+并报告与日志中 final_chips 等结果的差异。用于引擎改动的回归测试和免推理的离线分析。
+"""
+
+import argparse
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Iterator
+
+from rich.console import Console
+from rich.table import Table
+
+from config import GAME_CONFIG
+from game_manager import GameManager
+from poker_engine import PokerGame, Player, Card, RANKS, SUITS, parse_card
+
+
+class ReplayDivergence(Exception):
+    """引擎的执行过程与日志记录不一致."""
+
+
+class _ReplayGame(PokerGame):
+    """按日志还原牌序：有牌序种子时用种子重新洗牌并校验底牌，否则直接按日志摆放底牌和公共牌."""
+
+    def __init__(self, hand_data: Dict[str, Any]):
+        setup = hand_data["players"]
+        config = hand_data.get("game_config", {})
+        super().__init__(
+            players_with_llm=[{"name": p["name"], "llm_type": p["llm_type"]} for p in setup],
+            starting_chips=0,
+            small_blind=config.get("small_blind", GAME_CONFIG['small_blind']),
+            big_blind=config.get("big_blind", GAME_CONFIG['big_blind'])
+        )
+        for player, p in zip(self.players, setup):
+            player.chips = player.initial_chips = p["chips"]
+        dealer_seat = next(p["seat"] for p in setup if p["name"] == hand_data.get("dealer"))
+        self.dealer_pos = dealer_seat - 1
+        self.logged_hands = {p["name"]: p["hand"] for p in setup}
+        self.logged_deck_seed = hand_data.get("deck_seed")
+        rounds = hand_data.get("rounds", [])
+        self.logged_board = rounds[-1]["community_cards"] if rounds else []
+
+    def _next_deck_seed(self) -> str:
+        return self.logged_deck_seed
+
+    def start_new_hand(self):
+        if not super().start_new_hand(): return False
+        if self.logged_deck_seed is None:
+            # 旧日志没有牌序种子：按日志摆牌，公共牌按发牌顺序放在牌堆顶
+            for p in self.players: p.hand = [parse_card(c) for c in self.logged_hands[p.name]]
+            used = {c for cards in self.logged_hands.values() for c in cards} | set(self.logged_board)
+            rest = [Card(rank, suit) for rank in RANKS for suit in SUITS if f"{rank}{suit}" not in used]
+            self.deck.cards = rest + [parse_card(c) for c in reversed(self.logged_board)]
+            return True
+        for p in self.players:
+            dealt = [str(c) for c in p.hand]
+            if dealt != self.logged_hands[p.name]:
+                raise ReplayDivergence(f"{p.name} 的底牌不一致: 引擎 {dealt}, 日志 {self.logged_hands[p.name]}")
+        return True
+
+
+class _ReplayLogger:
+    """替代 GameLogger：不写文件，而是逐轮提供日志中的动作并校验轮次与公共牌."""
+
+    def __init__(self, hand_data: Dict[str, Any]):
+        self.rounds = hand_data.get("rounds", [])
+        self.round_idx = -1
+        self.pending = deque()
+        self.final_chips = None
+        self.contributions = None
+
+    def _round_name(self) -> str:
+        return self.rounds[self.round_idx]["round_name"] if 0 <= self.round_idx < len(self.rounds) else "?"
+
+    def _check_round_consumed(self):
+        if self.pending:
+            names = [a["player_name"] for a in self.pending]
+            raise ReplayDivergence(f"{self._round_name()} 轮提前结束，日志中还有 {len(names)} 个动作未执行: {names}")
+
+    def next_action(self, player_name: str) -> Dict[str, Any]:
+        if not self.pending:
+            raise ReplayDivergence(f"{self._round_name()} 轮引擎要求 {player_name} 行动，但日志中本轮已没有动作")
+        action = self.pending.popleft()
+        if action["player_name"] != player_name:
+            raise ReplayDivergence(f"{self._round_name()} 轮行动顺序不一致: 引擎 {player_name}, 日志 {action['player_name']}")
+        return action
+
+    def log_hand_start(self, hand_num, game_config): pass
+    def log_hand_setup(self, dealer, players, deck_seed=None): pass
+    def log_player_action(self, *args, **kwargs): pass
+    def log_showdown(self, winner_results): pass
+
+    def log_round_start(self, round_name: str, community_cards: List[str]):
+        self._check_round_consumed()
+        self.round_idx += 1
+        if self.round_idx >= len(self.rounds):
+            raise ReplayDivergence(f"引擎进入了日志中没有的 {round_name} 轮")
+        logged = self.rounds[self.round_idx]
+        if logged["round_name"] != round_name or logged["community_cards"] != community_cards:
+            raise ReplayDivergence(f"轮次不一致: 引擎 {round_name} {community_cards}, "
+                                   f"日志 {logged['round_name']} {logged['community_cards']}")
+        self.pending = deque(logged.get("actions", []))
+
+    def log_hand_end(self, final_chips: Dict[str, int], contributions: Dict[str, int] = None):
+        self._check_round_consumed()
+        if self.round_idx + 1 < len(self.rounds):
+            raise ReplayDivergence(f"引擎在 {self._round_name()} 轮后结束，日志中还有 {len(self.rounds) - self.round_idx - 1} 轮")
+        self.final_chips = final_chips
+        self.contributions = contributions
+
+
+class ReplayManager(GameManager):
+    """复用 GameManager 的整手牌流程，动作来自日志而不是LLM."""
+
+    def __init__(self, on_decision: Callable[["ReplayManager", Player, Dict[str, Any]], None] = None):
+        # 不调用父类构造：复盘不需要LLM客户端，也不写日志文件；牌局在每手复盘时按日志创建
+        self._init_bare(PokerGame([], 0, GAME_CONFIG['small_blind'], GAME_CONFIG['big_blind']))
+        # 每个决策点回调 (manager, player, 日志中的动作)，此时引擎状态正处于该玩家行动前
+        self.on_decision = on_decision
+
+    def _get_player_action(self, player: Player) -> tuple:
+        action_log = self.logger.next_action(player.name)
+        if self.on_decision: self.on_decision(self, player, action_log)
+        return dict(action_log["parsed_action"]), action_log.get("llm_input"), action_log.get("llm_output")
+
+    def run_hand(self, hand_data: Dict[str, Any], logger: _ReplayLogger):
+        """在引擎上执行一手日志牌局，动作由 logger 提供；不一致时抛出 ReplayDivergence."""
+        self.game = _ReplayGame(hand_data)
+        self.all_players = list(self.game.players)
+        self.winner_stats = {p.name: 0 for p in self.all_players}
+        self.hand_results.clear()
+        self.logger = logger
+        self._play_hand(hand_data["hand_num"])
+
+    def replay_hand(self, hand_data: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"hand_num": hand_data.get("hand_num"), "status": "ok", "divergences": []}
+        if not hand_data.get("players") or "final_chips" not in hand_data:
+            result["status"] = "skipped"
+            return result
+
+        try:
+            self.run_hand(hand_data, _ReplayLogger(hand_data))
+        except ReplayDivergence as e:
+            result["divergences"].append(str(e))
+        else:
+            for name, logged in hand_data["final_chips"].items():
+                actual = self.logger.final_chips.get(name)
+                if actual != logged:
+                    result["divergences"].append(f"{name} 最终筹码不一致: 引擎 {actual}, 日志 {logged}")
+            for name, logged in (hand_data.get("contributions") or {}).items():
+                actual = (self.logger.contributions or {}).get(name)
+                if actual != logged:
+                    result["divergences"].append(f"{name} 投入筹码不一致: 引擎 {actual}, 日志 {logged}")
+        if result["divergences"]: result["status"] = "diverged"
+        return result
+
+
+def iter_hand_files(log_dir: str, session_id: str = None, hand_num: int = None) -> Iterator[Path]:
+    log_dir = Path(log_dir)
+    sessions = [log_dir / session_id] if session_id else sorted(d for d in log_dir.iterdir() if d.is_dir())
+    for session_dir in sessions:
+        if hand_num is not None:
+            hand_file = session_dir / f"hand_{hand_num}.json"
+            if hand_file.exists(): yield hand_file
+            continue
+        yield from sorted(session_dir.glob("hand_*.json"), key=lambda f: int(f.stem.split("_")[1]))
+
+
+def replay_logs(log_dir: str, session_id: str = None, hand_num: int = None,
+                on_decision: Callable = None) -> Iterator[Dict[str, Any]]:
+    """逐手复盘日志，产出每手牌的复盘结果（附带 session_id）."""
+    manager = ReplayManager(on_decision)
+    for hand_file in iter_hand_files(log_dir, session_id, hand_num):
+        with open(hand_file, 'r', encoding='utf-8') as f: hand_data = json.load(f)
+        result = manager.replay_hand(hand_data)
+        result["session_id"] = hand_file.parent.name
+        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按日志确定性复盘牌局，检查引擎结果是否与日志一致")
+    parser.add_argument("--log-dir", "-d", default="logs", help="日志目录")
+    parser.add_argument("--session", "-s", help="只复盘特定会话")
+    parser.add_argument("--hand", "-n", type=int, help="只复盘特定手牌")
+    parser.add_argument("--max-report", type=int, default=20, help="最多显示的不一致手牌数 (默认: 20)")
+    args = parser.parse_args()
+
+    console = Console()
+
+    counts = {"ok": 0, "diverged": 0, "skipped": 0}
+    diverged: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    for result in replay_logs(args.log_dir, args.session, args.hand):
+        counts[result["status"]] += 1
+        if result["status"] == "diverged": diverged.append(result)
+    elapsed = time.perf_counter() - start
+
+    replayed = counts["ok"] + counts["diverged"]
+    rate = replayed / elapsed if elapsed > 0 else 0.0
+    console.print(f"复盘 {replayed} 手牌: [green]一致 {counts['ok']}[/green], [red]不一致 {counts['diverged']}[/red], "
+                  f"[yellow]跳过 {counts['skipped']}[/yellow] (缺少座位信息的旧日志), 用时 {elapsed:.2f}s ({rate:.0f} 手/秒)")
+    if diverged:
+        table = Table(title="不一致的手牌")
+        table.add_column("会话ID", style="cyan"); table.add_column("手牌", style="yellow"); table.add_column("差异", style="red")
+        for r in diverged[:args.max_report]:
+            table.add_row(r["session_id"], str(r["hand_num"]), "\n".join(r["divergences"]))
+        console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# search_index.py
+
+"""
+推理文本全文索引 - 基于SQLite FTS5，对日志中每个动作的 llm_output 与 parsed_action 建立增量倒排索引
+"""
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+INDEX_FILENAME = "search_index.db"
+
+# FTS5的unicode61分词器会把连续的中日韩字符当成一个词，这里在入库和查询前把每个CJK字符拆成独立的词
+_CJK_CHAR = r'[぀-ヿ㐀-䶿一-鿿豈-﫿＀-￯]'
+_CJK_RE = re.compile(f'({_CJK_CHAR})')
+_CJK_GAP_RE = re.compile(f'(?<={_CJK_CHAR}) (?={_CJK_CHAR})')
+_QUERY_TERM_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def _segment(text: str) -> str:
+    return _CJK_RE.sub(r' \1 ', text)
+
+
+def _unsegment(text: str) -> str:
+    return _CJK_GAP_RE.sub('', re.sub(r' {2,}', ' ', text)).strip()
+
+
+def _action_text(parsed_action: Dict[str, Any]) -> str:
+    if not parsed_action: return ""
+    parts = [str(parsed_action.get('action', ''))]
+    if 'amount' in parsed_action: parts.append(str(parsed_action['amount']))
+    return " ".join(parts)
+
+
+def build_match_query(query: str) -> str:
+    """把用户输入转成FTS5查询：每个词（或引号内短语）作为一个短语，多个词之间为AND关系."""
+    terms = []
+    for phrase, word in _QUERY_TERM_RE.findall(query):
+        term = _segment(phrase or word).strip()
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"')
+    return " ".join(terms)
+
+
+class ReasoningIndex:
+    def __init__(self, log_dir: str = "logs", index_path: str = None):
+        self.log_dir = Path(log_dir)
+        self.index_path = Path(index_path) if index_path else self.log_dir / INDEX_FILENAME
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.index_path))
+        self._init_schema()
+
+    def _init_schema(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS indexed_files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS actions USING fts5(
+                llm_output, parsed_action,
+                path UNINDEXED, session_id UNINDEXED, hand_num UNINDEXED,
+                round_name UNINDEXED, action_idx UNINDEXED, player_name UNINDEXED,
+                tokenize = 'unicode61'
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def update(self) -> Tuple[int, int]:
+        """增量更新索引：只重新解析新增或修改过的 hand_*.json，并清理已删除的文件.
+
+        返回 (重新索引的文件数, 删除的文件数)。
+        """
+        known = {path: (mtime, size) for path, mtime, size in
+                 self.conn.execute("SELECT path, mtime_ns, size FROM indexed_files")}
+        seen, updated = set(), 0
+        if self.log_dir.exists():
+            for hand_file in self.log_dir.glob("*/hand_*.json"):
+                path = str(hand_file.relative_to(self.log_dir))
+                seen.add(path)
+                stat = hand_file.stat()
+                if known.get(path) == (stat.st_mtime_ns, stat.st_size): continue
+                try:
+                    with open(hand_file, 'r', encoding='utf-8') as f: hand_data = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                self._index_hand(path, hand_file.parent.name, hand_data)
+                self.conn.execute("INSERT OR REPLACE INTO indexed_files VALUES (?, ?, ?)",
+                                  (path, stat.st_mtime_ns, stat.st_size))
+                updated += 1
+
+        removed = [path for path in known if path not in seen]
+        for path in removed:
+            self.conn.execute("DELETE FROM actions WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM indexed_files WHERE path = ?", (path,))
+        self.conn.commit()
+        return updated, len(removed)
+
+    def _index_hand(self, path: str, session_id: str, hand_data: Dict[str, Any]):
+        self.conn.execute("DELETE FROM actions WHERE path = ?", (path,))
+        hand_num = hand_data.get("hand_num")
+        rows = []
+        for round_data in hand_data.get("rounds", []):
+            for idx, action in enumerate(round_data.get("actions", [])):
+                rows.append((
+                    _segment(action.get("llm_output") or ""),
+                    _segment(_action_text(action.get("parsed_action"))),
+                    path, session_id, hand_num, round_data.get("round_name"), idx, action.get("player_name")
+                ))
+        self.conn.executemany("INSERT INTO actions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def search(self, query: str, page: int = 1, page_size: int = 20) -> Tuple[int, List[Dict[str, Any]]]:
+        """按BM25相关度排序返回 (命中总数, 当前页结果)."""
+        match = build_match_query(query)
+        if not match: return 0, []
+        total = self.conn.execute("SELECT count(*) FROM actions WHERE actions MATCH ?", (match,)).fetchone()[0]
+        cursor = self.conn.execute("""
+            SELECT session_id, hand_num, round_name, action_idx, player_name, parsed_action,
+                   snippet(actions, -1, '[', ']', '…', 24), bm25(actions, 1.0, 2.0)
+            FROM actions WHERE actions MATCH ?
+            ORDER BY bm25(actions, 1.0, 2.0)
+            LIMIT ? OFFSET ?
+        """, (match, page_size, max(0, page - 1) * page_size))
+        results = [{
+            "session_id": session_id,
+            "hand_num": hand_num,
+            "round_name": round_name,
+            "action_idx": action_idx,
+            "player_name": player_name,
+            "parsed_action": _unsegment(parsed_action),
+            "snippet": _unsegment(snippet),
+            "score": -score,
+        } for session_id, hand_num, round_name, action_idx, player_name, parsed_action, snippet, score in cursor]
+        return total, results
@@ -0,0 +1,140 @@
+# sequential.py
+
+"""
+序贯检验 - 每手牌结束后更新模型间 bb 差值的置信序列，一旦胜负已分或达到手数预算即停止对局
+"""
+
+import itertools
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from config import GAME_CONFIG
+from game_manager import GameManager
+
+
+class PairwiseConfidenceSequence:
+    """两个 llm_type 每手牌平均盈亏之差（单位bb）的正态混合置信序列.
+
+    半径 = σ·sqrt((n+m)·(ln((n+m)/m) + 2·ln(1/α))) / n，m 为边界最紧的手数附近。σ 已知时该边界对任意时刻同时成立，
+    可以每手牌查看一次而不放大第一类错误；这里 σ 是样本标准差的代入估计，而全下带来的盈亏是重尾的，
+    所以只是近似保证：前 min_hands 手不下结论，以免σ估计偏小时过早停止。
+    """
+
+    def __init__(self, llm_type_a: str, llm_type_b: str, alpha: float = 0.05,
+                 min_hands: int = 30, tuning_hands: int = 100):
+        self.llm_type_a, self.llm_type_b = llm_type_a, llm_type_b
+        self.alpha = alpha
+        self.min_hands = min_hands
+        self.tuning_hands = tuning_hands
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, diff_bb: float):
+        # Welford在线均值/方差
+        self.n += 1
+        delta = diff_bb - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (diff_bb - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def radius(self) -> float:
+        if self.n < 2: return math.inf
+        m = self.tuning_hands
+        return self.std * math.sqrt((self.n + m) * (math.log((self.n + m) / m) + 2 * math.log(1 / self.alpha))) / self.n
+
+    @property
+    def decided(self) -> bool:
+        return self.n >= self.min_hands and abs(self.mean) > self.radius
+
+    @property
+    def leader(self) -> Optional[str]:
+        if not self.decided: return None
+        return self.llm_type_a if self.mean > 0 else self.llm_type_b
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "pair": (self.llm_type_a, self.llm_type_b),
+            "hands": self.n,
+            "mean_bb": self.mean,
+            "radius_bb": self.radius,
+            "decided": self.decided,
+            "leader": self.leader,
+        }
+
+
+class SequentialTest:
+    """对所有 llm_type 两两比较，全部分出胜负时即可停止。线程安全，可供多桌共享.
+    每对比较使用 alpha / 比较数（Bonferroni校正），使所有比较合起来的错误率不超过 alpha."""
+
+    def __init__(self, llm_types: List[str], alpha: float = 0.05, min_hands: int = 30,
+                 hand_budget: int = None, big_blind: int = GAME_CONFIG['big_blind']):
+        types = list(dict.fromkeys(llm_types))
+        if len(types) < 2:
+            raise ValueError("序贯检验至少需要两种不同的LLM类型")
+        pairs = list(itertools.combinations(types, 2))
+        self.comparisons = [PairwiseConfidenceSequence(a, b, alpha / len(pairs), min_hands) for a, b in pairs]
+        self.hand_budget = hand_budget
+        self.big_blind = big_blind
+        self.hands_seen = 0
+        self._lock = threading.Lock()
+
+    def update(self, results_by_type: Dict[str, List[int]]):
+        """results_by_type: 本手牌每个llm_type下各座位的筹码盈亏."""
+        with self._lock:
+            self.hands_seen += 1
+            means = {t: sum(v) / len(v) / self.big_blind for t, v in results_by_type.items() if v}
+            for c in self.comparisons:
+                if c.llm_type_a in means and c.llm_type_b in means:
+                    c.update(means[c.llm_type_a] - means[c.llm_type_b])
+
+    @property
+    def decided(self) -> bool:
+        return all(c.decided for c in self.comparisons)
+
+    @property
+    def budget_exhausted(self) -> bool:
+        return self.hand_budget is not None and self.hands_seen >= self.hand_budget
+
+    def should_stop(self, manager: GameManager) -> bool:
+        """作为 GameManager.play_game 的 should_stop 回调：记录刚结束的一手牌并判断是否停止."""
+        if manager.hand_results:
+            llm_map = {p.name: p.llm_type for p in manager.all_players}
+            by_type: Dict[str, List[int]] = {}
+            for name, delta in manager.hand_results[-1]["results"].items():
+                by_type.setdefault(llm_map[name], []).append(delta)
+            self.update(by_type)
+        with self._lock:
+            return self.decided or self.budget_exhausted
+
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [c.summary() for c in self.comparisons]
+
+
+def run_sequential(num_tables: int, num_players: int, starting_chips: int, test: SequentialTest,
+                   seat_llm_types: List[str] = None, seed: int = None) -> List[GameManager]:
+    """在多张桌上并发对局，所有桌共享同一个序贯检验，满足停止条件后各桌在当前手牌结束时停止.
+
+    每手牌重置为起始筹码，使每手牌的观测相互独立，也避免有人破产后对局提前结束。
+    """
+    # 在主线程依次创建，避免多桌的日志目录在同一秒内冲突
+    managers = [
+        GameManager(num_players, starting_chips, seat_llm_types,
+                    seed=None if seed is None else seed + table_idx, reset_stacks=True)
+        for table_idx in range(num_tables)
+    ]
+    max_hands = test.hand_budget or 10**9
+    if num_tables == 1:
+        managers[0].play_game(max_hands, should_stop=test.should_stop)
+        return managers
+    with ThreadPoolExecutor(max_workers=num_tables) as pool:
+        futures = [pool.submit(m.play_game, max_hands, test.should_stop) for m in managers]
+        for f in futures: f.result()
+    return managers
@@ -0,0 +1,183 @@
+# spectator.py
+
+"""
+观战服务 - 订阅事件总线，通过 asyncio 实现的 Server-Sent Events 把所有桌的牌局事件实时推送给观众。
+每个观众一个有界队列：跟不上时合并同一桌的筹码快照、丢弃最旧的事件并通知客户端落后了多少，牌局线程永不等待观众
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit, parse_qs
+
+from events import EVENTS, EventBus
+from metrics import METRICS
+
+DEFAULT_PORT = 8766
+CLIENT_QUEUE_SIZE = 256
+KEEPALIVE_SECONDS = 15
+# 只保留最新一份即可的快照事件：队列中已有同一桌的旧快照时直接替换
+COALESCE_TYPES = {"hand_end"}
+
+_INDEX_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>LLM Poker 观战</title>
+<style>body{font-family:monospace;margin:1em}.table{border:1px solid #ccc;margin:.5em;padding:.5em;display:inline-block;vertical-align:top;width:30em;height:20em;overflow:auto}</style>
+</head><body><h3>LLM Poker 观战</h3><div id="tables"></div>
+<script>
+const tables = {};
+const source = new EventSource("/events" + location.search);
+source.onmessage = (msg) => {
+  const e = JSON.parse(msg.data);
+  const id = e.table || "-";
+  if (!tables[id]) {
+    tables[id] = document.createElement("div");
+    tables[id].className = "table";
+    document.getElementById("tables").appendChild(tables[id]);
+  }
+  // 玩家名、动作说明等都来自事件，只作为文本插入，不按HTML解析
+  let lines = [e.type];
+  if (e.type === "hand_start") { tables[id].replaceChildren(); lines = [`[${id}] 手牌 #${e.hand_num} 庄家 ${e.dealer} 盲注 ${e.small_blind}/${e.big_blind}`]; }
+  else if (e.type === "street") lines = [`--- ${e.street.toUpperCase()} [${e.board.join(" ")}]`];
+  else if (e.type === "action") lines = [`${e.message} (底池 ${e.pot})`];
+  else if (e.type === "showdown") lines = e.pots.map(p => `底池 ${p.amount} → ${p.winners.join(", ")} ${p.hand_name}`);
+  else if (e.type === "hand_end") lines = [Object.entries(e.chips).map(([n, c]) => `${n}: ${c}`).join(" | ")];
+  else if (e.type === "lagged") lines = [`(连接过慢，跳过了 ${e.dropped} 个事件)`];
+  for (const text of lines) {
+    const div = document.createElement("div");
+    div.textContent = text;
+    tables[id].appendChild(div);
+  }
+  tables[id].scrollTop = tables[id].scrollHeight;
+};
+</script></body></html>
+"""
+
+
+class _ClientQueue:
+    """单个观众的有界队列，只在事件循环线程中访问."""
+
+    def __init__(self, maxsize: int, table: Optional[str]):
+        self.events = deque()
+        self.maxsize = maxsize
+        self.table = table
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def put(self, event: Dict[str, Any], payload: str):
+        if self.table is not None and event["table"] != self.table: return
+        if event["type"] in COALESCE_TYPES:
+            for i, (queued, _) in enumerate(self.events):
+                if queued["type"] == event["type"] and queued["table"] == event["table"]:
+                    self.events[i] = (event, payload)
+                    return
+        if len(self.events) >= self.maxsize:
+            self.events.popleft()
+            self.dropped += 1
+            METRICS.inc("spectator_events_dropped_total")
+        self.events.append((event, payload))
+        self.ready.set()
+
+    async def get(self) -> str:
+        while not self.events:
+            self.ready.clear()
+            await self.ready.wait()
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return json.dumps({"type": "lagged", "dropped": dropped})
+        return self.events.popleft()[1]
+
+
+class SpectatorServer:
+    """在后台线程运行 asyncio 事件循环；总线回调只调用 call_soon_threadsafe，不会阻塞发布事件的牌局线程."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, bus: EventBus = EVENTS,
+                 queue_size: int = CLIENT_QUEUE_SIZE):
+        self.host, self.port = host, port
+        self.bus = bus
+        self.queue_size = queue_size
+        self.clients = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._started = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SpectatorServer":
+        self._thread = threading.Thread(target=self._run, name="spectator", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        self.bus.subscribe(self._on_event)
+        return self
+
+    def stop(self):
+        self.bus.unsubscribe(self._on_event)
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        # 端口为0时使用系统分配的端口
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # 停止时结束仍在推送的观众连接
+            self._server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks: task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def _on_event(self, event: Dict[str, Any]):
+        self.loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Dict[str, Any]):
+        # 每个事件只序列化一次，所有观众共享
+        payload = json.dumps(event, ensure_ascii=False)
+        for client in self.clients: client.put(event, payload)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""): pass
+            if len(request_line) < 2 or request_line[0] != "GET":
+                return await self._respond(writer, "405 Method Not Allowed", "text/plain", b"")
+            url = urlsplit(request_line[1])
+            if url.path == "/":
+                return await self._respond(writer, "200 OK", "text/html; charset=utf-8", _INDEX_HTML.encode("utf-8"))
+            if url.path != "/events":
+                return await self._respond(writer, "404 Not Found", "text/plain", b"")
+            table = parse_qs(url.query).get("table", [None])[0]
+            await self._stream(writer, _ClientQueue(self.queue_size, table))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: str, content_type: str, body: bytes):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("utf-8") + body)
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, client: _ClientQueue):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\n")
+        self.clients.add(client)
+        METRICS.inc("spectator_connections_total")
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(client.get(), KEEPALIVE_SECONDS)
+                    writer.write(f"data: {payload}\n\n".encode("utf-8"))
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                # 慢客户端只会阻塞自己的协程，事件继续进入它的有界队列
+                await writer.drain()
+        finally:
+            self.clients.discard(client)
+
@@ -4,101 +4,1171 @@
 
 import sys
 import os
+import shutil
+import time
 
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from poker_game import PokerGame, Player
+from poker_engine import PokerGame, Player, parse_card
 from llm_client import LLMClient
-from config import PROMPT_CONFIG
+from config import GAME_CONFIG, LLM_CONFIGS
+
+
+def _cards(text):
+    return [parse_card(c) for c in text.split()]
+
+
+def _new_game(num_players, starting_chips=1000, seed=None):
+    players = [{"name": f"Player-{i+1}", "llm_type": "test"} for i in range(num_players)]
+    return PokerGame(players, starting_chips, GAME_CONFIG['small_blind'], GAME_CONFIG['big_blind'], seed=seed)
 
 
 def test_poker_game():
     """测试扑克游戏基本功能"""
     print("测试扑克游戏基本功能...")
-    
-    # 创建游戏
-    game = PokerGame(num_players=3, starting_chips=1000)
-    
-    # 测试发牌
-    game.deal_cards()
+
+    # 创建游戏并发牌
+    game = _new_game(3, seed=7)
+    assert game.start_new_hand()
     print(f"玩家手牌:")
     for player in game.players:
-        hand_text = game.get_player_hand_text(player)
-        print(f"  {player.name}: {hand_text}")
-    
+        assert len(player.hand) == 2
+        print(f"  {player.name}: {' '.join(map(str, player.hand))}")
+
     # 测试发公共牌
-    game.deal_community_cards(3)
-    print(f"公共牌: {game._cards_to_text(game.community_cards)}")
-    
-    # 测试游戏状态文本
-    state_text = game.get_game_state_text()
-    print(f"游戏状态文本长度: {len(state_text)} 字符")
-    
+    game.deal_community(3)
+    assert len(game.community_cards) == 3
+    print(f"公共牌: {' '.join(map(str, game.community_cards))}")
+    dealt = [str(c) for p in game.players for c in p.hand] + [str(c) for c in game.community_cards]
+    assert len(set(dealt)) == len(dealt)
+
+    # 相同种子的牌序可复现
+    replay = _new_game(3, seed=7)
+    replay.start_new_hand()
+    assert [str(c) for p in replay.players for c in p.hand] == dealt[:6]
+
     print("✅ 扑克游戏基本功能测试通过")
 
 
+def test_hand_evaluation():
+    """测试牌型评估"""
+    print("\n测试牌型评估...")
+
+    game = _new_game(2)
+    royal_flush, _ = game._evaluate_hand(_cards("A♠ K♠ Q♠ J♠ T♠"))
+    four_kind, _ = game._evaluate_hand(_cards("9♥ 9♦ 9♠ 9♣ 2♥"))
+    wheel, (name, _) = game._evaluate_hand(_cards("A♥ 2♦ 3♠ 4♣ 5♥"))
+    six_high, _ = game._evaluate_hand(_cards("2♥ 3♦ 4♠ 5♣ 6♥"))
+    assert royal_flush > four_kind > six_high > wheel
+    assert name == "顺子"
+
+    # 7张牌取最优的5张
+    player = game.players[0]
+    game.community_cards = _cards("K♥ K♦ 7♠ 7♣ 2♥")
+    player.hand = _cards("K♠ 3♦")
+    rank, (name, cards) = game._get_best_hand(player)
+    assert name == "葫芦" and len(cards) == 5
+
+    print("✅ 牌型评估测试通过")
+
+
+def test_side_pots():
+    """测试多人全下时的边池计算与分配"""
+    print("\n测试边池...")
+
+    game = _new_game(3)
+    game.start_new_hand()
+    game.community_cards = _cards("2♣ 7♦ 9♥ J♠ K♣")
+    short, mid, deep = game.players
+    short.hand, mid.hand, deep.hand = _cards("A♠ A♦"), _cards("Q♥ Q♦"), _cards("3♣ 4♦")
+    for p, chips, bet in ((short, 0, 100), (mid, 700, 300), (deep, 700, 300)):
+        p.chips, p.bet_in_hand, p.is_all_in = chips, bet, chips == 0
+
+    game.collect_bets_and_manage_pots()
+    assert sorted(pot['amount'] for pot in game.pots) == [300, 400]
+    results = game.determine_winners()
+    game.distribute_winnings(results)
+    # 短码AA赢主池，QQ赢边池
+    assert short.chips == 300
+    assert mid.chips == 700 + 400
+
+    print("✅ 边池测试通过")
+
+
+def test_all_in_ev():
+    """测试全下EV：转牌全下时精确枚举河牌，期望分池与手算的出路数一致，包括 build_pots 构建的边池"""
+    print("\n测试全下EV...")
+    from analysis import analyze_hand, build_pots, calculate_equity, expected_pot_shares
+
+    board = "A♠ K♦ 7♣ 2♥"
+    # QJ 只有4张T能成顺子，剩余44张牌
+    equity = calculate_equity({"A": _cards("Q♥ J♥"), "B": _cards("7♠ 7♦")}, _cards(board))
+    assert abs(equity["A"] - 4 / 44) < 1e-9 and abs(equity["B"] - 40 / 44) < 1e-9
+
+    # 短码A全下100，B、C各投入300，D投入50后弃牌
+    pots = build_pots({"A": 100, "B": 300, "C": 300, "D": 50}, ["A", "B", "C"])
+    assert pots == [(350, ["A", "B", "C"]), (400, ["B", "C"])]
+    # 剩余42张：4张T时A赢主池、三条7赢边池；2张A时C的葫芦赢两个池；其余36张三条7都赢
+    shares = expected_pot_shares({"A": _cards("Q♥ J♥"), "B": _cards("7♠ 7♦"), "C": _cards("A♣ 2♣")},
+                                 _cards(board), pots)
+    expected = {"A": 350 * 4 / 42, "B": 350 * 36 / 42 + 400 * 40 / 42, "C": 750 * 2 / 42}
+    assert all(abs(shares[name] - value) < 1e-9 for name, value in expected.items())
+
+    hand_data = {
+        "players": [{"name": "A", "chips": 500, "hand": ["Q♥", "J♥"]}, {"name": "B", "chips": 500, "hand": ["7♠", "7♦"]}],
+        "rounds": [
+            {"round": "turn", "community_cards": board.split(), "actions": [
+                {"player_name": "A", "player_hand": ["Q♥", "J♥"], "parsed_action": {"action": "all-in"}},
+                {"player_name": "B", "player_hand": ["7♠", "7♦"], "parsed_action": {"action": "call"}}]},
+            {"round": "river", "community_cards": board.split() + ["3♦"], "actions": []}],
+        "showdown": {"results": [{"pot_amount": 1000, "eligible_players": ["A", "B"], "winners": ["B"],
+                                  "hand_name": "三条", "hand_cards": []}]},
+        "contributions": {"A": 500, "B": 500},
+        "final_chips": {"A": 0, "B": 1000},
+    }
+    result = analyze_hand(hand_data)
+    assert result["A"]["net"] == -500 and result["A"]["all_in"]
+    assert abs(result["A"]["ev"] - (1000 * 4 / 44 - 500)) < 1e-9
+    assert abs(result["B"]["ev"] - (1000 * 40 / 44 - 500)) < 1e-9
+
+    print("✅ 全下EV测试通过")
+
+
+def _legacy_pots(game):
+    """改写前的边池算法：只按全下金额分层，资格包含弃牌玩家，逐层遍历所有玩家."""
+    pots, last_level = [], 0
+    players_in_hand = [p for p in game.players if p.bet_in_hand > 0]
+    for level in sorted({p.bet_in_hand for p in players_in_hand if p.is_all_in}):
+        layer = [p for p in players_in_hand if p.bet_in_hand > last_level]
+        amount = sum(min(p.bet_in_hand - last_level, level - last_level) for p in layer)
+        if amount: pots.append({'amount': amount, 'eligible_players': set(layer)})
+        last_level = level
+    layer = [p for p in players_in_hand if p.bet_in_hand > last_level]
+    if layer: pots.append({'amount': sum(p.bet_in_hand - last_level for p in layer), 'eligible_players': set(layer)})
+    return pots
+
+
+def _legacy_winners(game, pots):
+    """改写前的摊牌：每个底池重新评估每位有资格玩家的牌力."""
+    results = []
+    for pot in pots:
+        eligible = [p for p in pot['eligible_players'] if p.is_active]
+        if not eligible: continue
+        ranks = {p: game._get_best_hand(p)[0] for p in eligible}
+        best = max(ranks.values())
+        results.append({'pot': pot, 'winners': [p for p in eligible if ranks[p] == best]})
+    return results
+
+
+def _random_showdown(rng, num_players):
+    """随机摊牌局面：若干玩家弃牌，未弃牌玩家中投入最多的有剩余筹码，其余全下."""
+    deck = _cards("2♠ 2♥ 2♦ 2♣ 3♠ 3♥ 3♦ 3♣ 4♠ 4♥ 4♦ 4♣ 5♠ 5♥ 5♦ 5♣ 6♠ 6♥ 6♦ 6♣ 7♠ 7♥ 7♦ 7♣ 8♠ 8♥ 8♦ 8♣ "
+                  "9♠ 9♥ 9♦ 9♣ T♠ T♥ T♦ T♣ J♠ J♥ J♦ J♣ Q♠ Q♥ Q♦ Q♣ K♠ K♥ K♦ K♣ A♠ A♥ A♦ A♣")
+    rng.shuffle(deck)
+    game = _new_game(num_players)
+    game.dealer_pos = rng.randrange(num_players)
+    game.community_cards = [deck.pop() for _ in range(5)]
+    live = set(rng.sample(range(num_players), rng.randint(2, num_players)))
+    # 用小范围金额制造大量同额投入和平分
+    for i, p in enumerate(game.players):
+        p.hand = [deck.pop(), deck.pop()]
+        p.chips, p.bet_in_hand, p.is_active, p.is_all_in = 0, rng.choice([0, 5, 10, 20, 20, 40, 80]), i in live, i in live
+    top = max(game.players[i].bet_in_hand for i in live)
+    for i in live:
+        if game.players[i].bet_in_hand == top: game.players[i].chips, game.players[i].is_all_in = 1000, False
+    return game
+
+
+def test_pot_properties():
+    """边池与摊牌的性质测试：与改写前的算法结果一致，且任何局面筹码守恒"""
+    print("\n测试边池性质...")
+
+    import random
+    rng = random.Random(2024)
+    compared = 0
+    for _ in range(600):
+        game = _random_showdown(rng, rng.randint(2, 9))
+        total = sum(p.bet_in_hand for p in game.players)
+        game.collect_bets_and_manage_pots()
+        assert sum(pot['amount'] for pot in game.pots) == total
+        assert all(p.is_active for pot in game.pots for p in pot['eligible_players'])
+
+        legacy_pots = _legacy_pots(game)
+        legacy = [(r['pot']['amount'], set(r['winners'])) for r in _legacy_winners(game, legacy_pots)]
+        results = game.determine_winners()
+        assert all(r['hand_details'] for r in results)
+        # 投入最多的玩家弃牌时旧算法会丢掉无人有资格的零头，其余局面必须逐池一致
+        if max(p.bet_in_hand for p in game.players if p.is_active) == max(p.bet_in_hand for p in game.players):
+            assert [(r['pot']['amount'], set(r['winners'])) for r in results] == legacy
+            compared += 1
+
+        before = sum(p.chips for p in game.players)
+        game.distribute_winnings(results)
+        assert sum(p.chips for p in game.players) == before + total
+    assert compared > 300
+
+    # 弃牌玩家投入最多：多出的部分并入最后一个底池，而不是丢失
+    game = _new_game(3)
+    game.community_cards = _cards("2♣ 7♦ 9♥ J♠ K♣")
+    folded, short, mid = game.players
+    short.hand, mid.hand = _cards("A♠ A♦"), _cards("Q♥ Q♦")
+    for p, bet in ((folded, 200), (short, 100), (mid, 150)):
+        p.chips, p.bet_in_hand, p.is_all_in = 0, bet, p is not folded
+    folded.is_active = False
+    game.collect_bets_and_manage_pots()
+    assert [pot['amount'] for pot in game.pots] == [300, 150]
+    game.distribute_winnings(game.determine_winners())
+    assert (short.chips, mid.chips) == (300, 150)
+
+    print("✅ 边池性质测试通过")
+
+
+def test_undo_and_snapshot():
+    """测试撤销日志和不可变快照：任意动作序列逐步撤销后状态与动作前完全一致，快照可还原、可 pickle"""
+    print("\n测试撤销与快照...")
+
+    import pickle
+    import random
+    rng = random.Random(5)
+    for seed in range(20):
+        game = _new_game(rng.randint(2, 6), seed=seed)
+        game.players[0].chips = rng.choice([15, 1000])
+        game.start_new_hand()
+        game.start_betting_round("preflop")
+        history = []
+        while game.action_player_idx != -1 and len([p for p in game.players if p.is_active]) > 1:
+            player = game.get_player(game.action_player_idx)
+            to_call = game.current_bet - player.bet_in_round
+            action = rng.choice(["fold", "all-in"] + (["call", "raise"] if to_call and player.chips > to_call else ["check"]))
+            amount = game.current_bet + game.min_raise_amount if action == "raise" else 0
+            if action == "raise" and amount - player.bet_in_round >= player.chips: action = "all-in"
+            history.append(game.snapshot())
+            game.apply_action(player, action, amount)
+            game.action_player_idx = game.get_next_active_player_idx(game.action_player_idx)
+            if len(history) > 12: break
+
+        game.collect_bets_and_manage_pots()
+        snap = game.snapshot()
+        assert pickle.loads(pickle.dumps(snap)) == snap and hash(snap) == hash(pickle.loads(pickle.dumps(snap)))
+        assert PokerGame.from_snapshot(snap).snapshot() == snap
+
+        # 克隆与原牌局互不影响
+        clone = game.clone()
+        clone.players[0].chips += 1
+        clone.deal_community(1)
+        assert game.snapshot() == snap
+
+        game.pots = []
+        assert len(game.undo_log) == len(history)
+        while history:
+            game.undo()
+            assert game.snapshot() == history.pop()
+
+    # 分支点：在同一状态下尝试所有动作
+    game = _new_game(3, seed=1)
+    game.start_new_hand()
+    game.start_betting_round("preflop")
+    player, root = game.get_player(game.action_player_idx), game.snapshot()
+    depth = len(game.undo_log)
+    for action in ("fold", "call", "raise", "all-in"):
+        game.apply_action(player, action, 3 * game.big_blind)
+        game.undo_to(depth)
+        assert game.snapshot() == root
+
+    print("✅ 撤销与快照测试通过")
+
+
 def test_llm_client():
     """测试LLM客户端"""
     print("\n测试LLM客户端...")
-    
-    try:
-        # 测试Qwen3客户端
-        client = LLMClient("qwen3")
-        print("✅ Qwen3客户端创建成功")
-        
-        # 测试Qwen2.5客户端
-        client = LLMClient("qwen2.5")
-        print("✅ Qwen2.5客户端创建成功")
-        
-    except Exception as e:
-        print(f"❌ LLM客户端测试失败: {e}")
-        return False
-    
-    return True
+
+    for llm_type in LLM_CONFIGS:
+        client = LLMClient(llm_type)
+        print(f"✅ {llm_type} 客户端创建成功")
+
+    assert client._parse_action("<think>也许 call?</think><action>raise 80</action>") == {'action': 'raise', 'amount': 80}
+    assert client._parse_action("<action>All-in</action>") == {'action': 'all-in'}
+    assert client._parse_action("不知道") == {'action': 'fold'}
+
+    print("✅ LLM客户端测试通过")
+
+
+def test_budget():
+    """测试推理预算：关键决策分到高档，请求按档位设置 max_tokens，对照组按满预算请求，报告按同档对照组估算节省"""
+    print("\n测试推理预算...")
+
+    import random
+    from types import SimpleNamespace
+    from budget import Budget, budget_report, choose_budget, spot_features
+    from config import BUDGET_CONFIG
+    from metrics import METRICS
+
+    game = _new_game(3)
+    game.start_new_hand()
+    game.start_betting_round("preflop")
+    player = game.get_player(game.action_player_idx)
+    features = spot_features(game, player, "preflop")
+    budgeted = choose_budget(features, {**BUDGET_CONFIG, "control_rate": 0.0})
+    assert budgeted.tier == "low" and (budgeted.max_tokens, budgeted.reasoning_effort, budgeted.control) == (1024, "low", False)
+    # 对照组保留本档档位，按最高档的预算请求
+    control = choose_budget(features, {**BUDGET_CONFIG, "control_rate": 1.0})
+    assert control.tier == "low" and (control.max_tokens, control.reasoning_effort, control.control) == (None, "high", True)
+    rng = random.Random(0)
+    controls = sum(choose_budget(features, {**BUDGET_CONFIG, "control_rate": 0.1}, rng).control for _ in range(2000))
+    assert 150 < controls < 250
+    # 河牌面对全下
+    opponent = next(p for p in game.players if p is not player)
+    game.handle_action(player, "call")
+    game.handle_action(opponent, "all-in")
+    assert choose_budget(spot_features(game, player, "river")).tier == "high"
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        tokens = kwargs.get("max_tokens") or 900
+        message = SimpleNamespace(content="<action>call</action>", reasoning_content=None)
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=50, completion_tokens=tokens),
+                               choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+    calls = []
+    client = LLMClient("model_1")
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create)))
+    METRICS.reset()
+    try:
+        client.get_action("state", "[A♠ K♠]", "system", Budget("low", 0.1, 100, "low"))
+        client.get_action("state", "[A♠ K♠]", "system", Budget("high", 0.9, None, "high"))
+        _, control_input, _ = client.get_action("state", "[A♠ K♠]", "system", Budget("low", 0.1, None, "high", True))
+        parsed, llm_input, _ = client.get_action("state", "[A♠ K♠]", "system")
+        assert calls[0]["max_tokens"] == 100 and all("max_tokens" not in c for c in calls[1:])
+        assert control_input["budget"] == {"tier": "low", "importance": 0.1, "control": True}
+        # 未在 LLM_CONFIGS 中声明支持的模型不发送推理强度
+        assert all("extra_body" not in c for c in calls) and parsed == {'action': 'call'} and "budget" not in llm_input
+        report = {r["tier"]: r for r in budget_report(METRICS.snapshot())}
+        assert report["low"]["decisions"] == 1 and report["low"]["control_decisions"] == 1
+        assert report["low"]["avg_tokens"] == 100 and report["low"]["saved_tokens"] == 800
+        # 没有对照样本的档位无法估算节省
+        assert report["high"]["decisions"] == 1 and report["high"]["saved_tokens"] is None
+    finally:
+        METRICS.reset()
+    print("✅ 推理预算测试通过")
 
 
 def test_game_manager():
     """测试游戏管理器"""
     print("\n测试游戏管理器...")
-    
+
+    from game_manager import GameManager
+
+    # 创建游戏管理器
+    manager = GameManager(num_players=2, starting_chips=500, verbose=False)
     try:
-        from game_manager import GameManager
-        
-        # 创建游戏管理器
-        manager = GameManager(num_players=2, starting_chips=500)
         print("✅ 游戏管理器创建成功")
-        
+
         # 测试游戏状态
-        state = manager.game.get_game_state_text()
+        manager.game.start_new_hand()
+        manager.game.start_betting_round("preflop")
+        player = manager.game.get_player(manager.game.action_player_idx)
+        state = manager._get_game_state_text(player)
+        assert "(你)" in state
         print(f"✅ 游戏状态生成成功，长度: {len(state)} 字符")
-        
-    except Exception as e:
-        print(f"❌ 游戏管理器测试失败: {e}")
-        return False
-    
-    return True
+    finally:
+        shutil.rmtree(manager.logger.session_dir, ignore_errors=True)
+
+
+def test_bots():
+    """测试内置策略：与LLM共用座位分配和动作校验，筹码守恒且固定种子可复现"""
+    print("\n测试内置策略...")
+
+    from game_manager import GameManager
+    from bots import BotClient, hand_class, preflop_tier
+
+    assert hand_class(_cards("K♠ A♠")) == "AKs" and preflop_tier(_cards("7♦ 2♣")) == 0
+
+    def play(seed):
+        manager = GameManager(4, 500, ["bot_random", "bot_call", "bot_tag", "bot_equity"], seed=seed, verbose=False)
+        try:
+            assert all(isinstance(manager.llm_clients[t], BotClient) for t in ["bot_random", "bot_equity"])
+            # 只为座位上的类型创建客户端
+            assert set(manager.llm_clients) == {"bot_random", "bot_call", "bot_tag", "bot_equity"}
+            for hand_num in range(1, 31):
+                if len([p for p in manager.game.players if p.chips > 0]) < 2: break
+                manager._play_hand(hand_num)
+                assert sum(p.chips for p in manager.all_players) == 2000
+            return [h["results"] for h in manager.hand_results]
+        finally:
+            shutil.rmtree(manager.logger.session_dir, ignore_errors=True)
+
+    assert play(5) == play(5)
+    print("✅ 内置策略测试通过")
+
+
+def test_replay():
+    """测试确定性复盘：机器人对局的每手牌复盘一致，改动日志中的一个动作后报告不一致"""
+    print("\n测试复盘...")
+
+    import json
+    from game_manager import GameManager
+    from replay import replay_logs
+
+    manager = GameManager(3, 1000, ["bot_random", "bot_tag", "bot_equity"], seed=5, verbose=False)
+    session_dir = manager.logger.session_dir
+    try:
+        manager.play_game(6)
+        log_dir, session_id = str(session_dir.parent), session_dir.name
+        results = list(replay_logs(log_dir, session_id))
+        assert [r["hand_num"] for r in results] == list(range(1, 7))
+        assert all(r["status"] == "ok" and not r["divergences"] for r in results)
+
+        hand_file = session_dir / "hand_1.json"
+        hand_data = json.loads(hand_file.read_text(encoding='utf-8'))
+        action = hand_data["rounds"][0]["actions"][0]
+        action["parsed_action"] = {"action": "call" if action["parsed_action"]["action"] == "fold" else "fold"}
+        hand_file.write_text(json.dumps(hand_data, ensure_ascii=False), encoding='utf-8')
+        edited = list(replay_logs(log_dir, session_id, hand_num=1))
+        assert len(edited) == 1 and edited[0]["status"] == "diverged" and edited[0]["divergences"]
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+    print("✅ 复盘测试通过")
+
+
+def test_hud():
+    """测试对手统计：按动作增量更新，随检查点恢复，开启后出现在提示词中"""
+    print("\n测试对手统计...")
+
+    from game_manager import GameManager
+    from hud import HudTracker
+
+    hud = HudTracker()
+    hud.start_hand(["A", "B", "C"])
+    hud.record("A", "preflop", "raise", True)
+    hud.record("B", "preflop", "call", False)
+    hud.record("C", "preflop", "fold", False)
+    hud.record("A", "flop", "raise", True)
+    hud.record("B", "flop", "fold", False)
+    assert hud.stats["A"] == {"hands": 1, "vpip": 1, "pfr": 1, "aggressive": 1, "passive": 0,
+                              "cbet_faced": 0, "cbet_folded": 0}
+    assert hud.stats["B"]["cbet_faced"] == 1 and hud.stats["B"]["cbet_folded"] == 1
+    assert hud.summary("B") == "1手 VPIP 100% PFR 0% AF - FtCB 100%" and hud.summary("D") is None
+
+    manager = GameManager(3, 5000, ["bot_call", "bot_tag", "bot_equity"], seed=3, verbose=False)
+    try:
+        for hand_num in range(1, 6): manager._play_hand(hand_num)
+        stats = manager.hud.state()
+        assert len(manager.game.players) == 3 and all(stats[p.name]["hands"] == 5 for p in manager.all_players)
+        assert stats["Player-1"]["vpip"] > 0 and stats["Player-1"]["pfr"] == 0
+        manager.logger.save_checkpoint(manager.checkpoint_state())
+
+        resumed = GameManager.resume(manager.logger.session_id, verbose=False, show_hud=True)
+        assert resumed.hud.state() == stats
+        resumed.game.start_new_hand()
+        resumed.game.start_betting_round("preflop")
+        player = resumed.game.get_player(resumed.game.action_player_idx)
+        state = resumed._get_game_state_text(player)
+        assert "对手统计" in state and f"- {player.name}: " not in state
+        assert all(f"- {p.name}: 5手 VPIP" in state for p in resumed.game.players if p != player)
+    finally:
+        shutil.rmtree(manager.logger.session_dir, ignore_errors=True)
+    print("✅ 对手统计测试通过")
+
+
+def test_metrics():
+    """测试运行指标：分位数、sum/count、Prometheus文本格式与标签转义、JSON/Prometheus导出可还原，牌局各阶段带标签"""
+    print("\n测试运行指标...")
+
+    import json
+    import re
+    import tempfile
+    from game_manager import GameManager
+    from metrics import METRICS, MetricsRegistry, METRIC_PREFIX
+
+    registry = MetricsRegistry()
+    for v in range(1, 102): registry.observe("step_seconds", float(v), street="flop")
+    registry.inc("tokens_total", 5, llm_type='a"b\\c\nd')
+    registry.inc("tokens_total", 2, llm_type='a"b\\c\nd')
+    snapshot = registry.snapshot()
+    h = snapshot["histograms"][0]
+    assert (h["p50"], h["p95"], h["p99"], h["max"]) == (51.0, 96.0, 100.0, 101.0)
+    assert h["sum"] == 5151.0 and h["count"] == 101
+    assert snapshot["counters"] == [{"name": "tokens_total", "labels": {"llm_type": 'a"b\\c\nd'}, "value": 7}]
+
+    text = registry.to_prometheus()
+    lines = text.splitlines()
+    assert f"# TYPE {METRIC_PREFIX}step_seconds summary" in lines and f"# TYPE {METRIC_PREFIX}tokens_total counter" in lines
+    assert f'{METRIC_PREFIX}step_seconds{{street="flop",quantile="0.95"}} 96.0' in lines
+    assert f'{METRIC_PREFIX}step_seconds_sum{{street="flop"}} 5151.0' in lines
+    assert f'{METRIC_PREFIX}step_seconds_count{{street="flop"}} 101' in lines
+    # 标签值中的反斜杠、引号和换行按 Prometheus 规则转义，每个样本占一行
+    assert f'{METRIC_PREFIX}tokens_total{{llm_type="a\\"b\\\\c\\nd"}} 7.0' in lines
+
+    def parse_prometheus(text):
+        samples = {}
+        for line in text.splitlines():
+            if line.startswith("#"): continue
+            match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+            labels = {k: re.sub(r'\\(.)', lambda m: "\n" if m.group(1) == "n" else m.group(1), v)
+                      for k, v in re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or "")}
+            samples[(match.group(1), tuple(sorted(labels.items())))] = float(match.group(3))
+        return samples
+
+    tmp_dir = tempfile.mkdtemp(prefix="llm_poker_metrics_")
+    try:
+        registry.export(os.path.join(tmp_dir, "out", "metrics.json"))
+        registry.export(os.path.join(tmp_dir, "out", "metrics.prom"))
+        with open(os.path.join(tmp_dir, "out", "metrics.json"), 'r', encoding='utf-8') as f: exported = json.load(f)
+        assert {k: v for k, v in exported.items() if k != "timestamp"} == \
+               {k: v for k, v in registry.snapshot().items() if k != "timestamp"}
+        with open(os.path.join(tmp_dir, "out", "metrics.prom"), 'r', encoding='utf-8') as f: samples = parse_prometheus(f.read())
+        assert samples[(METRIC_PREFIX + "tokens_total", (("llm_type", 'a"b\\c\nd'),))] == 7
+        assert samples[(METRIC_PREFIX + "step_seconds", (("quantile", "0.99"), ("street", "flop")))] == 100.0
+        assert samples[(METRIC_PREFIX + "step_seconds_count", (("street", "flop"),))] == 101
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    METRICS.reset()
+    manager = GameManager(3, 1000, ["bot_call", "bot_tag", "bot_equity"], seed=7, verbose=False)
+    try:
+        manager.play_game(4)
+        histograms = METRICS.snapshot()["histograms"]
+        streets = ("preflop", "flop", "turn", "river")
+        # 摊牌和手牌日志写入按本手最后到达的街分组，逐个决策的阶段另带 llm_type
+        assert any(h["name"] == "showdown_seconds" for h in histograms)
+        assert all(h["labels"].get("street") in streets for h in histograms
+                   if h["name"] in ("showdown_seconds", "engine_action_seconds") or h["labels"].get("kind") == "hand")
+        assert all(h["labels"].get("llm_type") in manager.llm_clients for h in histograms if h["name"] == "llm_request_seconds")
+        assert {h["labels"]["kind"] for h in histograms if h["name"] == "log_write_seconds"} == {"hand", "checkpoint", "session"}
+    finally:
+        METRICS.reset()
+        shutil.rmtree(manager.logger.session_dir, ignore_errors=True)
+    print("✅ 运行指标测试通过")
+
+
+def test_checkpoint_resume():
+    """测试检查点只保存累计值：中途停下再继续的会话与一次打完的结果一致，hand_results 从手牌日志重建，中断时的会话总结与检查点一致"""
+    print("\n测试检查点继续...")
+    import json
+    from game_manager import GameManager
+    from logger import load_checkpoint
+
+    seats = ["bot_call", "bot_tag", "bot_equity"]
+    full = GameManager(3, 1000, seats, seed=7, reset_stacks=True, verbose=False)
+    part = GameManager(3, 1000, seats, seed=7, reset_stacks=True, verbose=False, checkpoint_every=2)
+    dirs = [full.logger.session_dir, part.logger.session_dir]
+    try:
+        expected = full.play_game(6)
+        part.play_game(6, should_stop=lambda m: m.next_hand_num > 4)
+        state = load_checkpoint(part.logger.session_id)
+        assert state["last_hand"] == 4 and "hand_results" not in state
+
+        resumed = GameManager.resume(part.logger.session_id, verbose=False)
+        assert resumed.hand_results == full.hand_results[:4]
+        assert resumed.play_game(6) == expected and resumed.hand_results == full.hand_results
+
+        # 第3手后中断：检查点停在第2手，会话总结只含检查点之前的手牌，筹码与检查点一致
+        interrupted = GameManager(3, 1000, seats, seed=7, reset_stacks=True, verbose=False, checkpoint_every=2)
+        dirs.append(interrupted.logger.session_dir)
+
+        def interrupt(manager):
+            if manager.next_hand_num > 3: raise KeyboardInterrupt
+        try:
+            interrupted.play_game(6, should_stop=interrupt)
+            assert False, "中断应当继续向上抛出"
+        except KeyboardInterrupt:
+            pass
+        with open(interrupted.logger.session_dir / "session_summary.json", 'r', encoding='utf-8') as f: summary = json.load(f)
+        assert summary["status"] == "interrupted" and [h["hand_num"] for h in summary["hands"]] == [1, 2]
+        chips = {name: 1000 + sum(h["results"][name] for h in full.hand_results[:2]) for name in full.winner_stats}
+        assert summary["final_results"]["final_chips"] == chips
+        assert GameManager.resume(interrupted.logger.session_id, verbose=False).play_game(6) == expected
+    finally:
+        for d in dirs: shutil.rmtree(d, ignore_errors=True)
+    print("✅ 检查点继续测试通过")
+
+
+def test_tournament():
+    """测试多桌锦标赛：每桌不超员，出局后拆桌合并，最终只剩一位冠军且筹码守恒"""
+    print("\n测试锦标赛...")
+
+    import tempfile
+    from tournament import Tournament
+
+    log_dir = tempfile.mkdtemp(prefix="llm_poker_tournament_")
+    try:
+        tournament = Tournament(["bot_random", "bot_call", "bot_tag", "bot_equity"] * 4, 300,
+                                table_size=5, hands_per_level=3, seed=11, log_dir=log_dir)
+        assert sorted(t.seat_count for t in tournament.tables) == [4, 4, 4, 4]
+        finish_hand = tournament._finish_hand
+
+        def checked_finish_hand(table):
+            finish_hand(table)
+            assert all(t.seat_count <= 5 for t in tournament.tables)
+        tournament._finish_hand = checked_finish_hand
+
+        standings = tournament.run()
+        assert [s["place"] for s in standings] == list(range(1, 17))
+        assert standings[0]["chips"] == 16 * 300 and tournament.moves > 0
+        assert sum(p.chips for p in tournament.players) == 16 * 300
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    print("✅ 锦标赛测试通过")
+
+
+def test_duplicate():
+    """测试复式对局：各组座位每手牌每个座位的底牌相同，座位组数正确，各模型总分之和为零"""
+    print("\n测试复式对局...")
+
+    import json
+    import tempfile
+    from duplicate import DuplicateMatch, seat_permutations, seat_rotations
+
+    seats = ["bot_tag", "bot_call", "bot_random"]
+    assert len(seat_rotations(seats)) == 3 and len(set(seat_rotations(seats))) == 3
+    assert len(seat_permutations(seats)) == 6 and len(seat_permutations(["bot_tag", "bot_tag", "bot_call"])) == 3
+
+    cwd, tmp_dir = os.getcwd(), tempfile.mkdtemp(prefix="llm_poker_duplicate_")
+    os.chdir(tmp_dir)
+    try:
+        match = DuplicateMatch(seats, 1000, seed=21, mode="permute")
+        results = match.play(4)
+        assert len(match.session_ids) == 6 and sorted(match.deal_results) == [1, 2, 3, 4]
+        for hand_num in range(1, 5):
+            deals = []
+            for session_id in match.session_ids:
+                with open(os.path.join("logs", session_id, f"hand_{hand_num}.json"), 'r', encoding='utf-8') as f:
+                    hand = json.load(f)
+                deals.append(([p["hand"] for p in sorted(hand["players"], key=lambda p: p["seat"])], hand["deck_seed"]))
+            assert all(deal == deals[0] for deal in deals), hand_num
+        assert set(results) == set(seats) and all(r["deals"] == 4 for r in results.values())
+        assert abs(sum(r["total"] for r in results.values())) < 1e-9
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    print("✅ 复式对局测试通过")
+
+
+def test_sequential():
+    """测试序贯检验：零均值时不停止，明显优势时停止，边界随观测增多而收窄，多线程共享更新不丢观测"""
+    print("\n测试序贯检验...")
+
+    import threading
+    from types import SimpleNamespace
+    from sequential import PairwiseConfidenceSequence, SequentialTest
+
+    null = PairwiseConfidenceSequence("a", "b", min_hands=30)
+    radii = {}
+    for n in range(1, 1001):
+        null.update(1.0 if n % 2 else -1.0)
+        if n in (10, 100, 1000): radii[n] = null.radius
+        assert not null.decided
+    assert radii[10] > radii[100] > radii[1000] and null.leader is None
+
+    edge = PairwiseConfidenceSequence("a", "b", min_hands=30)
+    for n in range(1, 30):
+        edge.update(2.0 if n % 2 else 0.0)
+        assert not edge.decided
+    for n in range(30, 101): edge.update(2.0 if n % 2 else 0.0)
+    assert edge.decided and edge.leader == "a"
+
+    test = SequentialTest(["a", "b", "c"], min_hands=30, hand_budget=10**6, big_blind=10)
+    # 三对比较，每对使用 alpha/3
+    assert all(abs(c.alpha - 0.05 / 3) < 1e-12 for c in test.comparisons)
+
+    def feed():
+        for i in range(250): test.update({"a": [20 if i % 2 else 0], "b": [0], "c": [-10, 10]})
+    threads = [threading.Thread(target=feed) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert test.hands_seen == 1000 and all(c.n == 1000 for c in test.comparisons)
+    summary = {s["pair"]: s for s in test.summary()}
+    assert summary[("a", "b")]["leader"] == "a" and summary[("a", "c")]["leader"] == "a"
+    assert not summary[("b", "c")]["decided"] and abs(summary[("b", "c")]["mean_bb"]) < 1e-9
+    assert not test.decided
+
+    manager = SimpleNamespace(all_players=[SimpleNamespace(name="P1", llm_type="a"), SimpleNamespace(name="P2", llm_type="b")],
+                              hand_results=[{"hand_num": 1, "results": {"P1": 10, "P2": -10}}])
+    capped = SequentialTest(["a", "b"], hand_budget=2, big_blind=10)
+    assert not capped.should_stop(manager) and capped.should_stop(manager)
+    assert capped.comparisons[0].n == 2 and capped.comparisons[0].mean == 2.0
+    print("✅ 序贯检验测试通过")
+
+
+def test_work_queue():
+    """测试任务队列：工作端经TCP领取任务并回传日志，租约过期的任务重新排队后由其他工作端完成，令牌无效的请求被拒绝"""
+    print("\n测试任务队列...")
+
+    import tempfile
+    import threading
+    from pathlib import Path
+    from work_queue import JobQueue, QueueServer, RemoteQueue, Worker
+
+    tmp_dir = tempfile.mkdtemp(prefix="llm_poker_queue_")
+    queue = JobQueue(f"{tmp_dir}/queue.db", log_dir=f"{tmp_dir}/logs", lease_seconds=0.5)
+    server = QueueServer(queue, "127.0.0.1", 0, token="s3cret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    jobs = []
+    try:
+        for seed in (1, 2):
+            queue.submit({"seats": ["bot_tag", "bot_call", "bot_equity"], "hands": 4, "seed": seed, "starting_chips": 500})
+        assert queue.claim("dead-worker")["id"] == 1
+        time.sleep(0.6)
+
+        # 监听非本机地址必须设置令牌；令牌错误或缺失的请求被拒绝
+        try:
+            QueueServer(queue, "0.0.0.0", 0)
+            assert False, "未设置令牌时不应监听非本机地址"
+        except ValueError:
+            pass
+        for token in (None, "wrong"):
+            try:
+                RemoteQueue("127.0.0.1", server.server_address[1], token=token).claim("intruder")
+                assert False, "令牌无效的请求不应被执行"
+            except RuntimeError as e:
+                assert "令牌" in str(e)
+        remote = RemoteQueue("127.0.0.1", server.server_address[1], token="s3cret")
+        assert Worker(remote, "w1", poll_seconds=0.1).run(exit_when_empty=True) == 2
+
+        jobs = queue.jobs()
+        assert [(j["status"], j["attempts"], j["hands_done"]) for j in jobs] == [("done", 2, 4), ("done", 1, 4)]
+        for job in jobs:
+            uploaded = sorted(p.name for p in (Path(tmp_dir) / "logs" / job["session_id"]).iterdir())
+            assert uploaded == ["hand_1.json", "hand_2.json", "hand_3.json", "hand_4.json", "session_summary.json"]
+            assert sum(job["result"]["final_chips"].values()) == 1500
+        # 租约已被收回的工作端不能再提交结果
+        assert not queue.complete(1, "dead-worker", {})
+    finally:
+        server.shutdown()
+        server.server_close()
+        for job in jobs: shutil.rmtree(Path("logs") / job["session_id"], ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✅ 任务队列测试通过")
+
+
+def test_batch_eval():
+    """测试离线批量评估：导出的决策点与日志中的动作一一对应，导入的批量结果按在线规则修正并打分"""
+    print("\n测试离线批量评估...")
+
+    import json
+    import tempfile
+    from game_manager import GameManager
+    from batch_eval import export_spots, ingest_results, SPOTS_FILENAME, BATCH_FILENAME
+
+    manager = GameManager(3, 500, ["bot_call", "bot_tag", "bot_random"], seed=11, verbose=False)
+    out_dir = tempfile.mkdtemp(prefix="llm_poker_batch_")
+    try:
+        for hand_num in range(1, 6): manager._play_hand(hand_num)
+        counts = export_spots(str(manager.logger.session_dir.parent), out_dir, manager.logger.session_dir.name, model="m")
+        logged = sum(len(r["actions"]) for f in manager.logger.session_dir.glob("hand_*.json")
+                     for r in json.load(open(f, encoding="utf-8"))["rounds"])
+        assert counts == {"spots": logged, "hands": 5, "skipped_hands": 0}
+
+        with open(os.path.join(out_dir, BATCH_FILENAME), encoding="utf-8") as f: requests = [json.loads(line) for line in f]
+        assert all(r["body"]["model"] == "m" and "你的手牌" in r["body"]["messages"][1]["content"] for r in requests)
+
+        # 模拟批处理输出：除第一条失败外都回复跟注
+        results_path = os.path.join(out_dir, "results.jsonl")
+        with open(results_path, "w", encoding="utf-8") as f:
+            for i, r in enumerate(requests):
+                body = {"model": "fake", "choices": [{"message": {"content": "想了想 <action>call</action>"}}]}
+                record = {"custom_id": r["custom_id"], "response": None, "error": {"message": "timeout"}} if i == 0 else \
+                    {"custom_id": r["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+                f.write(json.dumps(record) + "\n")
+        summary = ingest_results(os.path.join(out_dir, SPOTS_FILENAME), results_path)
+        assert summary["fake"]["spots"] == logged and summary["fake"]["answered"] == logged - 1
+        # 原始决策与自身完全一致，跟注站从不弃牌
+        assert summary["原始: bot_call"]["agree_rate"] == 1.0 and summary["原始: bot_call"]["fold_rate"] == 0.0
+        assert 0 < summary["fake"]["legal_rate"] < 1
+    finally:
+        shutil.rmtree(manager.logger.session_dir, ignore_errors=True)
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    print("✅ 离线批量评估测试通过")
+
+
+def test_search_index():
+    """测试推理全文索引：增量更新只处理新增、修改和删除的文件，CJK短语检索，动作列权重更高，分页不重叠"""
+    print("\n测试全文索引...")
+
+    import json
+    import tempfile
+    from pathlib import Path
+    from search_index import ReasoningIndex
+
+    log_dir = Path(tempfile.mkdtemp(prefix="llm_poker_search_"))
+
+    def write_hand(hand_num, actions):
+        hand = {"hand_num": hand_num, "rounds": [{"round_name": "preflop", "actions": [
+            {"player_name": f"Player-{i + 1}", "llm_output": output, "parsed_action": parsed}
+            for i, (output, parsed) in enumerate(actions)]}]}
+        with open(log_dir / "s1" / f"hand_{hand_num}.json", 'w', encoding='utf-8') as f: json.dump(hand, f, ensure_ascii=False)
+
+    (log_dir / "s1").mkdir()
+    write_hand(1, [("考虑对手范围后决定跟注 <action>call</action>", {"action": "call"}),
+                   ("牌力一般，范围里对手有很多强牌 <action>fold</action>", {"action": "fold"})])
+    write_hand(2, [("the pot is small so I will put pressure on them now", {"action": "raise", "amount": 80}),
+                   ("someone could raise behind me but calling is fine <action>call</action>", {"action": "call"})])
+    for hand_num in range(3, 8):
+        write_hand(hand_num, [(f"filler hand {hand_num} <action>check</action>", {"action": "check"})])
+
+    index = ReasoningIndex(str(log_dir))
+    try:
+        assert index.update() == (7, 0)
+        assert index.update() == (0, 0)
+        write_hand(3, [("edited filler with extra words <action>check</action>", {"action": "check"})])
+        assert index.update() == (1, 0)
+        os.remove(log_dir / "s1" / "hand_4.json")
+        assert index.update() == (0, 1)
+
+        # 短语按字相邻匹配："对手范围"只命中第一条，不命中"范围里对手"
+        total, results = index.search('"对手范围"')
+        assert total == 1 and (results[0]["hand_num"], results[0]["player_name"]) == (1, "Player-1")
+        assert index.search("rais")[0] == 0 and index.search("filler")[0] == 4
+
+        # parsed_action 列权重2.0：动作为 raise 的排在推理中提到 raise 的前面
+        total, results = index.search("raise")
+        assert total == 2 and [r["player_name"] for r in results] == ["Player-1", "Player-2"]
+        assert results[0]["parsed_action"] == "raise 80" and results[0]["score"] > results[1]["score"]
+
+        pages = [index.search("check", page=page, page_size=2) for page in (1, 2, 3)]
+        assert [total for total, _ in pages] == [4, 4, 4] and [len(r) for _, r in pages] == [2, 2, 0]
+        hands = [r["hand_num"] for _, rs in pages for r in rs]
+        assert sorted(hands) == [3, 5, 6, 7]
+    finally:
+        index.close()
+        shutil.rmtree(log_dir, ignore_errors=True)
+    print("✅ 全文索引测试通过")
+
+
+def test_rating():
+    """测试增量Elo：同一会话不重复计分，中断、锦标赛单桌、导入牌谱和玩家类型不明的会话不计分"""
+    print("\n测试模型评分...")
+
+    import json
+    import tempfile
+    from pathlib import Path
+    from rating import RatingStore, INITIAL_RATING
+
+    log_dir = Path(tempfile.mkdtemp(prefix="llm_poker_rating_"))
+
+    def session(session_id, final_chips, status="completed", player_types=None, seats=None):
+        session_dir = log_dir / session_id
+        session_dir.mkdir()
+        hands = [{"hand_num": 1, "game_config": {"starting_chips": [1000]}}]
+        if seats is not None:
+            with open(session_dir / "hand_1.json", 'w', encoding='utf-8') as f: json.dump({**hands[0], "players": seats}, f)
+        summary = {"session_id": session_id, "status": status, "hands": hands,
+                   "final_results": {"final_chips": final_chips, "winner_stats": {}}}
+        if player_types: summary["final_results"]["player_types"] = player_types
+        with open(session_dir / "session_summary.json", 'w', encoding='utf-8') as f: json.dump(summary, f)
+
+    try:
+        session("s1", {"P1": 1500, "P2": 500}, player_types={"P1": "a", "P2": "b"})
+        # 旧日志没有 player_types，从手牌日志的座位补全；同一类型两个座位取平均
+        session("s2", {"P1": 1200, "P2": 900, "P3": 900},
+                seats=[{"name": "P1", "llm_type": "b"}, {"name": "P2", "llm_type": "a"}, {"name": "P3", "llm_type": "a"}])
+        session("s3", {"P1": 3000, "P2": 0}, status="interrupted", player_types={"P1": "a", "P2": "b"})
+        session("s4", {"P1": 3000, "P2": 0}, status="tournament_table", player_types={"P1": "a", "P2": "b"})
+        session("s5", {"P1": 3000, "P2": 0}, status="imported", player_types={"P1": "a", "P2": "b"})
+        session("s6", {"P1": 3000, "P2": 0}, seats=[{"name": "P1", "llm_type": "a"}])
+
+        store = RatingStore(str(log_dir))
+        assert store.update() == 2
+        assert store.processed_sessions == ["s1", "s2", "s4", "s5", "s6"]
+        ratings = json.loads(json.dumps(store.ratings))
+        assert set(ratings) == {"a", "b"} and ratings["a"]["sessions"] == ratings["b"]["sessions"] == 2
+        assert ratings["a"]["net_chips"] == 500 - 100 and ratings["b"]["net_chips"] == -500 + 200
+        assert ratings["a"]["rating"] + ratings["b"]["rating"] == 2 * INITIAL_RATING
+
+        again = RatingStore(str(log_dir))
+        assert again.update() == 0 and again.ratings == ratings
+
+        # 中断的会话继续并正常结束后才计入
+        session_file = log_dir / "s3" / "session_summary.json"
+        summary = json.loads(session_file.read_text(encoding='utf-8'))
+        session_file.write_text(json.dumps({**summary, "status": "completed"}), encoding='utf-8')
+        assert again.update() == 1 and again.ratings["a"]["rating"] > ratings["a"]["rating"]
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+    print("✅ 模型评分测试通过")
+
+
+def test_decision_dataset():
+    """测试列式决策数据集：每个动作一行，可内存映射，重复转换不重复追加，新会话只追加新行"""
+    print("\n测试列式决策数据集...")
+
+    import json
+    import tempfile
+    from pathlib import Path
+    import numpy as np
+    from game_manager import GameManager
+    from decision_dataset import DecisionDataset, ACTIONS
+
+    log_dir = Path(tempfile.mkdtemp(prefix="llm_poker_dataset_"))
+
+    def play(seed):
+        manager = GameManager(3, 500, ["bot_call", "bot_tag", "bot_random"], seed=seed, session_id=f"dataset_{seed}", verbose=False)
+        manager.play_game(4)
+        shutil.move(str(manager.logger.session_dir), str(log_dir / manager.logger.session_id))
+        actions = []
+        for hand_num in range(1, 5):
+            with open(log_dir / manager.logger.session_id / f"hand_{hand_num}.json", encoding="utf-8") as f:
+                actions += [a["parsed_action"]["action"] for r in json.load(f)["rounds"] for a in r["actions"]]
+        return actions
+
+    try:
+        first = play(1)
+        dataset = DecisionDataset(str(log_dir / "decisions"))
+        assert dataset.update(str(log_dir)) == {"sessions": 1, "rows": len(first)}
+        assert dataset.update(str(log_dir)) == {"sessions": 0, "rows": 0}
+
+        second = play(2)
+        dataset = DecisionDataset(str(log_dir / "decisions"))
+        assert dataset.update(str(log_dir)) == {"sessions": 1, "rows": len(second)}
+        columns = dataset.load()
+        assert isinstance(columns["pot"], np.memmap) and columns["board"].shape == (len(first) + len(second), 5)
+        assert [ACTIONS[a] for a in columns["action"]] == first + second
+        assert list(np.bincount(columns["session"])) == [len(first), len(second)]
+        assert set(dataset.meta["models"]) == {"bot_call", "bot_tag", "bot_random"}
+        assert (columns["hole"] >= 0).all() and (columns["board"][columns["street"] == 0] == -1).all()
+
+        # 被中断的会话之后可能继续，正常结束前不转换
+        third = play(3)
+        summary_file = log_dir / "dataset_3" / "session_summary.json"
+        with open(summary_file, encoding="utf-8") as f: summary = json.load(f)
+        with open(summary_file, 'w', encoding="utf-8") as f: json.dump({**summary, "status": "interrupted"}, f)
+        assert dataset.update(str(log_dir)) == {"sessions": 0, "rows": 0}
+        with open(summary_file, 'w', encoding="utf-8") as f: json.dump(summary, f)
+        assert dataset.update(str(log_dir)) == {"sessions": 1, "rows": len(third)}
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    print("✅ 列式决策数据集测试通过")
+
+
+def test_benchmarks():
+    """冒烟测试：每个基准以最小规模运行一次，及早发现基准代码与被测模块不同步"""
+    print("\n测试性能基准...")
+
+    from benchmarks import BENCHMARKS, run_benchmark
+
+    for name in BENCHMARKS:
+        result = run_benchmark(name, seed=0, repeat=1, scale=1)
+        assert result["ops"] > 0 and result["median_us"] > 0, name
+    print(f"✅ {len(BENCHMARKS)} 个性能基准均可运行")
+
+
+def test_hand_history():
+    """测试牌谱导入：多进程流式解析，无法表示的手牌按原因跳过，导入的手牌可以在引擎上复盘一致"""
+    print("\n测试牌谱导入...")
+
+    import json
+    import tempfile
+    from unittest import mock
+    from hand_history import import_hand_histories
+    from replay import ReplayManager, replay_logs
+
+    log_dir = tempfile.mkdtemp(prefix="llm_poker_hh_")
+    try:
+        path = os.path.join(log_dir, "stars.txt")
+        with open(path, 'w', encoding='utf-8') as f: f.write(_HAND_HISTORY * 3)
+        counts = import_hand_histories([path], log_dir, session_id="stars", workers=2, chunk_size=3)
+        assert counts["hands"] == 12 and counts["imported"] == 6
+        assert counts["rejected"] == {"ante": 3, "malformed": 3} and counts["errors"] == []
+        assert [r["status"] for r in replay_logs(log_dir, "stars")] == ["ok"] * 6
+
+        with open(os.path.join(log_dir, "stars", "hand_1.json"), 'r', encoding='utf-8') as f: hand = json.load(f)
+        assert hand["source"]["hand_id"] == "200000000002" and hand["game_config"]["big_blind"] == 2
+        assert [p["hand_known"] for p in hand["players"]] == [True, False, True]
+        # 底牌未亮出的玩家在动作记录中没有底牌；赢家与牌谱一致，结算不含抽水
+        first = hand["rounds"][0]["actions"][0]
+        assert first["player_name"] == "Villain1" and first["player_hand"] == [] and first["action_result"]
+        assert hand["final_chips"] == {"Hero": 174, "Villain1": 183, "Villain2": 193}
+
+        # 引擎出错不能算作牌谱格式损坏
+        def broken_run_hand(self, hand_data, logger): raise KeyError("Hero")
+        with mock.patch.object(ReplayManager, "run_hand", broken_run_hand):
+            counts = import_hand_histories([path], log_dir, session_id="broken", workers=1)
+        assert counts["rejected"] == {"ante": 3, "malformed": 3, "internal_error": 6}
+        assert len(counts["errors"]) == 6 and "KeyError" in counts["errors"][0] and "PokerStars Hand #" in counts["errors"][0]
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+    print("✅ 牌谱导入测试通过")
+
+
+_HAND_HISTORY = """junk before first hand
+
+PokerStars Hand #200000000002:  Hold'em No Limit ($0.01/$0.02 USD) - 2024/01/02 10:01:00 ET
+Table 'Alpha' 6-max Seat #3 is the button
+Seat 1: Hero ($1.76 in chips)
+Seat 3: Villain1 ($1.99 in chips)
+Seat 5: Villain2 ($1.75 in chips)
+Villain2: posts small blind $0.01
+Hero: posts big blind $0.02
+*** HOLE CARDS ***
+Dealt to Hero [7c 2d]
+Villain1: raises $0.04 to $0.06
+Villain1 said, "gl"
+Villain2: calls $0.05
+Hero: folds
+*** FLOP *** [Kh Kc 4s]
+Villain2: checks
+Villain1: checks
+*** TURN *** [Kh Kc 4s] [Qd]
+Villain2: bets $0.10
+Villain1: calls $0.10
+*** RIVER *** [Kh Kc 4s Qd] [Jc]
+Villain2: checks
+Villain1: checks
+*** SHOW DOWN ***
+Villain2: shows [Ks 5h] (three of a kind, Kings)
+Villain1: mucks hand
+Villain2 collected $0.33 from pot
+*** SUMMARY ***
+Total pot $0.34 | Rake $0.01
+Board [Kh Kc 4s Qd Jc]
+
+PokerStars Hand #200000000003: Tournament #99, $1.00+$0.10 USD Hold'em No Limit - Level III (25/50) - 2024/01/02 10:02:00 ET
+Table '99 1' 9-max Seat #1 is the button
+Seat 1: A (1500 in chips)
+Seat 2: B (1500 in chips)
+Seat 3: C (1500 in chips)
+A: posts the ante 5
+B: posts the ante 5
+C: posts the ante 5
+B: posts small blind 25
+C: posts big blind 50
+*** HOLE CARDS ***
+A: folds
+B: folds
+Uncalled bet (25) returned to C
+C collected 65 from pot
+*** SUMMARY ***
+Total pot 65 | Rake 0
+
+PokerStars Hand #200000000005:  Hold'em No Limit ($0.01/$0.02 USD) - 2024/01/02 10:04:00 ET
+Table 'Alpha' 6-max Seat #5 is the button
+Seat 1: Hero ($1.74 in chips)
+
+PokerStars Hand #200000000006:  Hold'em No Limit ($0.01/$0.02 USD) - 2024/01/02 10:05:00 ET
+Table 'Alpha' 6-max Seat #5 is the button
+Seat 1: Hero ($1.74 in chips)
+Seat 3: Villain1 ($1.83 in chips)
+Seat 5: Villain2 ($2.08 in chips)
+Seat 6: Sitter ($2.00 in chips) is sitting out
+Hero: posts small blind $0.01
+Villain1: posts big blind $0.02
+*** HOLE CARDS ***
+Dealt to Hero [Qs Qh]
+Villain2: folds
+Hero: raises $0.06 to $0.08
+Villain1: folds
+Uncalled bet ($0.06) returned to Hero
+Hero collected $0.04 from pot
+Hero: doesn't show hand
+*** SUMMARY ***
+Total pot $0.04 | Rake $0
+Seat 1: Hero (small blind) collected ($0.04)
+"""
+
+
+def test_spectator():
+    """测试观战服务：SSE客户端收到完整的牌局事件；慢客户端的队列有界，筹码快照合并、旧事件丢弃并提示落后；页面不把事件内容当作HTML"""
+    print("\n测试观战服务...")
+
+    import asyncio
+    import json
+    import socket
+    from game_manager import GameManager
+    from spectator import SpectatorServer, _ClientQueue, _INDEX_HTML
+
+    # 页面只把事件字段作为文本插入，玩家名等不会被当作HTML解析
+    assert "innerHTML" not in _INDEX_HTML and "textContent" in _INDEX_HTML
+    server = SpectatorServer(port=0).start()
+    manager = None
+    try:
+        conn = socket.create_connection(("127.0.0.1", server.port), timeout=10)
+        conn.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        stream = conn.makefile("rb")
+        assert stream.readline().startswith(b"HTTP/1.1 200")
+        while len(server.clients) < 1: time.sleep(0.01)
+
+        manager = GameManager(2, 500, ["bot_tag", "bot_call"], seed=3, verbose=False)
+        manager._play_hand(1)
+        events = []
+        while not events or events[-1]["type"] != "hand_end":
+            line = stream.readline()
+            if line.startswith(b"data: "): events.append(json.loads(line[6:]))
+        conn.close()
+        assert events[0]["type"] == "hand_start" and events[0]["table"] == manager.logger.session_id
+        assert {"street", "action", "showdown"} <= {e["type"] for e in events}
+    finally:
+        server.stop()
+        if manager: shutil.rmtree(manager.logger.session_dir, ignore_errors=True)
+
+    async def slow_client():
+        client = _ClientQueue(3, None)
+        for i in range(5): client.put({"type": "action", "table": "t1", "i": i}, f"a{i}")
+        client.put({"type": "hand_end", "table": "t1"}, "end1")
+        client.put({"type": "hand_end", "table": "t1"}, "end2")
+        return [await client.get() for _ in range(4)]
+    received = asyncio.run(slow_client())
+    assert json.loads(received[0]) == {"type": "lagged", "dropped": 3}
+    assert received[1:] == ["a3", "a4", "end2"]
+
+    print("✅ 观战服务测试通过")
 
 
 def main():
     """运行所有测试"""
     print("开始运行德州扑克游戏系统测试...\n")
-    
+
     # 测试扑克游戏
     test_poker_game()
-    
+    test_hand_evaluation()
+    test_side_pots()
+    test_all_in_ev()
+    test_pot_properties()
+    test_undo_and_snapshot()
+    test_budget()
+    test_bots()
+    test_replay()
+    test_hud()
+    test_metrics()
+    test_checkpoint_resume()
+    test_tournament()
+    test_duplicate()
+    test_sequential()
+    test_work_queue()
+    test_batch_eval()
+    test_search_index()
+    test_rating()
+    test_decision_dataset()
+    test_hand_history()
+    test_benchmarks()
+    test_spectator()
+
     # 测试LLM客户端
-    llm_ok = test_llm_client()
-    
+    try:
+        test_llm_client()
+        llm_ok = True
+    except Exception as e:
+        print(f"❌ LLM客户端测试失败: {e}")
+        llm_ok = False
+
     # 测试游戏管理器
-    manager_ok = test_game_manager()
-    
+    try:
+        test_game_manager()
+        manager_ok = True
+    except Exception as e:
+        print(f"❌ 游戏管理器测试失败: {e}")
+        manager_ok = False
+
     print("\n" + "="*50)
     print("测试结果总结:")
     print("✅ 扑克游戏引擎: 通过")
     print(f"{'✅' if llm_ok else '❌'} LLM客户端: {'通过' if llm_ok else '失败'}")
     print(f"{'✅' if manager_ok else '❌'} 游戏管理器: {'通过' if manager_ok else '失败'}")
-    
+
     if llm_ok and manager_ok:
         print("\n🎉 所有测试通过！系统可以正常运行。")
         print("运行 'python main.py' 开始游戏。")
@@ -107,4 +1177,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,106 @@
+"""
+向量化引擎测试 - 牌力编码与 hand_rank 一致，且相同牌序、相同决策下每手牌的结果与 PokerGame/GameManager 完全相同
+"""
+
+import random
+
+import numpy as np
+
+from config import GAME_CONFIG
+from game_manager import GameManager
+from poker_engine import PokerGame, Card, RANKS, SUITS, best_hand_rank, parse_card
+from vector_engine import (VectorPokerGame, ACTION_NAMES, ACTION_CODES, RAISE, card_code, deck_codes,
+                           rank_score, best_scores)
+
+DECK = [Card(rank, suit) for rank in RANKS for suit in SUITS]
+
+
+def _decide(rng: random.Random, to_call: int, can_raise: bool, min_total: int, max_total: int):
+    """测试用随机策略：会故意给出非法动作（面对下注时过牌、无需跟注时跟注、不能加注时加注、越界的加注额）."""
+    action = rng.choices(ACTION_NAMES, weights=[1, 2, 2, 1.5, 0.3])[0]
+    amount = rng.randint(min_total - 40, max_total + 40) if can_raise else rng.randint(0, 100)
+    return action, amount
+
+
+class _NullLogger:
+    def __getattr__(self, name): return lambda *args, **kwargs: None
+
+
+class _ScriptedManager(GameManager):
+    """对象引擎一侧：沿用 GameManager 的整手牌流程和动作校验，决策来自 _decide."""
+
+    def __init__(self, num_players: int, starting_chips: int, seed: int, rng: random.Random):
+        self._init_bare(PokerGame([{"name": f"Player-{i+1}", "llm_type": "scripted"} for i in range(num_players)],
+                                  starting_chips, GAME_CONFIG['small_blind'], GAME_CONFIG['big_blind'], seed=seed),
+                        {"scripted": self}, _NullLogger())
+        self.system_prompt = ""
+        self.rng = rng
+
+    def _get_player_action(self, player):
+        valid = self._get_valid_actions(player)
+        to_call = min(self.game.current_bet - player.bet_in_round, player.chips)
+        min_total = self.game.current_bet + self.game.min_raise_amount
+        self.pending = _decide(self.rng, to_call, 'raise' in valid, min_total, player.chips + player.bet_in_round)
+        return super()._get_player_action(player)
+
+    def get_action(self, game_state_text, player_hand, system_prompt, budget=None):
+        action, amount = self.pending
+        return {'action': action, 'amount': amount}, {}, ""
+
+
+def _check_scores(spots):
+    codes = np.array([[card_code(c) for c in cards] for cards in spots])
+    expected = [rank_score(best_hand_rank(cards)) for cards in spots]
+    assert best_scores(codes).tolist() == expected
+
+
+def test_best_scores_match_best_hand_rank():
+    rng = random.Random(2)
+    _check_scores([rng.sample(DECK, 7) for _ in range(20000)])
+
+
+def test_best_scores_special_hands():
+    # 轮子顺、同花顺、同花与顺子并存、两个三条、三个对子、四条带对子等
+    spots = ["A♠ 2♥ 3♦ 4♣ 5♠ K♥ K♦", "A♥ 2♥ 3♥ 4♥ 5♥ 6♥ K♦", "9♠ T♠ J♠ Q♠ K♠ A♠ 2♠",
+             "4♦ 5♦ 6♦ 7♦ 8♣ 9♦ 2♦", "K♠ K♥ K♦ 9♣ 9♠ 9♥ 2♦", "K♠ K♥ Q♦ Q♣ 4♠ 4♥ A♦",
+             "7♠ 7♥ 7♦ 7♣ 9♠ 9♥ 2♦", "2♠ 3♥ 4♦ 5♣ 6♠ 7♥ 8♦", "A♠ K♠ Q♠ J♠ 9♠ T♥ 2♦"]
+    _check_scores([[parse_card(c) for c in spot.split()] for spot in spots])
+
+
+def _cross_check(num_tables: int, num_players: int, starting_chips: int, num_hands: int):
+    managers = [_ScriptedManager(num_players, starting_chips, seed=t, rng=random.Random(f"obj:{t}")) for t in range(num_tables)]
+    vector_rngs = [random.Random(f"obj:{t}") for t in range(num_tables)]
+    game = VectorPokerGame(num_tables, num_players, starting_chips)
+
+    def policy(batch):
+        decisions = [_decide(vector_rngs[t], batch.to_call[i], batch.can_raise[i],
+                             batch.min_raise_total[i], batch.max_raise_total[i]) for i, t in enumerate(batch.tables)]
+        return [ACTION_CODES[a] for a, _ in decisions], [amount for _, amount in decisions]
+
+    for hand_num in range(1, num_hands + 1):
+        for manager in managers:
+            if len([p for p in manager.game.players if p.chips > 0]) >= 2: manager._play_hand(hand_num)
+        decks = np.stack([deck_codes(f"{t}:{game.hands_played[t] + 1}") for t in range(num_tables)])
+        game.play_hand(policy, decks)
+
+        vector_chips = np.zeros_like(game.chips)
+        np.put_along_axis(vector_chips, game.seat_ids, game.chips, 1)
+        for t, manager in enumerate(managers):
+            assert [p.chips for p in manager.all_players] == vector_chips[t].tolist(), f"table {t} hand {hand_num}"
+        assert [m.game.hand_count for m in managers] == game.hands_played.tolist()
+
+
+def test_matches_object_engine_heads_up():
+    _cross_check(num_tables=40, num_players=2, starting_chips=300, num_hands=40)
+
+
+def test_matches_object_engine_full_table():
+    # 筹码较浅，多人全下形成多层边池，且有玩家陆续出局
+    _cross_check(num_tables=30, num_players=6, starting_chips=400, num_hands=30)
+
+
+def test_reset_stacks_keeps_tables_running():
+    game = VectorPokerGame(200, 3, 200, seed=3, reset_stacks=True)
+    results = game.play(20, lambda batch: (np.full(len(batch), RAISE), batch.max_raise_total))
+    assert game.hands_played.tolist() == [20] * 200
+    assert results.sum() == 0
@@ -0,0 +1,222 @@
+# tournament.py
+
+"""
+多桌锦标赛 - 任意数量的座位分到多张桌并发进行，盲注按级别递增，有人出局后自动拆桌和平衡人数，直到决出冠军
+"""
+
+import json
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from config import PROMPT_CONFIG, LLM_CONFIGS, BOT_CONFIGS, TOURNAMENT_CONFIG
+from game_manager import GameManager, create_client
+from hud import HudTracker
+from logger import GameLogger
+from poker_engine import PokerGame, Player
+
+
+class TournamentTable(GameManager):
+    """一张锦标赛桌：复用 GameManager 的整手牌流程，玩家、LLM客户端和获胜统计由锦标赛统一持有."""
+
+    def __init__(self, table_id: int, llm_clients: Dict[str, Any], winner_stats: Dict[str, int],
+                 logger: GameLogger, seed=None, verbose: bool = False, hud_stats: Dict[str, Dict[str, int]] = None):
+        # 不调用父类构造：座位在开赛和平衡时由锦标赛分配
+        # all_players 为曾在本桌坐过的所有玩家，用于会话总结
+        self._init_bare(PokerGame([], 0, *TOURNAMENT_CONFIG["blind_levels"][0],
+                                  seed=None if seed is None else f"{seed}:t{table_id}"),
+                        llm_clients, logger, verbose)
+        self.table_id = table_id
+        # 对手统计的计数由各桌共享，玩家换桌后继续累计
+        self.hud = HudTracker(hud_stats)
+        self.show_hud = PROMPT_CONFIG.get("show_hud", False)
+        self.winner_stats = winner_stats
+        self.hands_played = 0
+        # 本桌正在进行手牌时分配过来的玩家，下一手开始前入座
+        self.arrivals: List[Player] = []
+
+    @property
+    def seat_count(self) -> int:
+        return len(self.game.players) + len(self.arrivals)
+
+    def seat(self, player: Player):
+        self.game.players.append(player)
+        self.game.num_players = len(self.game.players)
+        if player not in self.all_players: self.all_players.append(player)
+
+    def unseat(self, player: Player):
+        idx = self.game.players.index(player)
+        self.game.players.pop(idx)
+        self.game.num_players = len(self.game.players)
+        # 保持庄家位置落在原来的下一位玩家之前
+        if idx <= self.game.dealer_pos: self.game.dealer_pos -= 1
+
+    def next_big_blind(self) -> Player:
+        """下一手牌将要下大盲的玩家（TDA规则：平衡人数时优先移动他）."""
+        n = len(self.game.players)
+        return self.game.players[(self.game.dealer_pos + (2 if n == 2 else 3)) % n]
+
+    def play_next_hand(self):
+        self.hands_played += 1
+        self._play_hand(self.hands_played)
+
+    def close(self):
+        self.logger.log_session_end({p.name: p.chips for p in self.all_players},
+                                    {p.name: self.winner_stats[p.name] for p in self.all_players},
+                                    {p.name: p.llm_type for p in self.all_players}, status="tournament_table")
+
+
+class Tournament:
+    def __init__(self, seat_llm_types: List[str], starting_chips: int,
+                 table_size: int = TOURNAMENT_CONFIG["table_size"],
+                 hands_per_level: int = TOURNAMENT_CONFIG["hands_per_level"],
+                 blind_levels: List[List[int]] = None, seed: int = None, max_hands: int = None,
+                 log_dir: str = "logs", verbose: bool = False):
+        unknown = set(seat_llm_types) - set(LLM_CONFIGS) - set(BOT_CONFIGS)
+        if unknown:
+            raise ValueError(f"不支持的LLM类型: {', '.join(sorted(unknown))}")
+        if len(seat_llm_types) < 2:
+            raise ValueError("锦标赛至少需要两位玩家")
+        if table_size < 2:
+            raise ValueError("每桌至少需要两个座位")
+        self.table_size = table_size
+        self.hands_per_level = hands_per_level
+        self.blind_levels = blind_levels or TOURNAMENT_CONFIG["blind_levels"]
+        self.max_hands = max_hands
+        self.log_dir = Path(log_dir)
+        self.tournament_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        self.players = [Player(f"Player-{i+1}", starting_chips, t) for i, t in enumerate(seat_llm_types)]
+        self.winner_stats = {p.name: 0 for p in self.players}
+        self.hud_stats: Dict[str, Dict[str, int]] = {}
+        self.llm_clients = {t: create_client(t, seed) for t in dict.fromkeys(seat_llm_types)}
+
+        # 随机抽签入座，按轮流发牌的方式分桌，各桌人数最多相差一人
+        num_tables = math.ceil(len(self.players) / table_size)
+        draw = list(self.players)
+        random.Random(seed).shuffle(draw)
+        self.tables: List[TournamentTable] = []
+        for table_id in range(1, num_tables + 1):
+            logger = GameLogger(log_dir, session_id=f"{self.tournament_id}_t{table_id}")
+            self.tables.append(TournamentTable(table_id, self.llm_clients, self.winner_stats, logger, seed, verbose,
+                                               self.hud_stats))
+        for i, p in enumerate(draw): self.tables[i % num_tables].seat(p)
+        self.all_tables = list(self.tables)
+
+        self.level = 0
+        self.hands_at_level = 0
+        self.total_hands = 0
+        # 出局顺序（先出局的在前）
+        self.eliminated: List[Player] = []
+        self.moves = 0
+
+    @property
+    def remaining(self) -> List[Player]:
+        return [p for t in self.tables for p in t.game.players + t.arrivals]
+
+    def run(self) -> List[Dict[str, Any]]:
+        """各桌并发进行，任意一桌打完一手立即结算出局、平衡人数并开始下一手，不等待其他桌."""
+        running = {}
+        with ThreadPoolExecutor(max_workers=len(self.tables)) as pool:
+            self._schedule(pool, running)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    table = running.pop(future)
+                    future.result()
+                    self._finish_hand(table)
+                self._schedule(pool, running)
+        for table in self.tables: table.close()
+        self.tables = []
+        standings = self.standings()
+        self._save_summary(standings)
+        return standings
+
+    def _finish_hand(self, table: TournamentTable):
+        busted = sorted((p for p in table.game.players if p.chips == 0), key=lambda p: p.chips_at_start_of_hand)
+        for p in busted:
+            table.unseat(p)
+            self.eliminated.append(p)
+        self.total_hands += 1
+        self.hands_at_level += 1
+        # 级别按平均每桌打满 hands_per_level 手升一级，拆桌后级别不会变慢
+        if self.level + 1 < len(self.blind_levels) and self.hands_at_level >= self.hands_per_level * len(self.tables):
+            self.level += 1
+            self.hands_at_level = 0
+
+    def _schedule(self, pool: ThreadPoolExecutor, running: Dict):
+        """只在空闲的桌上拆桌、移动玩家；移往正在进行手牌的桌的玩家先进入该桌的 arrivals."""
+        if self.max_hands is not None and self.total_hands >= self.max_hands: return
+        busy = set(running.values())
+        for table in list(self.tables):
+            if table in busy: continue
+            for p in table.arrivals: table.seat(p)
+            table.arrivals.clear()
+            self._balance(table)
+        if len(self.remaining) < 2: return
+        small_blind, big_blind = self.blind_levels[self.level]
+        for table in self.tables:
+            if table in busy or len(table.game.players) < 2: continue
+            table.game.small_blind, table.game.big_blind = small_blind, big_blind
+            running[pool.submit(table.play_next_hand)] = table
+
+    def _balance(self, table: TournamentTable):
+        others = [t for t in self.tables if t is not table]
+        if not others: return
+        # 其余各桌坐得下所有人，或本桌人数不足开局且别处有空位时，拆掉本桌
+        fits_elsewhere = len(self.remaining) <= len(others) * self.table_size
+        if fits_elsewhere or (len(table.game.players) < 2 and sum(self.table_size - t.seat_count for t in others) >= len(table.game.players)):
+            while table.game.players: self._move(table, table.game.players[-1], others)
+            self.tables.remove(table)
+            table.close()
+            return
+        # 本桌比人数最少的桌多出一人以上时，把下一位大盲移过去
+        while table.seat_count > min(t.seat_count for t in others) + 1:
+            self._move(table, table.next_big_blind(), others)
+
+    def _move(self, table: TournamentTable, player: Player, others: List[TournamentTable]):
+        target = min(others, key=lambda t: (t.seat_count, t.table_id))
+        table.unseat(player)
+        target.arrivals.append(player)
+        self.moves += 1
+        table._print(f"{player.name} 从第 {table.table_id} 桌移到第 {target.table_id} 桌")
+
+    def standings(self) -> List[Dict[str, Any]]:
+        """名次：仍在场的按筹码排序（提前结束时），之后按出局的倒序."""
+        alive = sorted(self.remaining or [p for p in self.players if p.chips > 0], key=lambda p: p.chips, reverse=True)
+        order = alive + list(reversed(self.eliminated))
+        return [{"place": place, "name": p.name, "llm_type": p.llm_type, "chips": p.chips,
+                 "hands_won": self.winner_stats[p.name]} for place, p in enumerate(order, 1)]
+
+    def _save_summary(self, standings: List[Dict[str, Any]]):
+        summary = {
+            "tournament_id": self.tournament_id,
+            "end_time": datetime.now().isoformat(),
+            "players": len(self.players),
+            "total_hands": self.total_hands,
+            "final_level": self.level + 1,
+            "final_blinds": self.blind_levels[self.level],
+            "table_moves": self.moves,
+            "table_sessions": [t.logger.session_id for t in self.all_tables],
+            "standings": standings
+        }
+        self.summary_path = self.log_dir / f"tournament_{self.tournament_id}.json"
+        with open(self.summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+def results_by_type(standings: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """按 llm_type 汇总名次：座位数、平均名次、冠军数和进入前1/3（奖励圈）的比例."""
+    paid = max(1, len(standings) // 3)
+    results: Dict[str, Dict[str, float]] = {}
+    for s in standings:
+        r = results.setdefault(s["llm_type"], {"seats": 0, "place_sum": 0, "wins": 0, "itm": 0})
+        r["seats"] += 1
+        r["place_sum"] += s["place"]
+        r["wins"] += s["place"] == 1
+        r["itm"] += s["place"] <= paid
+    return {t: {"seats": r["seats"], "avg_place": r["place_sum"] / r["seats"], "wins": r["wins"],
+                "itm_rate": r["itm"] / r["seats"]} for t, r in results.items()}
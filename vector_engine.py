@@ -0,0 +1,453 @@
+# vector_engine.py
+
+"""
+向量化引擎 - 以结构数组(struct-of-arrays)在 NumPy 中同步推进 N 张桌的牌局：
+筹码、下注、弃牌/全下标记和牌都是 (桌, 座次) 数组，下注、换街、边池与摊牌都按批量数组运算执行。
+规则与 PokerGame + GameManager 的整手牌流程一致，用于脚本策略的大规模模拟（不写日志、不调用LLM）。
+"""
+
+import argparse
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from config import GAME_CONFIG
+from poker_engine import Deck, RANKS, SUITS
+
+FOLD, CHECK, CALL, RAISE, ALL_IN = range(5)
+ACTION_NAMES = ["fold", "check", "call", "raise", "all-in"]
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+
+PREFLOP, FLOP, TURN, RIVER = range(4)
+STREET_NAMES = ["preflop", "flop", "turn", "river"]
+BOARD_COUNTS = np.array([0, 3, 4, 5])
+
+# 牌编码 = 点数下标*4 + 花色下标，与 Deck 构造时的顺序一致
+_RANK_IDX = {rank: i for i, rank in enumerate(RANKS)}
+_SUIT_IDX = {suit: i for i, suit in enumerate(SUITS)}
+_VALUES = np.arange(15)
+_TIEBREAK_WEIGHTS = 16 ** np.arange(4, -1, -1)
+_NO_LEVEL = np.iinfo(np.int64).max // 4
+
+
+def card_code(card) -> int:
+    return _RANK_IDX[card.rank] * 4 + _SUIT_IDX[card.suit]
+
+
+def deck_codes(deck_seed) -> np.ndarray:
+    """与 Deck(deck_seed) 牌序相同的牌编码数组（末尾的牌最先发出）."""
+    return np.array([card_code(c) for c in Deck(deck_seed).cards], dtype=np.int8)
+
+
+def rank_score(rank: tuple) -> int:
+    """把 hand_rank 返回的牌力元组编码为整数，大小关系不变."""
+    category, tiebreak = rank[0], rank[1]
+    values = list(tiebreak) if isinstance(tiebreak, list) else [tiebreak]
+    return category * 16 ** 5 + sum(v * w for v, w in zip(values + [0] * (5 - len(values)), _TIEBREAK_WEIGHTS))
+
+
+def _top_values(mask: np.ndarray, k: int) -> np.ndarray:
+    """mask 为 (M, 15) 的点数掩码，返回每行最大的 k 个点数（不足补0），降序."""
+    return -np.sort(-np.where(mask, _VALUES, 0), axis=1)[:, :k]
+
+
+def _straight_high(presence: np.ndarray) -> np.ndarray:
+    """presence 为 (M, 15) 的点数掩码，返回最大顺子的最高点数（A可作1），没有顺子为0."""
+    bits = (presence.astype(np.int64) << _VALUES).sum(1)
+    bits |= ((bits >> 14) & 1) << 1
+    runs = bits & (bits >> 1) & (bits >> 2) & (bits >> 3) & (bits >> 4)
+    return np.where(runs > 0, np.floor(np.log2(np.maximum(runs, 1))).astype(np.int64) + 4, 0)
+
+
+def best_scores(cards: np.ndarray) -> np.ndarray:
+    """批量计算7张牌中最大5张组合的牌力整数（与 rank_score(best_hand_rank(...)) 相同），cards 形状为 (M, 7).
+
+    直接按点数/花色直方图判断牌型，不展开21种组合。
+    """
+    m = len(cards)
+    values = (cards // 4 + 2).astype(np.int64)
+    suits = (cards % 4).astype(np.int64)
+    rows = np.arange(m)[:, None]
+    counts = np.bincount((rows * 15 + values).ravel(), minlength=m * 15).reshape(m, 15)
+    presence = counts > 0
+    suit_counts = np.bincount((rows * 4 + suits).ravel(), minlength=m * 4).reshape(m, 4)
+    flush_suit = suit_counts.argmax(1)
+    has_flush = suit_counts.max(1) >= 5
+    in_flush_suit = (suits == flush_suit[:, None]).ravel()
+    flush_presence = np.bincount((rows * 15 + values).ravel()[in_flush_suit], minlength=m * 15).reshape(m, 15) > 0
+
+    straight_flush_high = np.where(has_flush, _straight_high(flush_presence), 0)
+    straight_high = _straight_high(presence)
+    quad = (np.where(counts == 4, _VALUES, 0)).max(1)
+    trips = (np.where(counts >= 3, _VALUES, 0)).max(1)
+    pair = (np.where((counts >= 2) & (_VALUES != trips[:, None]), _VALUES, 0)).max(1)
+    second_pair = (np.where((counts >= 2) & (_VALUES != trips[:, None]) & (_VALUES != pair[:, None]), _VALUES, 0)).max(1)
+
+    def without(*excluded):
+        mask = presence.copy()
+        for v in excluded: mask &= _VALUES != v[:, None]
+        return mask
+
+    zeros = np.zeros((m, 5), dtype=np.int64)
+    candidates = [
+        (straight_flush_high > 0, 9, np.column_stack([straight_flush_high, zeros[:, :4]])),
+        (quad > 0, 8, np.column_stack([quad, _top_values(without(quad), 1), zeros[:, :3]])),
+        ((trips > 0) & (pair > 0), 7, np.column_stack([trips, pair, zeros[:, :3]])),
+        (has_flush, 6, _top_values(flush_presence, 5)),
+        (straight_high > 0, 5, np.column_stack([straight_high, zeros[:, :4]])),
+        (trips > 0, 4, np.column_stack([trips, _top_values(without(trips), 2), zeros[:, :2]])),
+        (second_pair > 0, 3, np.column_stack([pair, second_pair, _top_values(without(pair, second_pair), 1), zeros[:, :2]])),
+        (pair > 0, 2, np.column_stack([pair, _top_values(without(pair), 3), zeros[:, :1]])),
+    ]
+    category = np.ones(m, dtype=np.int64)
+    tiebreak = _top_values(presence, 5)
+    # 从低到高依次覆盖，最终保留最大的牌型
+    for matched, cat, values_ in reversed(candidates):
+        category = np.where(matched, cat, category)
+        tiebreak = np.where(matched[:, None], values_, tiebreak)
+    return category * 16 ** 5 + (tiebreak * _TIEBREAK_WEIGHTS).sum(1)
+
+
+class DecisionBatch:
+    """所有等待行动的桌上当前玩家的视角，每个属性都是长度为 M 的数组（底牌和公共牌为 (M, 2)/(M, 5)，未发的公共牌为 -1）."""
+
+    def __init__(self, game: "VectorPokerGame", tables: np.ndarray, positions: np.ndarray):
+        self.tables = tables
+        self.positions = positions
+        self.seats = game.seat_ids[tables, positions]
+        self.street = game.street[tables]
+        self.hole = game.hole[tables, positions]
+        revealed = np.arange(5) < BOARD_COUNTS[self.street][:, None]
+        self.board = np.where(revealed, game.board[tables], -1)
+        self.chips = game.chips[tables, positions]
+        self.bet_in_round = game.bet_in_round[tables, positions]
+        self.bet_in_hand = game.bet_in_hand[tables, positions]
+        self.chips_at_start = game.chips_at_start[tables, positions]
+        self.current_bet = game.current_bet[tables]
+        self.to_call = np.minimum(self.current_bet - self.bet_in_round, self.chips)
+        self.min_raise_total = self.current_bet + game.min_raise[tables]
+        self.max_raise_total = self.chips + self.bet_in_round
+        self.can_raise = self.max_raise_total >= self.min_raise_total
+        self.pot = game.bet_in_hand[tables].sum(1)
+        self.num_active = game.active[tables].sum(1)
+
+    def __len__(self): return len(self.tables)
+
+
+Policy = Callable[[DecisionBatch], Tuple[np.ndarray, np.ndarray]]
+
+
+class VectorPokerGame:
+    """N 张桌同步进行的牌局。每张桌的座次数组中，仍有筹码的玩家按原座位顺序排在前面，出局玩家移到末尾，
+    因此下标与 PokerGame.players 中的下标一致（庄家、盲注位置也按同样的方式计算）。seat_ids 记录原始座位号."""
+
+    def __init__(self, num_tables: int, num_players: int, starting_chips: int,
+                 small_blind: int = GAME_CONFIG['small_blind'], big_blind: int = GAME_CONFIG['big_blind'],
+                 seed: int = None, reset_stacks: bool = False):
+        shape = (num_tables, num_players)
+        self.num_tables, self.num_players = num_tables, num_players
+        self.starting_chips = starting_chips
+        self.small_blind, self.big_blind = small_blind, big_blind
+        self.reset_stacks = reset_stacks
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.arange(num_tables)
+
+        self.seat_ids = np.tile(np.arange(num_players), (num_tables, 1))
+        self.chips = np.full(shape, starting_chips, dtype=np.int64)
+        self.chips_at_start = self.chips.copy()
+        self.bet_in_round = np.zeros(shape, dtype=np.int64)
+        self.bet_in_hand = np.zeros(shape, dtype=np.int64)
+        self.active = np.zeros(shape, dtype=bool)
+        self.all_in = np.zeros(shape, dtype=bool)
+        self.acted = np.zeros(shape, dtype=bool)
+        self.hole = np.zeros(shape + (2,), dtype=np.int8)
+        self.board = np.zeros((num_tables, 5), dtype=np.int8)
+
+        self.n = np.full(num_tables, num_players)
+        self.dealer_pos = np.full(num_tables, -1)
+        self.street = np.zeros(num_tables, dtype=np.int64)
+        self.current_bet = np.zeros(num_tables, dtype=np.int64)
+        self.min_raise = np.full(num_tables, big_blind, dtype=np.int64)
+        self.last_raiser = np.full(num_tables, -1)
+        # 当前行动者的下标；-1 表示本轮下注已结束
+        self.to_act = np.full(num_tables, -1)
+        # 本轮开始时可以行动（未弃牌且未全下）的玩家数
+        self.num_can_act = np.zeros(num_tables, dtype=np.int64)
+        self.in_hand = np.zeros(num_tables, dtype=bool)
+        self.hands_played = np.zeros(num_tables, dtype=np.int64)
+        self.total_results = np.zeros(shape, dtype=np.int64)
+
+    # --- 座次与下注 ---
+    def _next_active_idx(self, tables: np.ndarray, start: np.ndarray) -> np.ndarray:
+        """与 PokerGame.get_next_active_player_idx 相同：从 start 的下一位开始找未弃牌且未全下的玩家，最后检查 start 本身."""
+        n = self.n[tables][:, None]
+        offsets = np.arange(self.num_players)
+        idx = (start[:, None] + 1 + offsets) % np.maximum(n, 1)
+        can_act = self.active[tables] & ~self.all_in[tables]
+        ok = np.take_along_axis(can_act, idx, 1) & (offsets < n)
+        first = ok.argmax(1)
+        return np.where(ok.any(1), idx[np.arange(len(tables)), first], -1)
+
+    def _execute_bet(self, tables: np.ndarray, positions: np.ndarray, amounts: np.ndarray):
+        final = np.minimum(amounts, self.chips[tables, positions])
+        self.chips[tables, positions] -= final
+        self.bet_in_round[tables, positions] += final
+        self.bet_in_hand[tables, positions] += final
+        self.current_bet[tables] = np.maximum(self.current_bet[tables], self.bet_in_round[tables, positions])
+        self.all_in[tables, positions] |= self.chips[tables, positions] == 0
+
+    # --- 一手牌的流程 ---
+    def start_new_hand(self, decks: np.ndarray = None) -> np.ndarray:
+        """开始新的一手牌并发牌，返回成功开局的桌（至少两名玩家有筹码）。decks 为 (N, 52) 的牌编码，末尾先发."""
+        if self.reset_stacks:
+            order = np.argsort(self.seat_ids, axis=1)
+            self.seat_ids = np.take_along_axis(self.seat_ids, order, 1)
+            self.chips[:] = self.starting_chips
+        present = self.chips > 0
+        order = np.argsort(~present, axis=1, kind="stable")
+        self.seat_ids = np.take_along_axis(self.seat_ids, order, 1)
+        self.chips = np.take_along_axis(self.chips, order, 1)
+        present = np.take_along_axis(present, order, 1)
+        self.n = present.sum(1)
+        started = self.n >= 2
+
+        self.active = present & started[:, None]
+        self.all_in[:] = False
+        self.bet_in_round[:] = 0
+        self.bet_in_hand[:] = 0
+        self.chips_at_start = self.chips.copy()
+        self.dealer_pos = np.where(started, (self.dealer_pos + 1) % np.maximum(self.n, 1), self.dealer_pos)
+        self.hands_played += started
+
+        if decks is None:
+            decks = self.rng.permuted(np.tile(np.arange(52, dtype=np.int8), (self.num_tables, 1)), axis=1)
+        positions = np.arange(self.num_players)
+        self.hole[:, :, 0] = decks[:, 51 - 2 * positions]
+        self.hole[:, :, 1] = decks[:, 50 - 2 * positions]
+        self.board = decks[self.rows[:, None], 51 - 2 * self.n[:, None] - np.arange(5)]
+
+        self.street[:] = PREFLOP
+        self.to_act[:] = -1
+        self.in_hand = started
+        self._start_betting_round(self.rows[started])
+        return started
+
+    def _start_betting_round(self, tables: np.ndarray):
+        self.current_bet[tables] = 0
+        self.min_raise[tables] = self.big_blind
+        self.last_raiser[tables] = -1
+        self.bet_in_round[tables] = 0
+        self.acted[tables] = False
+
+        preflop = tables[self.street[tables] == PREFLOP]
+        if len(preflop):
+            sb_pos = self._next_active_idx(preflop, self.dealer_pos[preflop])
+            self._execute_bet(preflop, sb_pos, np.full(len(preflop), self.small_blind))
+            bb_pos = self._next_active_idx(preflop, sb_pos)
+            self._execute_bet(preflop, bb_pos, np.full(len(preflop), self.big_blind))
+            self.to_act[preflop] = self._next_active_idx(preflop, bb_pos)
+
+        postflop = tables[self.street[tables] != PREFLOP]
+        if len(postflop):
+            can_act = (self.active[postflop] & ~self.all_in[postflop]).sum(1)
+            next_idx = self._next_active_idx(postflop, self.dealer_pos[postflop])
+            self.to_act[postflop] = np.where(can_act < 2, -1, next_idx)
+
+        self.num_can_act[tables] = (self.active[tables] & ~self.all_in[tables]).sum(1)
+
+    def _advance_streets(self):
+        """本轮下注已结束的桌：不足两人未弃牌或已到河牌则结算，否则进入下一条街."""
+        while True:
+            tables = self.rows[self.in_hand & (self.to_act < 0)]
+            if not len(tables): return
+            finished = (self.active[tables].sum(1) < 2) | (self.street[tables] == RIVER)
+            self._finish_hand(tables[finished])
+            tables = tables[~finished]
+            self.street[tables] += 1
+            self._start_betting_round(tables)
+
+    def _close_finished_rounds(self, tables: np.ndarray) -> np.ndarray:
+        """与 GameManager._run_betting_round 的结束条件相同，返回本轮仍需行动的桌."""
+        positions = self.to_act[tables]
+        can_act = self.active[tables] & ~self.all_in[tables]
+        current_bet = self.current_bet[tables]
+        all_acted = self.acted[tables].sum(1) >= self.num_can_act[tables]
+        all_matched = ((self.bet_in_round[tables] == current_bet[:, None]) | ~can_act).all(1)
+        on_raiser = self.last_raiser[tables] == positions
+        done = ((on_raiser | all_acted) & all_matched & (current_bet > 0)) | (all_acted & (current_bet == 0))
+        self.to_act[tables[done]] = -1
+        return tables[~done]
+
+    def legalize(self, batch: DecisionBatch, actions: np.ndarray, amounts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """与 GameManager._get_player_action 相同的动作校验：不能过牌时过牌改为跟注，其他非法动作改为弃牌，加注额限制在合法范围内."""
+        actions = np.asarray(actions, dtype=np.int64)
+        amounts = np.asarray(amounts, dtype=np.int64)
+        facing_bet = batch.current_bet - batch.bet_in_round != 0
+        legal = ((actions == FOLD) | (actions == ALL_IN) | ((actions == CHECK) & ~facing_bet)
+                 | ((actions == CALL) & facing_bet) | ((actions == RAISE) & batch.can_raise))
+        check_to_call = (actions == CHECK) & facing_bet & (batch.to_call > 0)
+        actions = np.where(legal, actions, np.where(check_to_call, CALL, FOLD))
+        amounts = np.where(actions == RAISE, np.clip(amounts, batch.min_raise_total, batch.max_raise_total), 0)
+        return actions, amounts
+
+    def _apply_actions(self, tables: np.ndarray, positions: np.ndarray, actions: np.ndarray, amounts: np.ndarray):
+        """与 PokerGame.handle_action 相同的批量动作执行."""
+        fold = actions == FOLD
+        self.active[tables[fold], positions[fold]] = False
+
+        call = actions == CALL
+        t, p = tables[call], positions[call]
+        self._execute_bet(t, p, self.current_bet[t] - self.bet_in_round[t, p])
+
+        # 加注到 amount：最小加注额按下注后的 current_bet 计算
+        raise_ = actions == RAISE
+        t, p = tables[raise_], positions[raise_]
+        self._execute_bet(t, p, amounts[raise_] - self.bet_in_round[t, p])
+        self.min_raise[t] = amounts[raise_] - self.current_bet[t]
+        self.last_raiser[t] = p
+
+        all_in = actions == ALL_IN
+        t, p = tables[all_in], positions[all_in]
+        stack = self.chips[t, p]
+        is_raise = stack > self.current_bet[t] - self.bet_in_round[t, p]
+        tr, pr = t[is_raise], p[is_raise]
+        self.min_raise[tr] = np.maximum(self.min_raise[tr], stack[is_raise] + self.bet_in_round[tr, pr] - self.current_bet[tr])
+        self.last_raiser[tr] = pr
+        self._execute_bet(t, p, stack)
+
+    def _finish_hand(self, tables: np.ndarray):
+        if not len(tables): return
+        self.in_hand[tables] = False
+        single = self.active[tables].sum(1) == 1
+        # 只剩一名玩家未弃牌：赢得所有投入
+        t = tables[single]
+        self.chips[t] += self.active[t] * self.bet_in_hand[t].sum(1, keepdims=True)
+        t = tables[~single]
+        if len(t): self.chips[t] += self._showdown_gains(t)
+
+    def _showdown_gains(self, tables: np.ndarray) -> np.ndarray:
+        """按全下金额分层构造主池和边池（与 collect_bets_and_manage_pots 相同），每层由有资格的未弃牌玩家中牌力最大者平分."""
+        bet_in_hand, active = self.bet_in_hand[tables], self.active[tables]
+        levels = np.sort(np.where(self.all_in[tables] & (bet_in_hand > 0), bet_in_hand, _NO_LEVEL), axis=1)
+        upper = np.concatenate([levels, np.full((len(tables), 1), _NO_LEVEL)], axis=1)
+        lower = np.concatenate([np.zeros((len(tables), 1), dtype=np.int64), upper[:, :-1]], axis=1)
+        contributions = np.clip(bet_in_hand[:, None, :] - lower[:, :, None], 0, (upper - lower)[:, :, None])
+        amounts = contributions.sum(2)
+        candidates = (bet_in_hand[:, None, :] > lower[:, :, None]) & active[:, None, :]
+
+        scores = np.full(active.shape, -1, dtype=np.int64)
+        rows, cols = np.nonzero(active)
+        cards = np.concatenate([self.board[tables[rows]], self.hole[tables[rows], cols]], axis=1)
+        scores[rows, cols] = best_scores(cards)
+        masked = np.where(candidates, scores[:, None, :], -1)
+        winners = candidates & (masked == masked.max(2, keepdims=True))
+        num_winners = winners.sum(2)
+        divisor = np.maximum(num_winners, 1)
+        share, remainder = amounts // divisor, np.where(num_winners > 0, amounts % divisor, 0)
+
+        # 除不尽的筹码按庄家左手边开始的顺序逐个分给赢家
+        n, dealer = self.n[tables][:, None], self.dealer_pos[tables][:, None]
+        positions = np.arange(self.num_players)
+        order_key = np.where(positions < n, (positions - dealer - 1 + n) % n, self.num_players)
+        order = np.argsort(order_key, axis=1)[:, None, :]
+        ordered = np.take_along_axis(winners, order, 2)
+        extra_ordered = ordered & (np.cumsum(ordered, axis=2) <= remainder[:, :, None])
+        extra = np.zeros_like(winners)
+        np.put_along_axis(extra, np.broadcast_to(order, winners.shape), extra_ordered, 2)
+        return (share[:, :, None] * winners + extra).sum(1)
+
+    def play_hand(self, policy: Policy, decks: np.ndarray = None) -> np.ndarray:
+        """所有桌同步进行一手牌，返回按原始座位号排列的本手盈亏 (N, P)；未能开局的桌为0."""
+        self.start_new_hand(decks)
+        while True:
+            self._advance_streets()
+            tables = self.rows[self.in_hand]
+            if not len(tables): break
+            tables = self._close_finished_rounds(tables)
+            if not len(tables): continue
+
+            positions = self.to_act[tables]
+            self.acted[tables, positions] = True
+            batch = DecisionBatch(self, tables, positions)
+            actions, amounts = self.legalize(batch, *policy(batch))
+            self._apply_actions(tables, positions, actions, amounts)
+
+            next_idx = self._next_active_idx(tables, positions)
+            self.to_act[tables] = np.where(self.active[tables].sum(1) < 2, -1, next_idx)
+
+        results = np.zeros_like(self.chips)
+        np.put_along_axis(results, self.seat_ids, self.chips - self.chips_at_start, 1)
+        self.total_results += results
+        return results
+
+    def play(self, num_hands: int, policy: Policy) -> np.ndarray:
+        """进行 num_hands 手牌（不满两人有筹码的桌自动停止），返回按原始座位号的累计盈亏."""
+        for _ in range(num_hands):
+            if not self.reset_stacks and ((self.chips > 0).sum(1) < 2).all(): break
+            self.play_hand(policy)
+        return self.total_results
+
+
+# --- 脚本策略 ---
+def random_policy(seed: int = None, weights=(1, 2, 2, 1, 0.2)) -> Policy:
+    """按权重在 fold/check/call/raise/all-in 中随机选择（只在合法动作中选），加注额在合法范围内均匀分布."""
+    rng = np.random.default_rng(seed)
+    weights = np.asarray(weights, dtype=float)
+
+    def policy(batch: DecisionBatch):
+        facing_bet = batch.to_call > 0
+        legal = np.stack([np.ones(len(batch), bool), ~facing_bet, facing_bet, batch.can_raise, np.ones(len(batch), bool)], 1)
+        w = legal * weights
+        cumulative = np.cumsum(w, 1)
+        actions = (cumulative < rng.random(len(batch))[:, None] * cumulative[:, -1:]).sum(1)
+        amounts = batch.min_raise_total + (rng.random(len(batch)) * (batch.max_raise_total - batch.min_raise_total + 1)).astype(np.int64)
+        return actions, amounts
+    return policy
+
+
+def check_call_policy(batch: DecisionBatch):
+    """能过牌就过牌，否则跟注."""
+    return np.where(batch.to_call > 0, CALL, CHECK), np.zeros(len(batch), dtype=np.int64)
+
+
+POLICIES = {"random": lambda seed: random_policy(seed), "call": lambda seed: check_call_policy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量化引擎：多桌同步进行脚本策略对局，测量吞吐量")
+    parser.add_argument("--tables", "-t", type=int, default=10000, help="同步进行的桌数 (默认: 10000)")
+    parser.add_argument("--players", "-p", type=int, default=6, help="每桌玩家数 (默认: 6)")
+    parser.add_argument("--hands", "-n", type=int, default=100, help="每桌手数 (默认: 100)")
+    parser.add_argument("--chips", "-c", type=int, default=GAME_CONFIG['starting_chips'], help=f"起始筹码 (默认: {GAME_CONFIG['starting_chips']})")
+    parser.add_argument("--policy", choices=list(POLICIES), default="random", help="所有座位使用的策略 (默认: random)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)")
+    parser.add_argument("--keep-stacks", action="store_true", help="不在每手牌重置筹码（有人出局后桌上人数减少）")
+    args = parser.parse_args()
+
+    if not (GAME_CONFIG['min_players'] <= args.players <= GAME_CONFIG['max_players']):
+        print(f"错误: 玩家数量必须在 {GAME_CONFIG['min_players']}-{GAME_CONFIG['max_players']} 之间")
+        return
+
+    console = Console()
+    game = VectorPokerGame(args.tables, args.players, args.chips, seed=args.seed, reset_stacks=not args.keep_stacks)
+    start = time.perf_counter()
+    results = game.play(args.hands, POLICIES[args.policy](args.seed))
+    elapsed = time.perf_counter() - start
+
+    hands = int(game.hands_played.sum())
+    console.print(f"{args.tables} 桌 x {args.hands} 手: 共 {hands} 手牌, 用时 {elapsed:.2f}s ({hands / elapsed:,.0f} 手/秒)")
+    table = Table(title=f"各座位结果 (策略: {args.policy})")
+    table.add_column("座位", style="cyan")
+    table.add_column("平均净盈亏", style="yellow")
+    table.add_column("bb/100", style="green")
+    for seat in range(args.players):
+        net = results[:, seat].mean()
+        table.add_row(str(seat + 1), f"{net:+.1f}", f"{net / game.big_blind / max(args.hands, 1) * 100:+.1f}")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
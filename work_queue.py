@@ -0,0 +1,428 @@
+# work_queue.py
+
+"""
+分布式任务队列 - 协调端把对局任务（座位、模型、种子、手数）写入本地SQLite队列，并通过TCP（每行一个JSON）对外提供；
+任意机器上的工作端领取任务、用 GameManager 运行，每手牌结束后把手牌日志回传协调端。
+工作端靠租约心跳续期，租约过期（工作端崩溃或断网）的任务会重新排队，超过最大尝试次数后标记为失败
+"""
+
+import argparse
+import contextlib
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from config import GAME_CONFIG
+
+QUEUE_FILENAME = "work_queue.db"
+DEFAULT_PORT = 8765
+LEASE_SECONDS = 60
+MAX_ATTEMPTS = 3
+# 协调端与工作端共享的令牌也可以通过该环境变量提供，避免出现在命令行和进程列表中
+TOKEN_ENV = "LLM_POKER_QUEUE_TOKEN"
+# 回传的日志只允许写入这些文件名，防止工作端写到协调端日志目录之外
+_LOG_FILE_PATTERNS = ("hand_*.json", "session_summary.json", "checkpoint.json")
+
+
+class JobQueue:
+    """SQLite持久化队列。每次操作单独建立连接，可被多个线程或同机的多个进程共享."""
+
+    def __init__(self, db_path: str = f"logs/{QUEUE_FILENAME}", log_dir: str = "logs",
+                 lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.log_dir = Path(log_dir)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with contextlib.closing(self._connect()) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    spec TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL,
+                    session_id TEXT,
+                    hands_done INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def submit(self, spec: Dict[str, Any]) -> int:
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            return conn.execute("INSERT INTO jobs (spec, created, updated) VALUES (?, ?, ?)",
+                                (json.dumps(spec, ensure_ascii=False), now, now)).lastrowid
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float):
+        """租约过期的任务：未用完尝试次数的重新排队，否则标记为失败."""
+        conn.execute("""UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                               error = '工作端租约过期', worker = NULL, lease_until = NULL, updated = ?
+                        WHERE status = 'running' AND lease_until < ?""", (self.max_attempts, now, now))
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE 先拿写锁，多个工作端同时领取时不会领到同一个任务
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn, now)
+            row = conn.execute("SELECT id, spec, attempts FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("""UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                                   lease_until = ?, session_id = NULL, hands_done = 0, updated = ? WHERE id = ?""",
+                         (worker, now + self.lease_seconds, now, row["id"]))
+            conn.execute("COMMIT")
+            return {"id": row["id"], "spec": json.loads(row["spec"]), "attempt": row["attempts"] + 1,
+                    "lease_seconds": self.lease_seconds}
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: int, worker: str, session_id: str = None, hands_done: int = None) -> bool:
+        """续租并记录进度。返回False表示任务已不属于该工作端（租约过期后被重新分配），工作端应放弃."""
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            cursor = conn.execute("""UPDATE jobs SET lease_until = ?, updated = ?,
+                                            session_id = COALESCE(?, session_id), hands_done = COALESCE(?, hands_done)
+                                     WHERE id = ? AND worker = ? AND status = 'running'""",
+                                  (now + self.lease_seconds, now, session_id, hands_done, job_id, worker))
+            return cursor.rowcount == 1
+
+    def store_log(self, job_id: int, worker: str, session_id: str, filename: str, content: Dict[str, Any]) -> bool:
+        """把工作端回传的日志文件写入协调端的 logs/<session_id>/ 下，会话目录与本机运行的对局相同."""
+        name = Path(filename).name
+        if name != filename or not any(Path(name).match(p) for p in _LOG_FILE_PATTERNS) or Path(session_id).name != session_id:
+            raise ValueError(f"不允许的日志文件: {session_id}/{filename}")
+        if not self.heartbeat(job_id, worker, session_id): return False
+        session_dir = self.log_dir / session_id
+        session_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = session_dir / f"{name}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, indent=2)
+        tmp_file.replace(session_dir / name)
+        return True
+
+    def complete(self, job_id: int, worker: str, result: Dict[str, Any]) -> bool:
+        with contextlib.closing(self._connect()) as conn:
+            cursor = conn.execute("""UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, updated = ?
+                                     WHERE id = ? AND worker = ? AND status = 'running'""",
+                                  (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """工作端报告任务出错：未用完尝试次数的重新排队."""
+        with contextlib.closing(self._connect()) as conn:
+            cursor = conn.execute("""UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                                            error = ?, worker = NULL, lease_until = NULL, updated = ?
+                                     WHERE id = ? AND worker = ? AND status = 'running'""",
+                                  (self.max_attempts, error, time.time(), job_id, worker))
+            return cursor.rowcount == 1
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with contextlib.closing(self._connect()) as conn:
+            self._expire_leases(conn, time.time())
+            rows = conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        return [{**dict(row), "spec": json.loads(row["spec"]), "result": json.loads(row["result"]) if row["result"] else None}
+                for row in rows]
+
+
+# --- TCP服务：每行一个JSON请求 {"op": ..., "token": ..., 参数...}，返回一行 {"ok": true, "value": ...} 或 {"ok": false, "error": ...} ---
+
+_REMOTE_OPS = {"claim", "heartbeat", "store_log", "complete", "fail"}
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost": return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _QueueRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                token = request.pop("token", None)
+                # 每个请求都校验令牌：工作端会用自己的API密钥运行领取到的任务，并能写入协调端的日志目录
+                if self.server.token and not (isinstance(token, str) and hmac.compare_digest(token, self.server.token)):
+                    raise PermissionError("令牌无效")
+                op = request.pop("op")
+                if op not in _REMOTE_OPS: raise ValueError(f"不支持的操作: {op}")
+                response = {"ok": True, "value": getattr(self.server.queue, op)(**request)}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class QueueServer(socketserver.ThreadingTCPServer):
+    """代替消息中间件的协调端服务，每个连接一个线程.
+    默认只监听本机；监听其他地址时必须设置共享令牌，否则能连上端口的任何人都可以领取任务和写入日志."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue: JobQueue, host: str = "127.0.0.1", port: int = DEFAULT_PORT, token: str = None):
+        if not token and not _is_loopback(host):
+            raise ValueError(f"监听非本机地址 {host} 时必须设置共享令牌（--token 或环境变量 {TOKEN_ENV}）")
+        self.token = token
+        self.queue = queue
+        super().__init__((host, port), _QueueRequestHandler)
+
+
+class RemoteQueue:
+    """工作端使用的协调端代理，接口与 JobQueue 的工作端部分相同；连接断开时自动重连一次."""
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, timeout: float = 30, token: str = None):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.token = token
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _call(self, op: str, **kwargs):
+        request = {"op": op, **kwargs}
+        if self.token: request["token"] = self.token
+        payload = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            for retry in (False, True):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                        self._reader = self._sock.makefile("rb")
+                    self._sock.sendall(payload)
+                    line = self._reader.readline()
+                    if not line: raise ConnectionError("协调端关闭了连接")
+                    break
+                except OSError:
+                    self.close()
+                    if retry: raise
+        response = json.loads(line)
+        if not response["ok"]: raise RuntimeError(response["error"])
+        return response["value"]
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def claim(self, worker: str): return self._call("claim", worker=worker)
+    def heartbeat(self, job_id: int, worker: str, session_id: str = None, hands_done: int = None):
+        return self._call("heartbeat", job_id=job_id, worker=worker, session_id=session_id, hands_done=hands_done)
+    def store_log(self, job_id: int, worker: str, session_id: str, filename: str, content: Dict[str, Any]):
+        return self._call("store_log", job_id=job_id, worker=worker, session_id=session_id, filename=filename, content=content)
+    def complete(self, job_id: int, worker: str, result: Dict[str, Any]):
+        return self._call("complete", job_id=job_id, worker=worker, result=result)
+    def fail(self, job_id: int, worker: str, error: str):
+        return self._call("fail", job_id=job_id, worker=worker, error=error)
+
+
+# --- 工作端 ---
+
+class Worker:
+    def __init__(self, queue, worker_id: str = None, poll_seconds: float = 5, verbose: bool = False):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.poll_seconds = poll_seconds
+        self.verbose = verbose
+
+    def run(self, max_jobs: int = None, exit_when_empty: bool = False) -> int:
+        """循环领取并运行任务，返回完成的任务数."""
+        done = 0
+        while max_jobs is None or done < max_jobs:
+            job = self.queue.claim(self.worker_id)
+            if job is None:
+                if exit_when_empty: break
+                time.sleep(self.poll_seconds)
+                continue
+            if self.run_job(job): done += 1
+        return done
+
+    def run_job(self, job: Dict[str, Any]) -> bool:
+        from game_manager import GameManager
+
+        job_id, spec = job["id"], job["spec"]
+        lost = threading.Event()
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            # 每1/3租约续期一次；协调端不可达时继续尝试，直到租约确实被收回
+            while not stop_heartbeat.wait(job["lease_seconds"] / 3):
+                try:
+                    if not self.queue.heartbeat(job_id, self.worker_id): lost.set()
+                except (OSError, RuntimeError):
+                    pass
+
+        unsent: List[str] = []
+
+        def after_hand(manager: "GameManager") -> bool:
+            hand_num = manager.next_hand_num - 1
+            unsent.append(f"hand_{hand_num}.json")
+            try:
+                while unsent:
+                    self._upload(job_id, manager, unsent[0])
+                    unsent.pop(0)
+                self.queue.heartbeat(job_id, self.worker_id, manager.logger.session_id, hand_num)
+            except (OSError, RuntimeError):
+                pass  # 协调端暂时不可达：日志留到下一手再传，租约由心跳线程维持
+            # 任务已被重新分配给其他工作端时立即停止，不再回传结果
+            return lost.is_set()
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            # 会话ID包含任务号和尝试次数，不同机器同时开始的任务回传到协调端时不会冲突
+            session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_job{job_id}_{job['attempt']}"
+            manager = GameManager(len(spec["seats"]), spec.get("starting_chips", GAME_CONFIG['starting_chips']),
+                                  spec["seats"], seed=spec.get("seed"), reset_stacks=spec.get("reset_stacks", False),
+                                  session_id=session_id, verbose=self.verbose)
+            self.queue.heartbeat(job_id, self.worker_id, manager.logger.session_id, 0)
+            results = manager.play_game(spec["hands"], should_stop=after_hand)
+            if lost.is_set(): return False
+            for filename in unsent + ["session_summary.json"]: self._upload(job_id, manager, filename)
+            return self.queue.complete(job_id, self.worker_id, {
+                "session_id": manager.logger.session_id,
+                "worker": self.worker_id,
+                "hands": manager.next_hand_num - 1,
+                "final_chips": results["final_chips"],
+                "winner_stats": results["winner_stats"],
+                "player_types": {p.name: p.llm_type for p in manager.all_players},
+                "hand_results": manager.hand_results
+            })
+        except Exception as e:
+            try:
+                self.queue.fail(job_id, self.worker_id, f"{type(e).__name__}: {e}")
+            except (OSError, RuntimeError):
+                pass  # 协调端不可达时不报告，租约过期后任务会自动重新排队
+            return False
+        finally:
+            stop_heartbeat.set()
+
+    def _upload(self, job_id: int, manager, filename: str):
+        path = manager.logger.session_dir / filename
+        if not path.exists(): return
+        with open(path, 'r', encoding='utf-8') as f: content = json.load(f)
+        self.queue.store_log(job_id, self.worker_id, manager.logger.session_id, filename, content)
+
+
+def _parse_seeds(text: str) -> List[int]:
+    """"1-50" 或 "1,2,7" 形式的种子列表."""
+    seeds = []
+    for part in text.split(","):
+        start, _, end = part.partition("-")
+        seeds.extend(range(int(start), int(end or start) + 1))
+    return seeds
+
+
+def print_status(console: Console, queue: JobQueue):
+    jobs = queue.jobs()
+    counts: Dict[str, int] = {}
+    for job in jobs: counts[job["status"]] = counts.get(job["status"], 0) + 1
+    table = Table(title=f"任务队列 ({', '.join(f'{s}: {n}' for s, n in sorted(counts.items())) or '空'})")
+    table.add_column("ID", style="white")
+    table.add_column("座位", style="magenta")
+    table.add_column("种子", style="white")
+    table.add_column("状态", style="green")
+    table.add_column("进度", style="yellow")
+    table.add_column("尝试", style="white")
+    table.add_column("工作端", style="cyan")
+    table.add_column("会话/错误", style="blue")
+    for job in jobs:
+        spec = job["spec"]
+        table.add_row(str(job["id"]), ",".join(spec["seats"]), str(spec.get("seed")), job["status"],
+                      f"{job['hands_done']}/{spec['hands']}", str(job["attempts"]), job["worker"] or "-",
+                      job["session_id"] or job["error"] or "-")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式任务队列：协调端提交和分发对局任务，工作端领取并运行")
+    parser.add_argument("--db", default=f"logs/{QUEUE_FILENAME}", help=f"队列数据库路径 (默认: logs/{QUEUE_FILENAME})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="提交对局任务，每个种子一个任务")
+    submit.add_argument("--seats", required=True, help="按座位顺序的LLM类型，逗号分隔")
+    submit.add_argument("--hands", "-n", type=int, default=100, help="每个任务的手数 (默认: 100)")
+    submit.add_argument("--chips", "-c", type=int, default=GAME_CONFIG['starting_chips'], help="起始筹码")
+    submit.add_argument("--seeds", default="1", help="种子列表，如 1-50 或 1,2,7 (默认: 1)")
+    submit.add_argument("--reset-stacks", action="store_true", help="每手牌重置为起始筹码")
+
+    serve = sub.add_parser("serve", help="启动协调端TCP服务，工作端通过 --connect 连接")
+    serve.add_argument("--host", default="127.0.0.1", help="监听地址 (默认: 127.0.0.1；其他地址需要 --token)")
+    serve.add_argument("--token", default=os.environ.get(TOKEN_ENV), help=f"工作端必须提供的共享令牌 (默认: 环境变量 {TOKEN_ENV})")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"监听端口 (默认: {DEFAULT_PORT})")
+    serve.add_argument("--lease", type=float, default=LEASE_SECONDS, help=f"租约秒数，超时未心跳的任务重新排队 (默认: {LEASE_SECONDS})")
+    serve.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help=f"每个任务的最大尝试次数 (默认: {MAX_ATTEMPTS})")
+
+    worker = sub.add_parser("worker", help="运行工作端")
+    worker.add_argument("--connect", metavar="HOST:PORT", help="连接远程协调端；不指定时直接使用本机的 --db")
+    worker.add_argument("--token", default=os.environ.get(TOKEN_ENV), help=f"协调端的共享令牌 (默认: 环境变量 {TOKEN_ENV})")
+    worker.add_argument("--id", help="工作端ID (默认: 主机名+随机后缀)")
+    worker.add_argument("--max-jobs", type=int, help="完成多少个任务后退出")
+    worker.add_argument("--exit-when-empty", action="store_true", help="队列为空时退出，而不是等待新任务")
+    worker.add_argument("--verbose", action="store_true", help="打印牌局过程")
+
+    sub.add_parser("status", help="查看任务状态")
+    args = parser.parse_args()
+
+    console = Console()
+    if args.command == "submit":
+        queue = JobQueue(args.db)
+        seats = [s.strip() for s in args.seats.split(",")]
+        ids = [queue.submit({"seats": seats, "hands": args.hands, "starting_chips": args.chips, "seed": seed,
+                             "reset_stacks": args.reset_stacks}) for seed in _parse_seeds(args.seeds)]
+        console.print(f"[bold green]已提交 {len(ids)} 个任务[/bold green] (ID {ids[0]}-{ids[-1]})")
+    elif args.command == "serve":
+        queue = JobQueue(args.db, lease_seconds=args.lease, max_attempts=args.max_attempts)
+        if not args.token and not _is_loopback(args.host):
+            parser.error(f"监听非本机地址 {args.host} 时必须设置 --token 或环境变量 {TOKEN_ENV}")
+        with QueueServer(queue, args.host, args.port, args.token) as server:
+            console.print(f"[bold blue]协调端已启动:[/bold blue] {args.host}:{args.port}, 队列 {args.db}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                console.print("\n[yellow]协调端已停止[/yellow]")
+    elif args.command == "worker":
+        if args.connect:
+            host, _, port = args.connect.rpartition(":")
+            queue = RemoteQueue(host, int(port), token=args.token)
+        else:
+            queue = JobQueue(args.db)
+        w = Worker(queue, args.id, verbose=args.verbose)
+        console.print(f"[bold blue]工作端 {w.worker_id} 已启动[/bold blue]")
+        done = w.run(args.max_jobs, args.exit_when_empty)
+        console.print(f"[bold green]工作端退出，完成 {done} 个任务[/bold green]")
+    else:
+        print_status(console, JobQueue(args.db))
+
+
+if __name__ == "__main__":
+    main()